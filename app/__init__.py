@@ -1,9 +1,12 @@
 from flask import Flask
 from flask_wtf.csrf import CSRFProtect
 import os
+import sys
 import logging
+import time
 
 def create_app():
+    started = time.perf_counter()
     app = Flask(__name__)
 
     # Security Configuration
@@ -29,7 +32,32 @@ def create_app():
     from . import routes
     app.register_blueprint(routes.bp)
 
+    @app.cli.command('profile-token')
+    def profile_token():
+        """Prints a token for the X-Profile-Token header (profiles one request)."""
+        from .profiling import make_token
+        print(make_token(app.secret_key))
+
+    @app.cli.command('import-times')
+    def import_times():
+        """Prints the slowest imports of a cold app start (python -X importtime)."""
+        from .startup import import_times
+        for cumulative, name in import_times():
+            print(f"{cumulative / 1000:8.1f} ms  {name}")
+
     # Logging Configuration
     logging.basicConfig(level=logging.INFO)
 
+    from . import assets, startup
+    if app.debug or os.environ.get('FLASK_DEBUG') == '1':
+        # Pick up edits to static/ without a restart
+        assets.ASSETS.reload = True
+
+        # Heavy modules should only load on first use (or in the warm-up), not here
+        loaded = [name for name in startup.HEAVY_MODULES if name in sys.modules]
+        logging.getLogger(__name__).info(
+            f"create_app took {(time.perf_counter() - started) * 1000:.0f} ms; heavy modules loaded at startup: "
+            f"{loaded or 'none'} (see `flask import-times`)")
+    startup.start(routes.SIGAA_URL)
+
     return app
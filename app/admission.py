@@ -0,0 +1,119 @@
+import logging
+import math
+import os
+import threading
+import time
+
+from .sigaa_api.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Admission control for the routes that hold SIGAA connections.
+# Each gate admits up to `limit` requests at once and lets up to `queue` more wait for a slot,
+# each for at most `max_wait` seconds. Anything else is shed right away with a Retry-After
+# estimate, instead of piling up behind slow SIGAA calls until the platform times out.
+#
+# Gate state lives in this process; with several workers each one has its own gates.
+
+ADMISSION = REGISTRY.counter('sigaa_admission_total', 'Admission decisions per gate.',
+                             ('gate', 'outcome'))
+QUEUE_SECONDS = REGISTRY.histogram('sigaa_admission_queue_seconds', 'Time admitted requests waited for a slot.',
+                                   ('gate',), buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0))
+
+ADMITTED = 'admitted'
+QUEUED = 'admitted_after_queue'
+REJECTED_FULL = 'rejected_queue_full'
+REJECTED_TIMEOUT = 'rejected_timeout'
+
+MIN_RETRY_AFTER = 1
+MAX_RETRY_AFTER = 60
+
+
+class Ticket:
+    """Holds a slot; release() is safe to call more than once."""
+
+    def __init__(self, gate):
+        self.gate = gate
+        self.started = time.monotonic()
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self.gate._release(time.monotonic() - self.started)
+
+
+class Gate:
+    def __init__(self, name, limit, queue, max_wait, typical_seconds):
+        self.name = name
+        self.limit = limit
+        self.queue = queue
+        self.max_wait = max_wait
+        self.active = 0
+        self.waiting = 0
+        # Moving average of how long a slot is held, used for Retry-After
+        self.hold_seconds = typical_seconds
+        self._cond = threading.Condition()
+
+        REGISTRY.gauge(f'sigaa_{name}_in_flight', f'Requests holding a {name} slot.', lambda: self.active)
+        REGISTRY.gauge(f'sigaa_{name}_queued', f'Requests waiting for a {name} slot.', lambda: self.waiting)
+
+    def acquire(self):
+        """Returns a Ticket, or None when the request should be shed (see retry_after)."""
+        with self._cond:
+            if self.active < self.limit:
+                self.active += 1
+                ADMISSION.inc(1, self.name, ADMITTED)
+                return Ticket(self)
+
+            if self.waiting >= self.queue:
+                ADMISSION.inc(1, self.name, REJECTED_FULL)
+                return None
+
+            self.waiting += 1
+            start = time.monotonic()
+            deadline = start + self.max_wait
+            try:
+                while self.active >= self.limit:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        ADMISSION.inc(1, self.name, REJECTED_TIMEOUT)
+                        return None
+                    self._cond.wait(remaining)
+            finally:
+                self.waiting -= 1
+
+            self.active += 1
+            QUEUE_SECONDS.observe(time.monotonic() - start, self.name)
+            ADMISSION.inc(1, self.name, QUEUED)
+            return Ticket(self)
+
+    def _release(self, held):
+        with self._cond:
+            self.active -= 1
+            self.hold_seconds = 0.8 * self.hold_seconds + 0.2 * held
+            self._cond.notify()
+
+    def retry_after(self):
+        """Seconds until a slot is likely free for a new request, given the current backlog."""
+        backlog = (self.waiting + 1) / max(1, self.limit)
+        return max(MIN_RETRY_AFTER, min(MAX_RETRY_AFTER, math.ceil(self.hold_seconds * backlog)))
+
+
+def _env(name, default, cast=int):
+    # Read at import: a typo in the environment must not keep the app from starting
+    value = os.environ.get(name, '')
+    if not value:
+        return default
+    try:
+        return cast(value)
+    except ValueError:
+        logger.warning(f"Ignoring invalid {name}={value!r}, using {default}")
+        return default
+
+
+# Logins are short (a few SIGAA round trips); streams hold a slot for the whole grade crawl
+LOGIN_GATE = Gate('login', limit=_env('LOGIN_CONCURRENCY', 8), queue=_env('LOGIN_QUEUE', 16),
+                  max_wait=_env('LOGIN_MAX_WAIT', 5, float), typical_seconds=3.0)
+STREAM_GATE = Gate('stream', limit=_env('STREAM_CONCURRENCY', 16), queue=_env('STREAM_QUEUE', 16),
+                   max_wait=_env('STREAM_MAX_WAIT', 5, float), typical_seconds=20.0)
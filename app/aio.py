@@ -0,0 +1,136 @@
+import _thread
+import asyncio
+import concurrent.futures
+import contextvars
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# One asyncio event loop for the whole process, running in its own OS thread.
+# Sync views hand coroutines to it and wait for the result.
+#
+# Every request used to run its own loop in the request thread. Under the gevent worker all
+# requests share one OS thread, and asyncio allows a single running loop per thread, so the
+# second concurrent request failed with "Cannot run the event loop while another loop is running".
+
+_loop = None
+_loop_ident = None
+_lock = threading.Lock()
+
+
+def _gevent_patched():
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched('threading')
+
+
+def _start_loop():
+    global _loop
+    start_thread, allocate_lock, get_ident = _thread.start_new_thread, _thread.allocate_lock, _thread.get_ident
+    if _gevent_patched():
+        # The loop needs a real OS thread, and the startup handshake is between two real threads
+        from gevent import monkey
+        start_thread = monkey.get_original('_thread', 'start_new_thread')
+        allocate_lock = monkey.get_original('_thread', 'allocate_lock')
+        get_ident = monkey.get_original('_thread', 'get_ident')
+
+    ready = allocate_lock()
+    ready.acquire()
+    loops = []
+
+    def run():
+        global _loop_ident
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        _loop_ident = get_ident()
+        loops.append(loop)
+        ready.release()
+        loop.run_forever()
+
+    start_thread(run, ())
+    ready.acquire()
+    _loop = loops[0]
+
+
+def get_loop():
+    if _loop is None:
+        with _lock:
+            if _loop is None:
+                _start_loop()
+    return _loop
+
+
+def loop_thread_ident():
+    """Ident of the loop thread, for the sampling profiler."""
+    get_loop()
+    return _loop_ident
+
+
+def submit(coro):
+    """
+    Schedules coro on the shared loop and returns a concurrent.futures.Future.
+    The caller's context variables (Flask request context, RequestStats) are carried over.
+    """
+    loop = get_loop()
+    future = concurrent.futures.Future()
+
+    def start():
+        task = loop.create_task(coro)
+
+        def done(task):
+            if task.cancelled():
+                future.cancel()
+            elif task.exception() is not None:
+                future.set_exception(task.exception())
+            else:
+                future.set_result(task.result())
+
+        task.add_done_callback(done)
+
+    loop.call_soon_threadsafe(start, context=contextvars.copy_context())
+    return future
+
+
+def _wait(future):
+    if not _gevent_patched():
+        return future.result()
+
+    # Park only this greenlet; the loop thread wakes the hub through an async watcher
+    from gevent import get_hub
+    from gevent.event import Event
+
+    hub = get_hub()
+    done = Event()
+    watcher = hub.loop.async_()
+    watcher.start(done.set)
+    try:
+        future.add_done_callback(lambda _: watcher.send())
+        done.wait()
+    finally:
+        watcher.close()
+    return future.result()
+
+
+def run(coro):
+    """Runs coro on the shared loop and blocks the calling request until it finishes."""
+    return _wait(submit(coro))
+
+
+def iterate(agen):
+    """Sync generator over an async generator running on the shared loop."""
+    try:
+        while True:
+            try:
+                item = run(agen.__anext__())
+            except StopAsyncIteration:
+                return
+            yield item
+    finally:
+        # Client went away (or we are done): let the generator run its finally blocks
+        try:
+            run(agen.aclose())
+        except Exception as e:
+            logger.warning(f"Error closing async generator: {e}")
@@ -0,0 +1,147 @@
+import asyncio
+import json
+import os
+import sqlite3
+import time
+
+from .sigaa_api.models import CourseGrades, CourseResult
+from . import history, ndjson
+
+# Grades of the student's past terms, kept next to the grade history (same SQLite file).
+# Crawling a past term costs a few JSF navigations per course, so it is done once and checkpointed:
+#   - each course is stored as soon as its grades are fetched;
+#   - a term row is written when every course of the term is in, marking it complete.
+# An interrupted crawl resumes with the courses still missing. Complete terms are served from here;
+# only the newest past term can still change (late consolidation), so it is fetched again once
+# OPEN_TERM_TTL has passed, and settles as soon as a newer past term shows up.
+#
+# Opt-in like the grade history (on only when HISTORY_DB is set), with the same retention: anything
+# crawled more than HISTORY_RETENTION_DAYS ago is purged and crawled again when next asked for.
+# All SQLite work runs on the history's writer thread (see run()), never on the event loop.
+
+OPEN_TERM_TTL = float(os.environ.get('OPEN_TERM_TTL', 24 * 3600))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS past_terms (
+    registration TEXT NOT NULL,
+    period TEXT NOT NULL,
+    crawled_at REAL NOT NULL,
+    settled INTEGER NOT NULL,
+    PRIMARY KEY (registration, period)
+);
+CREATE TABLE IF NOT EXISTS past_courses (
+    registration TEXT NOT NULL,
+    period TEXT NOT NULL,
+    course TEXT NOT NULL,
+    name TEXT NOT NULL,
+    grades TEXT NOT NULL,
+    crawled_at REAL NOT NULL,
+    PRIMARY KEY (registration, period, course)
+);
+"""
+
+
+def _grades(text):
+    data = json.loads(text)
+    return CourseGrades(data['b1Notes'], data['b2Notes'], data['b3Notes'], data['b4Notes'],
+                        data['r1Note'], data['r2Note'])
+
+
+class Term:
+    __slots__ = ('period', 'crawled_at', 'settled', 'courses', 'fetched_at')
+
+    def __init__(self, period, crawled_at=0.0, settled=False):
+        self.period = period
+        # When the term was last completed, 0 if never
+        self.crawled_at = crawled_at
+        self.settled = settled
+        # {course key: CourseResult} as stored, and when each one was fetched
+        self.courses = {}
+        self.fetched_at = {}
+
+    def needs_crawl(self, now=None):
+        now = now or time.time()
+        if not self.crawled_at:
+            return True
+        return not self.settled and now - self.crawled_at > OPEN_TERM_TTL
+
+    def checkpoint(self, key):
+        """The course's result if it was fetched after the term was last completed, else None."""
+        if self.fetched_at.get(key, 0) > self.crawled_at:
+            return self.courses[key]
+        return None
+
+
+class Archive:
+    def __init__(self, path, retention_days=history.RETENTION_DAYS):
+        self.path = path
+        self.retention = retention_days * 86400
+        self._conn = None
+        self._purged_at = 0.0
+
+    async def run(self, method, *args):
+        """Awaits one of the methods below on the writer thread."""
+        return await asyncio.wrap_future(history.on_writer_thread(method, *args))
+
+    def _connect(self):
+        # Only used from one thread (the writer thread, see run())
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def load(self, registration, now=None):
+        """{period: Term} of a student. Terms with checkpoints but never completed are included."""
+        now = now or time.time()
+        if now - self._purged_at > history.PURGE_INTERVAL:
+            self.purge(now)
+        conn = self._connect()
+        terms = {}
+        for period, crawled_at, settled in conn.execute(
+                'SELECT period, crawled_at, settled FROM past_terms WHERE registration = ?', (registration,)):
+            terms[period] = Term(period, crawled_at, bool(settled))
+
+        for period, course, name, grades, crawled_at in conn.execute(
+                'SELECT period, course, name, grades, crawled_at FROM past_courses WHERE registration = ?',
+                (registration,)):
+            term = terms.setdefault(period, Term(period))
+            term.courses[course] = CourseResult(None, name, None, _grades(grades))
+            term.fetched_at[course] = crawled_at
+        return terms
+
+    def save_course(self, registration, period, key, result, now=None):
+        with self._connect() as conn:
+            conn.execute('INSERT OR REPLACE INTO past_courses VALUES (?, ?, ?, ?, ?, ?)',
+                         (registration, period, key, result.name, ndjson.grades_json(result.grades),
+                          now or time.time()))
+
+    def complete(self, registration, period, keys, settled, now=None):
+        """Marks a term complete with exactly these courses (drops any the student no longer has)."""
+        keys = set(keys)
+        with self._connect() as conn:
+            stored = [row[0] for row in conn.execute(
+                'SELECT course FROM past_courses WHERE registration = ? AND period = ?', (registration, period))]
+            conn.executemany('DELETE FROM past_courses WHERE registration = ? AND period = ? AND course = ?',
+                             [(registration, period, key) for key in stored if key not in keys])
+            conn.execute('INSERT OR REPLACE INTO past_terms VALUES (?, ?, ?, ?)',
+                         (registration, period, now or time.time(), int(settled)))
+
+
+    def purge(self, now=None):
+        """Drops every term with something crawled before the retention period, courses included."""
+        now = now or time.time()
+        cutoff = now - self.retention
+        with self._connect() as conn:
+            # Whole terms: a complete term missing some of its courses would be served as it is
+            expired = conn.execute('SELECT registration, period FROM past_terms WHERE crawled_at < ? UNION '
+                                   'SELECT registration, period FROM past_courses WHERE crawled_at < ?',
+                                   (cutoff, cutoff)).fetchall()
+            for table in ('past_terms', 'past_courses'):
+                conn.executemany(f'DELETE FROM {table} WHERE registration = ? AND period = ?', expired)
+        self._purged_at = now
+
+
+ARCHIVE = Archive(history.HISTORY_DB) if history.HISTORY_DB else None
@@ -0,0 +1,134 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+
+from flask import Response, request, url_for
+
+# Stylesheets and scripts under static/ (css/, js/) served from memory, built once per process:
+# each file is hashed and compressed on first use. Pages link to them with asset_url(), which puts
+# the hash in the file name (js/dashboard.3f2a1b9c0d1e.js), so those URLs never change content and
+# are cached by browsers for a year; a deploy that changes a file changes its URL.
+#
+# Each file is served as br (Brotli, pinned in requirements.txt) or gzip, whichever the client
+# ranks higher; without the `brotli` module only gzip is built. With the debugger on, files are
+# re-read when they change on disk.
+
+ASSET_DIRS = ('css', 'js')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+_FINGERPRINT_RE = re.compile(r'^(?P<stem>.+)\.(?P<digest>[0-9a-f]{12})(?P<ext>\.\w+)$')
+_ETAG_SUFFIXES = {None: '', 'gzip': '-gz', 'br': '-br'}
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class Asset:
+    __slots__ = ('name', 'digest', 'mimetype', 'mtime', 'body', 'gzip', 'br')
+
+    def __init__(self, name, body, mtime):
+        self.name = name
+        self.digest = hashlib.sha1(body).hexdigest()[:12]
+        self.mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        self.mtime = mtime
+        self.body = body
+        self.gzip = gzip.compress(body, 9, mtime=0)
+        self.br = brotli.compress(body) if brotli is not None else None
+
+    @property
+    def fingerprinted(self):
+        stem, ext = os.path.splitext(self.name)
+        return f"{stem}.{self.digest}{ext}"
+
+    def encoded(self, accept_encodings):
+        """
+        (body, Content-Encoding or None) for the client's Accept-Encoding (a werkzeug Accept).
+        Encodings with q=0 are refused; br wins over gzip unless the client ranks gzip higher.
+        """
+        options = [(accept_encodings.quality(encoding), body, encoding)
+                   for body, encoding in ((self.br, 'br'), (self.gzip, 'gzip'))
+                   if body is not None and len(body) < len(self.body)]
+        quality, body, encoding = max(options, key=lambda option: option[0], default=(0, None, None))
+        if quality <= 0:
+            return self.body, None
+        return body, encoding
+
+    def etag(self, encoding):
+        # Each encoding is a different body, so it gets its own strong ETag
+        return self.digest + _ETAG_SUFFIXES[encoding]
+
+
+class AssetStore:
+    def __init__(self, static_folder, reload=False):
+        self.static_folder = static_folder
+        self.reload = reload
+        self._assets = {}
+
+    def get(self, name):
+        """The Asset for a path under static/ (css/x.css), None if there is no such asset."""
+        if name.split('/', 1)[0] not in ASSET_DIRS or '..' in name.split('/'):
+            return None
+        asset = self._assets.get(name)
+        if asset is not None and not self.reload:
+            return asset
+
+        path = os.path.join(self.static_folder, name)
+        try:
+            mtime = os.path.getmtime(path)
+            if asset is not None and asset.mtime == mtime:
+                return asset
+            with open(path, 'rb') as f:
+                body = f.read()
+        except OSError:
+            return None
+
+        # Two requests racing on a cold asset just build it twice
+        asset = self._assets[name] = Asset(name, body, mtime)
+        return asset
+
+    def build(self):
+        """Hashes and compresses every asset now instead of on its first request."""
+        names = []
+        for directory in ASSET_DIRS:
+            for entry in sorted(os.listdir(os.path.join(self.static_folder, directory))):
+                if self.get(f"{directory}/{entry}") is not None:
+                    names.append(f"{directory}/{entry}")
+        return names
+
+    def url(self, name, **query):
+        asset = self.get(name)
+        if asset is None:
+            raise ValueError(f"Unknown asset: {name}")
+        return url_for('main.asset', filename=asset.fingerprinted, **query)
+
+    def response(self, filename):
+        """Serves /assets/<filename>, with or without the fingerprint."""
+        match = _FINGERPRINT_RE.match(filename)
+        name, digest = filename, None
+        if match:
+            name, digest = match['stem'] + match['ext'], match['digest']
+
+        asset = self.get(name)
+        if asset is None and match:
+            # A name that merely looks fingerprinted
+            asset, digest = self.get(filename), None
+        if asset is None:
+            return None
+
+        body, encoding = asset.encoded(request.accept_encodings)
+        etag = asset.etag(encoding)
+        headers = {'Vary': 'Accept-Encoding', 'ETag': f'"{etag}"'}
+        # Old fingerprints (a page cached from before a deploy) get the current file, but not for long
+        headers['Cache-Control'] = IMMUTABLE if digest == asset.digest else 'no-cache'
+
+        if etag in request.if_none_match:
+            return Response(status=304, headers=headers)
+        if encoding:
+            headers['Content-Encoding'] = encoding
+        return Response(body, mimetype=asset.mimetype, headers=headers)
+
+
+ASSETS = AssetStore(os.path.join(os.path.dirname(__file__), 'static'))
@@ -1,133 +1,91 @@
-import json
+import functools
+import random
+
+from .sigaa_api.models import CourseGrades, CourseResult, Frequency
+from .grading import batch_status
+from . import ndjson
+
+# Demo stream for /demo. Either the four hand-picked courses below or a synthetic student
+# of any size (see demo_lines), always encoded with the same NDJSON encoders as the real stream.
+
+DEMO_NAME = "Aluno Demonstração"
+DEMO_PROGRAM = "Técnico em Informática"
+
+# Limits for the synthetic payload (query params of /api/stream_demo)
+MAX_COURSES = 300
+MAX_GROUPS = 8
+
+SYNTHETIC_TITLES = ['Matemática', 'Língua Portuguesa', 'Física', 'Química', 'Biologia', 'História',
+                    'Geografia', 'Filosofia', 'Sociologia', 'Educação Física', 'Artes', 'Inglês',
+                    'Lógica de Programação', 'Banco de Dados', 'Redes de Computadores', 'Programação Web']
+
 
 def get_demo_data():
     """
-    Generator that yields demo data messages similar to the real SIGAA stream.
+    The hand-picked demo courses, one per interesting dashboard state.
+    """
+    return [
+        # High Grades (Approved) - "Nerd Supremo" achievement candidate
+        CourseResult(1, "Matemática Aplicada", DEMO_PROGRAM,
+                     CourseGrades([10.0], [9.5, 10.0], [10.0], [9.0]),
+                     Frequency(2, 20, 2.5)),
+        # Struggling but surviving (Recovery S1)
+        CourseResult(2, "Física I", DEMO_PROGRAM,
+                     CourseGrades([4.0, 3.5], [5.0], [6.0, 5.5], [4.0], r1_note=7.5),
+                     Frequency(12, 20, 15.0)),
+        # Critical Failure (Frequency)
+        CourseResult(3, "Programação Web", DEMO_PROGRAM,
+                     CourseGrades([8.0], [7.5], [8.0], [9.0]),
+                     Frequency(25, 20, 31.2)),
+        # In Progress (Waiting for B4)
+        CourseResult(4, "Língua Portuguesa", DEMO_PROGRAM,
+                     CourseGrades([7.0], [6.5], [8.0], []),
+                     Frequency(8, 20, 10.0)),
+    ]
+
+
+def _note(rng):
+    return round(rng.triangular(0, 10, 7.5) * 2) / 2
+
+
+def synthetic_courses(courses, groups=2, seed=0):
+    """A deterministic synthetic student with `courses` courses and up to `groups` notes per bimester."""
+    rng = random.Random(seed)
+    results = []
+    for i in range(courses):
+        title = SYNTHETIC_TITLES[i % len(SYNTHETIC_TITLES)]
+        if i >= len(SYNTHETIC_TITLES):
+            title += f" {i // len(SYNTHETIC_TITLES) + 1}"
+
+        # Later bimesters may not be graded yet
+        graded = rng.randint(1, 4)
+        bimesters = [[_note(rng) for _ in range(rng.randint(1, groups))] if b < graded else []
+                     for b in range(4)]
+        r1 = _note(rng) if graded >= 2 and rng.random() < 0.3 else None
+        r2 = _note(rng) if graded == 4 and rng.random() < 0.3 else None
+
+        max_faltas = rng.choice((10, 15, 20, 30))
+        faltas = min(int(rng.expovariate(1 / (max_faltas * 0.3))), max_faltas * 2)
+        results.append(CourseResult(i + 1, title, DEMO_PROGRAM,
+                                    CourseGrades(*bimesters, r1_note=r1, r2_note=r2),
+                                    Frequency(faltas, max_faltas, faltas / (max_faltas * 4) * 100)))
+    return results
+
+
+@functools.lru_cache(maxsize=32)
+def demo_lines(courses=None, groups=2, frequency=True, seed=0):
+    """
+    Pre-serialized NDJSON lines (bytes) of a demo stream, built once per parameter set.
+    courses=None is the hand-picked demo.
     """
+    results = get_demo_data() if courses is None else synthetic_courses(courses, groups, seed)
+    for result, status in zip(results, batch_status([r.grades for r in results])):
+        result.status = status
 
-    # 1. User Info
-    yield {
-        "type": "user_info",
-        "name": "Aluno Demonstração",
-        "is_supporter": True
-    }
-
-    # Course 1: High Grades (Approved) - "Nerd Supremo" achievement candidate
-    c1_id = 1
-    yield {
-        "type": "course_start",
-        "id": c1_id,
-        "name": "Matemática Aplicada",
-        "obs": "Técnico em Informática"
-    }
-    yield {
-        "type": "course_data",
-        "id": c1_id,
-        "data": {
-            'b1Notes': [10.0],
-            'b2Notes': [9.5, 10.0],
-            'b3Notes': [10.0],
-            'b4Notes': [9.0],
-            'r1Note': None,
-            'r2Note': None
-        }
-    }
-    yield {
-        "type": "course_frequency",
-        "id": c1_id,
-        "data": {
-            "total_faltas": 2,
-            "max_faltas": 20,
-            "percent": 2.5
-        }
-    }
-
-    # Course 2: Struggling but surviving (Recovery)
-    c2_id = 2
-    yield {
-        "type": "course_start",
-        "id": c2_id,
-        "name": "Física I",
-        "obs": "Técnico em Informática"
-    }
-    yield {
-        "type": "course_data",
-        "id": c2_id,
-        "data": {
-            'b1Notes': [4.0, 3.5],
-            'b2Notes': [5.0],
-            'b3Notes': [6.0, 5.5],
-            'b4Notes': [4.0],
-            'r1Note': 7.5, # Recovery S1
-            'r2Note': None
-        }
-    }
-    yield {
-        "type": "course_frequency",
-        "id": c2_id,
-        "data": {
-            "total_faltas": 12,
-            "max_faltas": 20,
-            "percent": 15.0
-        }
-    }
-
-    # Course 3: Critical Failure (Frequency)
-    c3_id = 3
-    yield {
-        "type": "course_start",
-        "id": c3_id,
-        "name": "Programação Web",
-        "obs": "Técnico em Informática"
-    }
-    yield {
-        "type": "course_data",
-        "id": c3_id,
-        "data": {
-            'b1Notes': [8.0],
-            'b2Notes': [7.5],
-            'b3Notes': [8.0],
-            'b4Notes': [9.0],
-            'r1Note': None,
-            'r2Note': None
-        }
-    }
-    yield {
-        "type": "course_frequency",
-        "id": c3_id,
-        "data": {
-            "total_faltas": 25,
-            "max_faltas": 20,
-            "percent": 31.2
-        }
-    }
-
-    # Course 4: In Progress (Waiting for B4)
-    c4_id = 4
-    yield {
-        "type": "course_start",
-        "id": c4_id,
-        "name": "Língua Portuguesa",
-        "obs": "Técnico em Informática"
-    }
-    yield {
-        "type": "course_data",
-        "id": c4_id,
-        "data": {
-            'b1Notes': [7.0],
-            'b2Notes': [6.5],
-            'b3Notes': [8.0],
-            'b4Notes': [], # Missing
-            'r1Note': None,
-            'r2Note': None
-        }
-    }
-    yield {
-        "type": "course_frequency",
-        "id": c4_id,
-        "data": {
-            "total_faltas": 8,
-            "max_faltas": 20,
-            "percent": 10.0
-        }
-    }
+    lines = [ndjson.user_info_line(DEMO_NAME, True)]
+    for result in results:
+        lines.append(ndjson.course_start_line(result))
+        lines.append(ndjson.course_data_line(result))
+        if frequency:
+            lines.append(ndjson.course_frequency_line(result))
+    return tuple(line.encode() for line in lines)
@@ -0,0 +1,198 @@
+"""
+Exports a student's grades from the command line, through the same pipeline as /api/stream_grades
+(pooled connections, bonds scraped concurrently, course details in snapshot priority order).
+
+    SIGAA_USER=... SIGAA_PASS=... python -m app.export                  # NDJSON on stdout
+    python -m app.export --format csv --output notas.csv --frequency
+    python -m app.export --record sessao.jsonl.gz                        # also save a scrubbed cassette
+    python -m app.export --replay sessao.jsonl.gz                        # offline, no credentials needed
+
+Lines are the ones the dashboard receives (user_info, course_start, course_data, course_frequency).
+A summary of upstream requests, bytes and network/parse time goes to stderr.
+
+With --record or --replay every bond shares one SIGAA session, so a recorded cassette replays
+request for request. Replayed runs don't write to the grade history.
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import sys
+
+from dotenv import load_dotenv
+
+from . import history, ndjson, pipeline
+from .sigaa_api.metrics import start_request_stats
+
+SIGAA_URL = os.environ.get('SIGAA_URL', "https://sigaa.ifal.edu.br")
+
+CSV_FIELDS = ['id', 'vinculo', 'disciplina', 'n1', 'n2', 'n3', 'n4', 'rec1', 'rec2',
+              'pontos', 'falta', 'situacao', 'faltas', 'max_faltas', 'frequencia']
+
+
+class NdjsonWriter:
+    def __init__(self, out):
+        self.out = out
+
+    def write(self, line):
+        self.out.write(line)
+        self.out.flush()
+
+    def close(self):
+        pass
+
+
+class CsvWriter:
+    """One row per course, written once the stream is over (frequency comes after grades)."""
+
+    def __init__(self, out):
+        self.out = out
+        self.rows = {}
+
+    def write(self, line):
+        msg = json.loads(line)
+        kind = msg.get('type')
+        if kind == 'course_start':
+            self.rows[msg['id']] = {'id': msg['id'], 'vinculo': msg['obs'], 'disciplina': msg['name']}
+        elif kind == 'course_data':
+            data, status = msg['data'], msg.get('status') or {}
+            self.rows[msg['id']].update({
+                'n1': _first(data['b1Notes']), 'n2': _first(data['b2Notes']),
+                'n3': _first(data['b3Notes']), 'n4': _first(data['b4Notes']),
+                'rec1': data['r1Note'], 'rec2': data['r2Note'],
+                'pontos': status.get('total_score'), 'falta': _points(status.get('falta')),
+                'situacao': _situation(status),
+            })
+        elif kind == 'course_frequency':
+            data = msg['data']
+            self.rows[msg['id']].update({'faltas': data['total_faltas'], 'max_faltas': data['max_faltas'],
+                                         'frequencia': data['percent']})
+
+    def close(self):
+        writer = csv.DictWriter(self.out, CSV_FIELDS, lineterminator='\n')
+        writer.writeheader()
+        for _, row in sorted(self.rows.items()):
+            writer.writerow(row)
+        self.out.flush()
+
+
+def _first(notes):
+    return notes[0] if notes else None
+
+
+def _points(value):
+    # Rounded like total_score: the subtraction that gives `falta` leaves float noise (5.399999999999999)
+    return round(value, 2) if value is not None else None
+
+
+def _situation(status):
+    if not status:
+        return None
+    if status['final_ok']:
+        return 'Aprovado'
+    return 'Crítico' if status['isCritical'] else 'Cursando'
+
+
+async def export(args, username, password, writer):
+    # Imported here like in routes.py: --help shouldn't pay for aiohttp/bs4
+    from .sigaa_api.sigaa import Sigaa, InstitutionType
+    from .sigaa_api.session import SigaaSession
+    from .sigaa_api.transport import RecordingTransport, ReplayTransport, close_shared_connector
+
+    stats = start_request_stats()
+    sigaa = Sigaa(args.url, InstitutionType.IFAL,
+                  transport=ReplayTransport(args.replay) if args.replay else None)
+    if args.record:
+        sigaa.session.transport = RecordingTransport(sigaa.session.transport, args.record, redact=(username,))
+    bond_sessions = []
+
+    def open_session(bond_cookies):
+        bond_sessions.append(SigaaSession(args.url, cookies=bond_cookies))
+        return bond_sessions[-1]
+
+    try:
+        account = await sigaa.login(username, password)
+        if args.record:
+            sigaa.session.transport.redact_registrations(
+                *(getattr(bond, 'registration', None) for bond in account.active_bonds + account.inactive_bonds))
+        if not (args.record or args.replay):
+            # Same as the login route: one SIGAA login per bond with courses, so bonds are scraped in parallel
+            bonds = await sigaa.bond_sessions(account, username, password)
+            if len(bonds) > 1:
+                account.active_bonds = pipeline.restore_bonds(
+                    pipeline.bond_state(bonds), sigaa.session, open_session)
+
+        name = await account.get_name()
+        if args.record and name:
+            # Bond tables show it in capitals
+            sigaa.session.transport.redact(name, name.upper())
+        writer.write(ndjson.user_info_line(name, args.frequency))
+
+        async for line in pipeline.stream_bonds(account, args.frequency):
+            writer.write(line)
+    finally:
+        await sigaa.close()
+        for bond_session in bond_sessions:
+            await bond_session.close()
+        await close_shared_connector()
+    return stats
+
+
+def print_summary(stats, out=sys.stderr):
+    summary = stats.as_dict()
+    print(f"{summary['upstream_requests']} requisições, {summary['bytes'] / 1024:.1f} KB recebidos "
+          f"em {summary['total_ms'] / 1000:.2f} s", file=out)
+    # Requests overlap, so network time is the sum over requests and can exceed the total
+    print(f"  rede:   {summary['network_ms']:8.1f} ms (somado entre requisições)", file=out)
+    print(f"  parse:  {summary['parse_ms']:8.1f} ms", file=out)
+    for stage, ms in summary['stages_ms'].items():
+        print(f"  {stage}: {ms:8.1f} ms", file=out)
+
+
+def main(argv=None):
+    load_dotenv()
+    parser = argparse.ArgumentParser(prog='python -m app.export', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--format', choices=['ndjson', 'csv'], default='ndjson')
+    parser.add_argument('--output', '-o', help='file to write to (default: stdout)')
+    parser.add_argument('--frequency', action='store_true', help='also fetch attendance (one more page per course)')
+    parser.add_argument('--url', default=SIGAA_URL, help='SIGAA base URL (default: $SIGAA_URL or IFAL)')
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--record', metavar='CASSETTE', help='save the SIGAA exchanges to a scrubbed cassette')
+    source.add_argument('--replay', metavar='CASSETTE', help='serve SIGAA from a recorded cassette, offline')
+    parser.add_argument('--quiet', '-q', action='store_true', help='no timing summary on stderr')
+    args = parser.parse_args(argv)
+
+    username, password = os.getenv('SIGAA_USER'), os.getenv('SIGAA_PASS')
+    if args.replay:
+        # Credentials are scrubbed from cassettes, any value replays
+        username, password = username or 'replay', password or 'replay'
+        history.HISTORY = None
+    elif not username or not password:
+        print("Erro: Defina as variáveis de ambiente SIGAA_USER e SIGAA_PASS.", file=sys.stderr)
+        print("Exemplo: export SIGAA_USER=seu_usuario SIGAA_PASS=sua_senha", file=sys.stderr)
+        return 2
+
+    out = open(args.output, 'w', encoding='utf-8', newline='') if args.output else sys.stdout
+    writer = CsvWriter(out) if args.format == 'csv' else NdjsonWriter(out)
+    try:
+        stats = asyncio.run(export(args, username, password, writer))
+        writer.close()
+    except BrokenPipeError:
+        # Piped into head & co.
+        return 0
+    except Exception as e:
+        print(f"Falha na exportação: {type(e).__name__}: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if args.output:
+            out.close()
+
+    if not args.quiet:
+        print_summary(stats)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,211 @@
+import math
+
+# NumPy is only needed by batch_status and takes a while to import, so it is loaded on first use
+_numpy = None
+
+
+def _load_numpy():
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy
+            _numpy = numpy
+        except ImportError:  # Batch path falls back to the scalar engine
+            _numpy = False
+    return _numpy or None
+
+# Mirrors the pass/fail rules of static/js/grading.js (calculateSubjectStatus & friends).
+# Keep both sides in sync when IFAL changes the rules.
+
+ANNUAL_PASS_SCORE = 24
+SEMESTER_PASS_SCORE = 12
+PASS_AVERAGE = 6.0
+
+STATUS_NONE = 'S/N'
+STATUS_PARTIAL = 'Parcial'
+STATUS_FAILED = 'Reprovado'
+STATUS_DONE = 'Concluído'
+
+# Index -> label for the vectorized path
+_STATUS_LABELS = (STATUS_NONE, STATUS_PARTIAL, STATUS_FAILED, STATUS_DONE)
+
+
+class SubjectStatus:
+    __slots__ = ('s1_status', 's2_status', 's1_total', 's2_total', 'total_score',
+                 'is_critical', 'final_ok', 'rounded_final_avg', 'falta', 'min_needed')
+
+    def __init__(self, s1_status, s2_status, s1_total, s2_total, total_score,
+                 is_critical, final_ok, rounded_final_avg, falta, min_needed):
+        self.s1_status = s1_status
+        self.s2_status = s2_status
+        self.s1_total = s1_total
+        self.s2_total = s2_total
+        self.total_score = total_score
+        self.is_critical = is_critical
+        self.final_ok = final_ok
+        self.rounded_final_avg = rounded_final_avg
+        self.falta = falta
+        self.min_needed = min_needed
+
+    def __eq__(self, other):
+        if not isinstance(other, SubjectStatus):
+            return NotImplemented
+        return all(getattr(self, attr) == getattr(other, attr) for attr in self.__slots__)
+
+    def __repr__(self):
+        return (f"<SubjectStatus s1='{self.s1_status}' s2='{self.s2_status}' "
+                f"total={self.total_score} final_ok={self.final_ok}>")
+
+
+def round_sigga(val):
+    # Nearest 0.0 or 0.5, halves rounded up like Math.round in the dashboard
+    return math.floor(val * 2 + 0.5) / 2
+
+
+def bimester_average(notes):
+    """Returns (average, has_notes) for one bimester."""
+    if not notes:
+        return 0.0, False
+    return round_sigga(sum(notes) / len(notes)), True
+
+
+def apply_recovery(avg_a, avg_b, r_note):
+    """Recovery replaces the lowest bimester of the semester if it is higher."""
+    current_total = avg_a + avg_b
+    if r_note is None or r_note != r_note:
+        return current_total, False
+
+    min_score = min(avg_a, avg_b)
+    if r_note > min_score:
+        return current_total - min_score + r_note, True
+    return current_total, False
+
+
+def _semester_status(total, has_a, has_b, r_note):
+    if not (has_a or has_b or r_note is not None):
+        return STATUS_NONE
+    if total >= SEMESTER_PASS_SCORE:
+        return STATUS_DONE
+    if has_a and has_b:
+        return STATUS_FAILED
+    return STATUS_PARTIAL
+
+
+def _min_needed(final_ok, falta, remaining):
+    # Average still needed on each bimester without notes to reach the annual score.
+    # None when every bimester is already graded (only recovery can help).
+    if final_ok:
+        return 0.0
+    if remaining == 0:
+        return None
+    return round(falta / remaining, 2)
+
+
+def subject_status(grades):
+    """Computes the final status of one course from its CourseGrades."""
+    b1, has_b1 = bimester_average(grades.b1_notes)
+    b2, has_b2 = bimester_average(grades.b2_notes)
+    b3, has_b3 = bimester_average(grades.b3_notes)
+    b4, has_b4 = bimester_average(grades.b4_notes)
+
+    s1_total = round(apply_recovery(b1, b2, grades.r1_note)[0], 2)
+    s2_total = round(apply_recovery(b3, b4, grades.r2_note)[0], 2)
+    total_score = round(s1_total + s2_total, 2)
+
+    s1_status = _semester_status(s1_total, has_b1, has_b2, grades.r1_note)
+    s2_status = _semester_status(s2_total, has_b3, has_b4, grades.r2_note)
+
+    rounded_final_avg = round_sigga(total_score / 4)
+    final_ok = (s1_status == STATUS_DONE and s2_status == STATUS_DONE) or rounded_final_avg >= PASS_AVERAGE
+    is_critical = not final_ok and (s1_status == STATUS_FAILED or s2_status == STATUS_FAILED)
+    falta = 0 if final_ok else max(0, ANNUAL_PASS_SCORE - total_score)
+
+    remaining = 4 - (has_b1 + has_b2 + has_b3 + has_b4)
+    return SubjectStatus(
+        s1_status, s2_status, s1_total, s2_total, total_score,
+        is_critical, final_ok, rounded_final_avg, falta,
+        _min_needed(final_ok, falta, remaining)
+    )
+
+
+def card_badges(name, grades):
+    """Icons of the achievements shown on a course card (BADGE_ACHIEVEMENTS in grading.js), in order."""
+    notes = grades.b1_notes + grades.b2_notes + grades.b3_notes + grades.b4_notes
+    averages = [bimester_average(n)[0] for n in (grades.b1_notes, grades.b2_notes, grades.b3_notes, grades.b4_notes)]
+    badges = []
+    # mestre_calc
+    if 'Matemática' in name and any(a > 8 and b > 8 for a, b in zip(averages, averages[1:])):
+        badges.append('📘')
+    # caneta_ouro
+    if any(word in name for word in ('Português', 'Redação', 'Língua Portuguesa')) and 10 in notes:
+        badges.append('📘')
+    # sobrevivente
+    if grades.r1_note or grades.r2_note:
+        badges.append('🔥')
+    # mago_rec
+    if grades.r1_note == 10 or grades.r2_note == 10:
+        badges.append('🌟')
+    return badges
+
+
+def batch_status(grades_list):
+    """
+    Computes statuses for many courses at once (e.g. every course of every cached snapshot).
+    Uses NumPy when available; results are identical to calling subject_status on each item.
+    """
+    np = _load_numpy() if grades_list else None
+    if np is None:
+        return [subject_status(g) for g in grades_list]
+
+    n = len(grades_list)
+    sums = np.zeros((n, 4))
+    counts = np.zeros((n, 4))
+    recovery = np.full((n, 2), np.nan)
+
+    for i, g in enumerate(grades_list):
+        for j, notes in enumerate((g.b1_notes, g.b2_notes, g.b3_notes, g.b4_notes)):
+            if notes:
+                sums[i, j] = sum(notes)
+                counts[i, j] = len(notes)
+        if g.r1_note is not None:
+            recovery[i, 0] = g.r1_note
+        if g.r2_note is not None:
+            recovery[i, 1] = g.r2_note
+
+    has_notes = counts > 0
+    averages = np.where(has_notes, np.floor(sums / np.maximum(counts, 1) * 2 + 0.5) / 2, 0.0)
+
+    def semester(a, b, r, has_a, has_b):
+        current = averages[:, a] + averages[:, b]
+        lowest = np.minimum(averages[:, a], averages[:, b])
+        has_r = ~np.isnan(recovery[:, r])
+        use = has_r & (np.nan_to_num(recovery[:, r], nan=-np.inf) > lowest)
+        total = np.round(np.where(use, current - lowest + np.nan_to_num(recovery[:, r]), current), 2)
+
+        # 0 = S/N, 1 = Parcial, 2 = Reprovado, 3 = Concluído
+        status = np.where(has_a & has_b, 2, 1)
+        status = np.where(total >= SEMESTER_PASS_SCORE, 3, status)
+        status = np.where(has_a | has_b | has_r, status, 0)
+        return total, status
+
+    s1_total, s1_code = semester(0, 1, 0, has_notes[:, 0], has_notes[:, 1])
+    s2_total, s2_code = semester(2, 3, 1, has_notes[:, 2], has_notes[:, 3])
+    total_score = np.round(s1_total + s2_total, 2)
+
+    rounded_final_avg = np.floor(total_score / 4 * 2 + 0.5) / 2
+    final_ok = ((s1_code == 3) & (s2_code == 3)) | (rounded_final_avg >= PASS_AVERAGE)
+    is_critical = ~final_ok & ((s1_code == 2) | (s2_code == 2))
+    falta = np.where(final_ok, 0, np.maximum(0, ANNUAL_PASS_SCORE - total_score))
+    remaining = 4 - has_notes.sum(axis=1)
+
+    results = []
+    for i in range(n):
+        ok = bool(final_ok[i])
+        f = 0 if ok else float(falta[i])
+        results.append(SubjectStatus(
+            _STATUS_LABELS[s1_code[i]], _STATUS_LABELS[s2_code[i]],
+            float(s1_total[i]), float(s2_total[i]), float(total_score[i]),
+            bool(is_critical[i]), ok, float(rounded_final_avg[i]), f,
+            _min_needed(ok, f, int(remaining[i]))
+        ))
+    return results
@@ -0,0 +1,214 @@
+import concurrent.futures
+import json
+import logging
+import os
+import sqlite3
+import time
+
+from . import ndjson
+
+logger = logging.getLogger(__name__)
+
+# Opt-in history of each student's grades, in a local SQLite file (HISTORY_DB, off when empty).
+# A row is written only when a course's grades or frequency differ from the last stored value,
+# and only the part that changed is stored (the other column stays NULL). The last value of each
+# course is also kept in `latest`, so neither a write nor "changes since" reads a whole history.
+#
+# Retention: changes older than HISTORY_RETENTION_DAYS are purged, and so is everything about a
+# student not seen for that long. The privacy page states the period when the history is on.
+#
+# Streams tag each fetched course with whether its grades differ from `latest` (pipeline.recorded_grades),
+# read on the writer thread too, so a stream always sees what the previous one wrote.
+#
+# Writes never run on the shared event loop thread: record_later() hands them to a single writer
+# thread (on_writer_thread, shared with app/archive.py), which owns the write connections. Readers
+# open their own connection; WAL keeps them from blocking the writer. On hosts with an ephemeral
+# disk the history starts over on each deploy.
+
+HISTORY_DB = os.environ.get('HISTORY_DB', '')
+RETENTION_DAYS = float(os.environ.get('HISTORY_RETENTION_DAYS', 180))
+# How often the writer looks for expired rows
+PURGE_INTERVAL = 3600
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS changes (
+    registration TEXT NOT NULL,
+    course TEXT NOT NULL,
+    recorded_at REAL NOT NULL,
+    name TEXT NOT NULL,
+    grades TEXT,
+    frequency TEXT
+);
+CREATE INDEX IF NOT EXISTS changes_by_student ON changes (registration, recorded_at);
+-- "Value at since" lookups, one per column: a course's grades can be far back behind frequency-only rows
+CREATE INDEX IF NOT EXISTS grades_by_course ON changes (registration, course, recorded_at) WHERE grades IS NOT NULL;
+CREATE INDEX IF NOT EXISTS frequency_by_course ON changes (registration, course, recorded_at) WHERE frequency IS NOT NULL;
+CREATE INDEX IF NOT EXISTS changes_by_time ON changes (recorded_at);
+CREATE TABLE IF NOT EXISTS latest (
+    registration TEXT NOT NULL,
+    course TEXT NOT NULL,
+    name TEXT NOT NULL,
+    grades TEXT,
+    frequency TEXT,
+    PRIMARY KEY (registration, course)
+);
+CREATE TABLE IF NOT EXISTS students (
+    registration TEXT PRIMARY KEY,
+    seen_at REAL NOT NULL
+);
+"""
+
+_UPSERT_LATEST = """
+INSERT INTO latest VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (registration, course) DO UPDATE SET
+    name = excluded.name,
+    grades = COALESCE(excluded.grades, grades),
+    frequency = COALESCE(excluded.frequency, frequency)
+"""
+
+_writer_thread = None
+
+
+def on_writer_thread(fn, *args):
+    """Runs fn(*args) on the thread that does all the SQLite work on HISTORY_DB; returns a Future."""
+    global _writer_thread
+    if _writer_thread is None:
+        _writer_thread = concurrent.futures.ThreadPoolExecutor(1, thread_name_prefix='history')
+    return _writer_thread.submit(fn, *args)
+
+
+class History:
+    def __init__(self, path, retention_days=RETENTION_DAYS):
+        self.path = path
+        self.retention = retention_days * 86400
+        self._writer = None
+        self._purged_at = 0.0
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.executescript(_SCHEMA)
+        return conn
+
+    def record_later(self, registration, results):
+        """record() on the writer thread; returns at once (the stream doesn't wait for the disk)."""
+        return on_writer_thread(self._record_logged, registration, results)
+
+    def _record_logged(self, registration, results):
+        try:
+            return self.record(registration, results)
+        except Exception as e:
+            # History is best effort, never break anything for it
+            logger.error(f"Error recording grade history: {type(e).__name__}: {e}")
+
+    def record(self, registration, results, now=None):
+        """
+        Appends what changed among results, a list of (course key, CourseResult).
+        Returns the keys whose grades changed (a course seen for the first time counts).
+        Only call it from one thread at a time (see record_later).
+        """
+        if not results:
+            return []
+        now = now or time.time()
+        if self._writer is None:
+            self._writer = self._connect()
+        conn = self._writer
+
+        latest = {course: (grades, frequency) for course, grades, frequency in conn.execute(
+            'SELECT course, grades, frequency FROM latest WHERE registration = ?', (registration,))}
+        rows, changed = [], []
+        for key, result in results:
+            grades = ndjson.grades_json(result.grades) if result.grades is not None else None
+            frequency = ndjson.frequency_json(result.frequency) if result.frequency else None
+            previous = latest.get(key, (None, None))
+
+            grades = grades if grades != previous[0] else None
+            frequency = frequency if frequency != previous[1] else None
+            if grades is None and frequency is None:
+                continue
+            if grades is not None:
+                changed.append(key)
+            rows.append((registration, key, now, result.name, grades, frequency))
+
+        with conn:
+            conn.execute('INSERT OR REPLACE INTO students VALUES (?, ?)', (registration, now))
+            if rows:
+                conn.executemany('INSERT INTO changes VALUES (?, ?, ?, ?, ?, ?)', rows)
+                conn.executemany(_UPSERT_LATEST, [(reg, key, name, grades, frequency)
+                                                  for reg, key, _, name, grades, frequency in rows])
+        if now - self._purged_at > PURGE_INTERVAL:
+            self.purge(now)
+        return changed
+
+    def latest_grades(self, registration):
+        """
+        {course key: grades JSON} as last recorded for the student. Run it on the writer thread
+        (on_writer_thread), so it comes after every record_later() already handed over.
+        """
+        if self._writer is None:
+            self._writer = self._connect()
+        return dict(self._writer.execute('SELECT course, grades FROM latest WHERE registration = ? '
+                                         'AND grades IS NOT NULL', (registration,)))
+
+    def purge(self, now=None):
+        """Drops changes older than the retention period, and students not seen in that period."""
+        now = now or time.time()
+        if self._writer is None:
+            self._writer = self._connect()
+        cutoff = now - self.retention
+        with self._writer as conn:
+            conn.execute('DELETE FROM changes WHERE recorded_at < ?', (cutoff,))
+            gone = [row[0] for row in conn.execute('SELECT registration FROM students WHERE seen_at < ?', (cutoff,))]
+            for table in ('changes', 'latest', 'students'):
+                conn.executemany(f'DELETE FROM {table} WHERE registration = ?', [(reg,) for reg in gone])
+        self._purged_at = now
+
+    def changes_since(self, registration, since):
+        """
+        Courses whose grades or frequency changed after `since` (unix time), each with the
+        value it had at `since` (None if unknown then) and the current one.
+        """
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            # Only the rows after `since` (a range of changes_by_student), however long the history is
+            moved = {}
+            for course, recorded_at in conn.execute('SELECT course, recorded_at FROM changes INDEXED BY changes_by_student '
+                                                    'WHERE registration = ? AND recorded_at > ?', (registration, since)):
+                moved[course] = max(recorded_at, moved.get(course, recorded_at))
+            changes = []
+            for course, changed_at in moved.items():
+                current = conn.execute('SELECT name, grades, frequency FROM latest '
+                                       'WHERE registration = ? AND course = ?', (registration, course)).fetchone()
+                if current is None:
+                    continue
+                entry = {'course': course, 'name': current[0], 'changed_at': changed_at,
+                         'grades': current[1], 'frequency': current[2]}
+                for column in ('grades', 'frequency'):
+                    # Last value stored at or before `since`
+                    row = conn.execute(f'SELECT {column} FROM changes WHERE registration = ? AND course = ? '
+                                       f'AND recorded_at <= ? AND {column} IS NOT NULL '
+                                       f'ORDER BY recorded_at DESC LIMIT 1', (registration, course, since)).fetchone()
+                    entry['previous_' + column] = row[0] if row else None
+                changes.append(entry)
+        except sqlite3.OperationalError:
+            # No history written yet
+            return []
+        finally:
+            conn.close()
+
+        found = []
+        for entry in changes:
+            # Only report the parts that actually moved
+            for column in ('grades', 'frequency'):
+                if entry[column] == entry['previous_' + column]:
+                    entry[column] = entry['previous_' + column] = None
+                for key in (column, 'previous_' + column):
+                    if entry[key] is not None:
+                        entry[key] = json.loads(entry[key])
+            if entry['grades'] is not None or entry['frequency'] is not None:
+                found.append(entry)
+        return sorted(found, key=lambda entry: entry['changed_at'])
+
+
+HISTORY = History(HISTORY_DB) if HISTORY_DB else None
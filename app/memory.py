@@ -0,0 +1,94 @@
+import logging
+import os
+import random
+import resource
+import threading
+import tracemalloc
+
+from .sigaa_api.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Sampled per-stream memory accounting.
+# tracemalloc slows allocations down noticeably, so it only runs while at least one
+# sampled stream is active (MEMORY_SAMPLE_RATE, 0.0 - 1.0).
+
+PEAK_BYTES = REGISTRY.histogram(
+    'sigaa_stream_peak_memory_bytes', 'Peak traced memory during a sampled stream.',
+    buckets=(1e6, 2e6, 5e6, 10e6, 20e6, 50e6, 100e6, 200e6, 500e6))
+
+_lock = threading.Lock()
+_active_trackers = 0
+
+
+def process_rss():
+    """Current resident set size in bytes (peak RSS where /proc is not available)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        # ru_maxrss is in KB on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+REGISTRY.gauge('process_resident_memory_bytes', 'Resident memory size in bytes.', process_rss)
+
+
+def _sample_rate():
+    value = os.environ.get('MEMORY_SAMPLE_RATE', '')
+    try:
+        return float(value or 0)
+    except ValueError:
+        logger.warning(f"Ignoring invalid MEMORY_SAMPLE_RATE={value!r}, memory tracking is off")
+        return 0.0
+
+
+# Read once: should_track() runs at the start of every stream
+SAMPLE_RATE = _sample_rate()
+
+
+def should_track():
+    return SAMPLE_RATE > 0 and random.random() < SAMPLE_RATE
+
+
+class MemoryTracker:
+    """
+    Measures the peak traced memory while a stream runs.
+    tracemalloc is process wide: with concurrent sampled streams the peak covers all of them,
+    which is still the number that matters for the worker's RAM limit.
+    """
+
+    def __init__(self):
+        self.baseline = 0
+        self.peak = 0
+        self.running = False
+
+    def start(self):
+        global _active_trackers
+        with _lock:
+            self.running = True
+            if _active_trackers == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start()
+            _active_trackers += 1
+            tracemalloc.reset_peak()
+            self.baseline = tracemalloc.get_traced_memory()[0]
+        return self
+
+    def stop(self):
+        """Peak bytes since start(). Safe to call again: only the first call releases tracemalloc."""
+        global _active_trackers
+        with _lock:
+            if not self.running:
+                return self.peak
+            self.running = False
+            current, peak = tracemalloc.get_traced_memory()
+            self.peak = max(0, peak - self.baseline)
+            _active_trackers -= 1
+            if _active_trackers == 0:
+                tracemalloc.stop()
+
+        PEAK_BYTES.observe(self.peak)
+        from .sigaa_api.page import retained_pages_report
+        logger.info(f"Stream peak memory: {self.peak / 1024:.0f} KB, RSS: {process_rss() / 1048576:.1f} MB, "
+                    f"largest retained pages: {retained_pages_report()}")
+        return self.peak
@@ -0,0 +1,133 @@
+import json
+from json.encoder import encode_basestring_ascii as _str
+
+# Pre-built encoders for the NDJSON stream messages.
+# Output is byte-for-byte what json.dumps(msg) + "\n" produced for the old dict messages
+# (default separators, ensure_ascii), without building the intermediate dict trees.
+
+_dumps = json.JSONEncoder().encode
+
+
+def _num(value):
+    if value is None:
+        return 'null'
+    return repr(value)
+
+
+def _notes(notes):
+    if not notes:
+        return '[]'
+    return '[' + ', '.join(map(repr, notes)) + ']'
+
+
+def _bool(value):
+    return 'true' if value else 'false'
+
+
+def dumps_line(obj):
+    """Generic fallback for messages without a dedicated encoder."""
+    return _dumps(obj) + "\n"
+
+
+def error_line(message):
+    return '{"error": ' + _str(message) + '}\n'
+
+
+def busy_line(retry_after):
+    return '{"type": "busy", "retry_after": ' + repr(retry_after) + '}\n'
+
+
+def user_info_line(name, is_supporter):
+    return ('{"type": "user_info", "name": ' + (_str(name) if name is not None else 'null') +
+            ', "is_supporter": ' + _bool(is_supporter) + '}\n')
+
+
+def course_start_line(course):
+    line = ('{"type": "course_start", "id": ' + repr(course.id) +
+            ', "name": ' + _str(course.name) +
+            ', "obs": ' + (_str(course.obs) if course.obs is not None else 'null'))
+    if course.key is not None:
+        line += ', "key": ' + _str(course.key)
+    return line + '}\n'
+
+
+def grades_json(grades):
+    return ('{"b1Notes": ' + _notes(grades.b1_notes) +
+            ', "b2Notes": ' + _notes(grades.b2_notes) +
+            ', "b3Notes": ' + _notes(grades.b3_notes) +
+            ', "b4Notes": ' + _notes(grades.b4_notes) +
+            ', "r1Note": ' + _num(grades.r1_note) +
+            ', "r2Note": ' + _num(grades.r2_note) + '}')
+
+
+def frequency_json(frequency):
+    # dates: [["2025-02-05", 0], ...], one pair (lesson date, absences) per registered lesson
+    return ('{"total_faltas": ' + repr(frequency.total_faltas) +
+            ', "max_faltas": ' + repr(frequency.max_faltas) +
+            ', "percent": ' + repr(frequency.percent) +
+            ', "total_classes": ' + repr(frequency.total_classes) +
+            ', "lessons": ' + repr(frequency.lessons) +
+            ', "bimesters": ' + _notes(frequency.bimesters) +
+            ', "dates": [' + ', '.join(['["' + day + '", ' + repr(absences) + ']'
+                                        for day, absences in frequency.dates]) + ']}')
+
+
+def status_json(status):
+    # Keys match the object returned by calculateSubjectStatus in static/js/grading.js
+    return ('{"s1_status": ' + _str(status.s1_status) +
+            ', "s2_status": ' + _str(status.s2_status) +
+            ', "s1_total": ' + repr(status.s1_total) +
+            ', "s2_total": ' + repr(status.s2_total) +
+            ', "total_score": ' + repr(status.total_score) +
+            ', "isCritical": ' + _bool(status.is_critical) +
+            ', "final_ok": ' + _bool(status.final_ok) +
+            ', "roundedFinalAvg": ' + repr(status.rounded_final_avg) +
+            ', "falta": ' + repr(status.falta) +
+            ', "min_needed": ' + _num(status.min_needed) + '}')
+
+
+def course_data_line(course, cached=False, changed=None):
+    # cached: last known values from the snapshot store (lazy stream), not fetched now
+    # changed: grades differ from the grade history's; None (left out) when there's no history to compare with
+    line = ('{"type": "course_data", "id": ' + repr(course.id) +
+            ', "data": ' + grades_json(course.grades))
+    if course.status is not None:
+        line += ', "status": ' + status_json(course.status)
+    if cached:
+        line += ', "cached": true'
+    if changed is not None:
+        line += ', "changed": ' + _bool(changed)
+    return line + '}\n'
+
+
+def course_frequency_line(course):
+    return ('{"type": "course_frequency", "id": ' + repr(course.id) +
+            ', "data": ' + frequency_json(course.frequency) + '}\n')
+
+
+def snapshot_course_json(course):
+    """One course of the dashboard's inline snapshot, in the shape of its course store."""
+    grades = grades_json(course.grades)
+    return ('{"id": ' + repr(course.id) +
+            ', "name": ' + _str(course.name) +
+            ', "obs": ' + (_str(course.obs) if course.obs is not None else 'null') +
+            ', ' + grades[1:-1] +
+            ', "serverStatus": ' + (status_json(course.status) if course.status is not None else 'null') +
+            ', "frequency": ' + (frequency_json(course.frequency) if course.frequency else 'null') + '}')
+
+
+def past_term_line(period, courses, cached):
+    """A past term with its courses; cached when it came from the archive without hitting SIGAA."""
+    return ('{"type": "past_term", "period": ' + _str(period) +
+            ', "cached": ' + _bool(cached) +
+            ', "courses": [' + ', '.join(map(snapshot_course_json, courses)) + ']}\n')
+
+
+def course_json(course, changed=None):
+    """One course fetched on demand (/api/course/<key>): grades, status and frequency together."""
+    return ('{"key": ' + _str(course.key) +
+            ', "name": ' + _str(course.name) +
+            ', "data": ' + grades_json(course.grades) +
+            ', "status": ' + (status_json(course.status) if course.status is not None else 'null') +
+            ', "frequency": ' + (frequency_json(course.frequency) if course.frequency else 'null') +
+            (', "changed": ' + _bool(changed) if changed is not None else '') + '}')
@@ -0,0 +1,373 @@
+import asyncio
+import collections
+import contextlib
+import itertools
+import logging
+
+from .sigaa_api.models import CourseGrades, CourseResult
+from .grading import subject_status
+from . import archive, history, ndjson, snapshots
+
+logger = logging.getLogger(__name__)
+
+# Seconds a grade stream waits for a past terms crawl on its session to stop (see SessionGuard)
+CRAWL_STOP_TIMEOUT = 30
+
+# The grade stream, in two phases per bond:
+#   1. as soon as the course list is known, every course_start goes out at once (skeleton rows);
+#   2. grades (and frequency, for supporters) are fetched course by course, most likely
+#      to have changed first according to the student's last snapshot.
+# Same upstream requests as fetching in page order, only the order differs.
+#
+# Bonds with their own SIGAA session (see Sigaa.bond_sessions) are scraped concurrently and their
+# lines merged as they come; bonds sharing a session take turns, since switching bonds changes
+# the session's state on the server.
+#
+# Past terms have their own stream (past_term_lines), served from app/archive.py and crawled
+# only where the archive is missing or may be out of date. It never runs alongside a grade stream
+# on the same SIGAA session (SessionGuard).
+#
+# Lazy streams (lazy=True) send the last known values of the snapshot store instead of fetching
+# them, marked as cached; only courses the store doesn't know are fetched. The dashboard then
+# refreshes a course when it's opened, through course_details (/api/course/<key>).
+
+
+def process_grades(raw_grades):
+
+    notes = {'1': (), '2': (), '3': (), '4': ()}
+    repos = []
+
+    for item in raw_grades:
+        name = item.name.strip()
+
+        # Groups expose the last filled sub-grade as their value
+        val = item.value
+        if val is None:
+            continue
+
+        try:
+            val = float(val)
+        except (ValueError, TypeError):
+            continue
+
+        if name in notes:
+            notes[name] = (val,)
+        elif 'Reposição' in name or 'Recuperação' in name:
+            repos.append(val)
+
+    return CourseGrades(
+        notes['1'], notes['2'], notes['3'], notes['4'],
+        r1_note=repos[0] if len(repos) > 0 else None,
+        r2_note=repos[1] if len(repos) > 1 else None
+    )
+
+
+def course_key(course):
+    # idTurma is stable across logins; the title is a fallback for pages without it
+    return course.id or course.title
+
+
+def fetch_order(courses, registration, store=snapshots.STORE):
+    """Indexes of courses in the order their details should be fetched."""
+    known = store.get(registration)
+    return sorted(range(len(courses)),
+                  key=lambda i: (snapshots.priority(known.get(course_key(courses[i]))), i))
+
+
+async def fetch_grades(course, result):
+    """Fills result.grades/status; False if SIGAA failed (the result then shows no grades)."""
+    result.grades = CourseGrades()
+    ok = True
+    try:
+        raw_grades = await course.get_grades()
+        if raw_grades:
+            result.grades = process_grades(raw_grades)
+    except Exception as e:
+        logger.error(f"Error fetching grades for {course.title}: {type(e).__name__}")
+        ok = False
+    result.status = subject_status(result.grades)
+    return ok
+
+
+async def fetch_frequency(course, result):
+    try:
+        result.frequency = await course.get_frequency()
+    except Exception as e:
+        logger.error(f"Error fetching frequency for {course.title}: {type(e).__name__}")
+
+
+def bond_state(bond_sessions):
+    """What the Flask session keeps of Sigaa.bond_sessions() to rebuild the bonds on each stream."""
+    return [{'registration': bond.registration, 'program': bond.program, 'switch_url': bond.switch_url,
+             'cookies': cookies} for bond, cookies in bond_sessions]
+
+
+def restore_bonds(state, shared_session, open_session):
+    """StudentBonds from bond_state(); open_session(cookies) gives each stored login its own session."""
+    from .sigaa_api.bond import StudentBond
+
+    return [StudentBond(open_session(item['cookies']) if item['cookies'] else shared_session,
+                        item['registration'], item['program'], item['switch_url'])
+            for item in state]
+
+
+async def recorded_grades(registration):
+    """
+    {course key: grades JSON} from the grade history, to tag the courses whose grades changed;
+    None when the history is off. Read on the history's thread, after the writes already queued there.
+    """
+    if history.HISTORY is None:
+        return None
+    try:
+        return await asyncio.wrap_future(history.on_writer_thread(history.HISTORY.latest_grades, registration))
+    except Exception as e:
+        logger.error(f"Error reading grade history: {type(e).__name__}: {e}")
+        return None
+
+
+def grades_changed(recorded, key, result, ok):
+    """Whether a fetched course's grades differ from the history's; None when there's nothing to compare with."""
+    if recorded is None:
+        return None
+    # A failed fetch shows no grades, that's not a change; nor is a course seen for the first time
+    previous = recorded.get(key)
+    return ok and previous is not None and previous != ndjson.grades_json(result.grades)
+
+
+def record_history(registration, fetched):
+    # Written on the history's own thread, the event loop never waits for SQLite
+    if history.HISTORY is not None and fetched:
+        history.HISTORY.record_later(registration, fetched)
+
+
+def cached_result(snapshot, is_supporter):
+    """The snapshot's values if a lazy stream can send them as they are, else None."""
+    if snapshot is None or snapshot.result.grades is None:
+        return None
+    # Stored by a stream without frequency: a supporter still needs it fetched
+    if is_supporter and not snapshot.result.frequency:
+        return None
+    return snapshot.result
+
+
+async def bond_lines(bond, is_supporter, ids, store=snapshots.STORE, lazy=False):
+    """NDJSON lines of one bond: every course_start, then details in fetch_order()."""
+    courses = await bond.get_courses()
+    if not courses:
+        return
+    store.retain(bond.registration, [course_key(course) for course in courses])
+
+    # Ids are unique across bonds, the dashboard keys rows by id
+    results = [CourseResult(next(ids), course.title, bond.program, key=course_key(course)) for course in courses]
+    for result in results:
+        yield ndjson.course_start_line(result)
+
+    known = store.get(bond.registration) if lazy else {}
+    recorded = await recorded_grades(bond.registration)
+    fetched = []
+    try:
+        for i in fetch_order(courses, bond.registration, store):
+            course, result = courses[i], results[i]
+            cached = cached_result(known.get(result.key), is_supporter)
+            if cached is not None:
+                result.grades, result.status, result.frequency = cached.grades, cached.status, cached.frequency
+                yield ndjson.course_data_line(result, cached=True)
+                if is_supporter:
+                    yield ndjson.course_frequency_line(result)
+                continue
+
+            ok = await fetch_grades(course, result)
+            yield ndjson.course_data_line(result, changed=grades_changed(recorded, result.key, result, ok))
+
+            # Fetch Frequency (Only for Supporters)
+            if is_supporter:
+                await fetch_frequency(course, result)
+                if result.frequency:
+                    yield ndjson.course_frequency_line(result)
+
+            # A failed fetch is not a change to remember
+            if ok:
+                store.update(bond.registration, course_key(course), result)
+                fetched.append((course_key(course), result))
+    finally:
+        # One write per bond, also when the client leaves halfway
+        record_history(bond.registration, fetched)
+
+
+async def stream_bonds(account, is_supporter, store=snapshots.STORE, lazy=False):
+    """NDJSON lines for every course of the account's active bonds."""
+    ids = itertools.count(1)
+
+    # Bonds sharing a session run in page order within one worker
+    workers = {}
+    for bond in account.active_bonds:
+        workers.setdefault(id(bond.session), []).append(bond)
+
+    if len(workers) < 2:
+        for bond in account.active_bonds:
+            async for line in bond_lines(bond, is_supporter, ids, store, lazy):
+                yield line
+        return
+
+    queue = asyncio.Queue()
+    done = object()
+
+    async def work(bonds):
+        try:
+            for bond in bonds:
+                async for line in bond_lines(bond, is_supporter, ids, store, lazy):
+                    await queue.put(line)
+        finally:
+            await queue.put(done)
+
+    tasks = [asyncio.ensure_future(work(bonds)) for bonds in workers.values()]
+    try:
+        running = len(tasks)
+        while running:
+            line = await queue.get()
+            if line is done:
+                running -= 1
+            else:
+                yield line
+    finally:
+        # Client went away: stop the other bonds too
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    # One bond failing doesn't cut the others short, but the stream still reports it
+    for task in tasks:
+        if task.exception() is not None:
+            raise task.exception()
+
+
+async def course_details(account, key, is_supporter, store=snapshots.STORE):
+    """
+    Fetches one course (by course_key) of the account's bonds, for /api/course/<key>.
+    Returns (CourseResult, ok, changed as in grades_changed), or None if no active bond has the course.
+    """
+    for bond in account.active_bonds:
+        course = next((course for course in await bond.get_courses() if course_key(course) == key), None)
+        if course is None:
+            continue
+
+        result = CourseResult(None, course.title, bond.program, key=key)
+        recorded = await recorded_grades(bond.registration)
+        ok = await fetch_grades(course, result)
+        if is_supporter:
+            await fetch_frequency(course, result)
+
+        previous = store.get(bond.registration).get(key)
+        if ok and previous is not None:
+            # Same row as in the student's last stream (snapshots are ordered by id)
+            result.id = previous.result.id
+            store.update(bond.registration, key, result)
+        if ok:
+            record_history(bond.registration, [(key, result)])
+        return result, ok, grades_changed(recorded, key, result, ok)
+    return None
+
+
+async def past_term_lines(bond, ids, store=archive.ARCHIVE, stop=None):
+    """
+    NDJSON past_term lines of one bond: archived terms first, then the ones crawled now.
+    Crawling ends early, between courses, once the `stop` event is set (see SessionGuard).
+    """
+    if stop is not None and stop.is_set():
+        return
+    by_period = {}
+    for course in await bond.get_all_courses():
+        if course.period:
+            by_period.setdefault(course.period, []).append(course)
+
+    # The newest period is the current one, already covered by the grade stream
+    periods = sorted(by_period, reverse=True)[1:]
+    terms = await store.run(store.load, bond.registration) if store is not None else {}
+
+    def results(term_results):
+        for result in term_results:
+            result.id = next(ids)
+            result.obs = bond.program
+            result.status = subject_status(result.grades)
+        return term_results
+
+    pending = []
+    for period in periods:
+        term = terms.get(period) or archive.Term(period)
+        if term.needs_crawl():
+            pending.append(term)
+        else:
+            yield ndjson.past_term_line(period, results(list(term.courses.values())), True)
+
+    for term in pending:
+        term_results, keys, complete = [], [], True
+        for course in by_period[term.period]:
+            key = course_key(course)
+            keys.append(key)
+            # Resuming an interrupted crawl: skip what was already fetched
+            result = term.checkpoint(key)
+            if result is None:
+                if stop is not None and stop.is_set():
+                    return
+                result = CourseResult(None, course.title, None)
+                if await fetch_grades(course, result):
+                    if store is not None:
+                        await store.run(store.save_course, bond.registration, term.period, key, result)
+                else:
+                    complete = False
+            term_results.append(result)
+
+        # Only the newest past term may still change
+        if complete and store is not None:
+            await store.run(store.complete, bond.registration, term.period, keys, term.period != periods[0])
+        yield ndjson.past_term_line(term.period, results(term_results), False)
+
+
+class SessionGuard:
+    """
+    Grade streams and past-term crawls running on the same SIGAA session (by JSESSIONID) in this
+    process. SIGAA keeps the selected bond and course server-side, so they can't navigate at the
+    same time. The grade stream wins: a crawl isn't started while a stream runs, and a running
+    crawl is asked to stop between courses (what it fetched is checkpointed in the archive).
+    Used from the event loop thread only.
+    """
+
+    def __init__(self, stop_timeout=CRAWL_STOP_TIMEOUT):
+        self.stop_timeout = stop_timeout
+        self.streams = collections.Counter()
+        # key -> (stop requested, crawl finished)
+        self.crawls = {}
+
+    @contextlib.asynccontextmanager
+    async def stream(self, key):
+        self.streams[key] += 1
+        try:
+            crawl = self.crawls.get(key)
+            if crawl is not None:
+                crawl[0].set()
+                try:
+                    # At most one course fetch away
+                    await asyncio.wait_for(crawl[1].wait(), self.stop_timeout)
+                except asyncio.TimeoutError:
+                    logger.warning("Past terms crawl did not stop in time")
+            yield
+        finally:
+            self.streams[key] -= 1
+            if not self.streams[key]:
+                del self.streams[key]
+
+    @contextlib.asynccontextmanager
+    async def crawl(self, key):
+        """Yields the crawl's stop event, or None if a stream or another crawl holds the session."""
+        if self.streams[key] or key in self.crawls:
+            yield None
+            return
+        crawl = self.crawls[key] = (asyncio.Event(), asyncio.Event())
+        try:
+            yield crawl[0]
+        finally:
+            crawl[1].set()
+            del self.crawls[key]
+
+
+SESSIONS = SessionGuard()
@@ -0,0 +1,185 @@
+import _thread
+import json
+import logging
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+from itsdangerous import URLSafeTimedSerializer, BadSignature
+
+logger = logging.getLogger(__name__)
+
+# Opt-in statistical profiler for live requests.
+# A sampler thread reads sys._current_frames() for the request thread(s) every few ms and
+# aggregates the stacks in the "folded" format understood by flamegraph.pl / speedscope / inferno.
+#
+# Enable with PROFILE_SAMPLE_RATE (0.0 - 1.0) or per request with an X-Profile-Token header
+# signed with the app secret key (see `flask profile-token`).
+#
+# Profiles are per thread, not per request: everything the sampled threads run while the request
+# is open ends up in its profile. That includes other requests' greenlets under the gevent worker
+# (they share the OS thread) and every stream's coroutines on the shared event loop thread.
+
+PROFILE_HEADER = 'X-Profile-Token'
+TOKEN_SALT = 'profile'
+TOKEN_MAX_AGE = 24 * 3600
+
+
+def _env(name, default, cast):
+    # Read once at import: a typo in the environment must not turn every profiled route into a 500
+    value = os.environ.get(name, '')
+    if not value:
+        return default
+    try:
+        return cast(value)
+    except ValueError:
+        logger.warning(f"Ignoring invalid {name}={value!r}, using {default}")
+        return default
+
+
+SAMPLE_RATE = _env('PROFILE_SAMPLE_RATE', 0.0, float)
+PROFILE_DIR = os.environ.get('PROFILE_DIR', 'profiles')
+PROFILE_KEEP = _env('PROFILE_KEEP', 50, int)
+INTERVAL = _env('PROFILE_INTERVAL_MS', 5.0, float) / 1000
+
+
+def _real_thread_primitives():
+    # Under the gevent worker threading is monkey-patched; the sampler must be a real OS thread
+    # and must look up real thread idents, otherwise it would never run while the worker is busy.
+    try:
+        from gevent import monkey
+        if monkey.is_module_patched('threading'):
+            return (monkey.get_original('_thread', 'start_new_thread'),
+                    monkey.get_original('_thread', 'get_ident'),
+                    monkey.get_original('time', 'sleep'),
+                    monkey.get_original('_thread', 'allocate_lock'))
+    except ImportError:
+        pass
+    return _thread.start_new_thread, _thread.get_ident, time.sleep, _thread.allocate_lock
+
+
+def make_token(secret_key):
+    return URLSafeTimedSerializer(secret_key, salt=TOKEN_SALT).dumps('profile')
+
+
+def _valid_token(secret_key, token):
+    try:
+        URLSafeTimedSerializer(secret_key, salt=TOKEN_SALT).loads(token, max_age=TOKEN_MAX_AGE)
+        return True
+    except BadSignature:
+        return False
+
+
+def should_profile(request, secret_key):
+    token = request.headers.get(PROFILE_HEADER)
+    if token:
+        return _valid_token(secret_key, token)
+    return SAMPLE_RATE > 0 and random.random() < SAMPLE_RATE
+
+
+def _frame_key(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    def __init__(self, interval=None):
+        self.interval = interval or INTERVAL
+        self.stacks = Counter()
+        self.samples = 0
+        self.started = None
+        self.duration = 0.0
+        self._threads = set()
+        self._running = False
+        self._start_thread, self._get_ident, self._sleep, allocate_lock = _real_thread_primitives()
+        # Held by the sampler thread while it runs; stop() waits on it (a join for a bare _thread)
+        self._done = allocate_lock()
+
+    def attach_current_thread(self):
+        self._threads.add(self._get_ident())
+
+    def attach_thread(self, ident):
+        """Also sample another thread (e.g. the shared event loop thread, see app/aio.py)."""
+        self._threads.add(ident)
+
+    def start(self):
+        self.attach_current_thread()
+        self.started = time.perf_counter()
+        self._running = True
+        self._done.acquire()
+        self._start_thread(self._run, ())
+        return self
+
+    def stop(self):
+        """Stops sampling and waits for the sampler thread, so write() sees the final stacks."""
+        if self._running:
+            self._running = False
+            self.duration = time.perf_counter() - self.started
+            # At most one interval: the sampler checks the flag after each sleep
+            self._done.acquire()
+            self._done.release()
+        return self
+
+    def _run(self):
+        try:
+            self._sample()
+        finally:
+            self._done.release()
+
+    def _sample(self):
+        own_ident = self._get_ident()
+        while self._running:
+            frames = sys._current_frames()
+            for ident in tuple(self._threads):
+                if ident == own_ident:
+                    continue
+                frame = frames.get(ident)
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_key(frame))
+                    frame = frame.f_back
+                self.stacks[';'.join(reversed(stack))] += 1
+                self.samples += 1
+            del frames
+            self._sleep(self.interval)
+
+    def write(self, route, tags=None):
+        directory = PROFILE_DIR
+        os.makedirs(directory, exist_ok=True)
+
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{route}-{os.getpid()}-{random.randrange(1 << 16):04x}"
+        folded_path = os.path.join(directory, name + '.folded')
+        with open(folded_path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        meta = {
+            'route': route,
+            'duration_ms': round(self.duration * 1000, 1),
+            'samples': self.samples,
+            'interval_ms': self.interval * 1000,
+            **(tags or {}),
+        }
+        with open(os.path.join(directory, name + '.json'), 'w') as f:
+            json.dump(meta, f)
+
+        _rotate(directory, PROFILE_KEEP)
+        logger.info(f"Profile written: {folded_path} ({self.samples} samples)")
+        return folded_path
+
+
+def _rotate(directory, keep):
+    profiles = sorted(
+        (entry for entry in os.scandir(directory) if entry.name.endswith('.folded')),
+        key=lambda entry: entry.stat().st_mtime
+    )
+    for entry in profiles[:max(0, len(profiles) - keep)]:
+        for path in (entry.path, entry.path[:-len('.folded')] + '.json'):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -1,110 +1,201 @@
-from flask import Blueprint, render_template, request, redirect, url_for, session, Response, stream_with_context
-from .sigaa_api.sigaa import Sigaa, InstitutionType
-from .demo_data import get_demo_data
-import asyncio
-import json
+from flask import Blueprint, render_template, request, redirect, url_for, session, Response, stream_with_context, g, abort, current_app
+from .sigaa_api.metrics import REGISTRY, start_request_stats, timed
+from .profiling import SamplingProfiler, should_profile
+from .memory import MemoryTracker, should_track
+from .demo_data import demo_lines, MAX_COURSES, MAX_GROUPS
+from .admission import LOGIN_GATE, STREAM_GATE
+from .grading import card_badges
+from . import aio, archive, assets, history, ndjson, pipeline, snapshots, startup
+import contextlib
+import functools
+import hashlib
+import itertools
 import os
-import aiohttp
 import logging
 import time
 
 bp = Blueprint('main', __name__)
 logger = logging.getLogger(__name__)
 
-SIGAA_URL = "https://sigaa.ifal.edu.br"
-SUPPORTERS_URL = "https://raw.githubusercontent.com/AlbertCohenhgs/public_lists/refs/heads/main/apoiadores.json"
+# Overridable to point the app at the fake SIGAA in bench/fake_sigaa.py
+SIGAA_URL = os.environ.get('SIGAA_URL', "https://sigaa.ifal.edu.br")
+
+STREAM_SECONDS = REGISTRY.histogram('sigaa_stream_duration_seconds', 'Total /api/stream_grades duration.')
+
+# Routes the sampling profiler may attach to (see app/profiling.py)
+PROFILED_ENDPOINTS = {'main.login', 'main.stream_grades'}
+
+@bp.before_request
+def begin_request_stats():
+    g.request_stats = start_request_stats()
+
+    # GET /login only renders the form, nothing worth profiling
+    if request.endpoint in PROFILED_ENDPOINTS and not (request.endpoint == 'main.login' and request.method == 'GET'):
+        if should_profile(request, current_app.secret_key):
+            g.profiler = SamplingProfiler().start()
+            # SIGAA work runs on the shared event loop thread
+            g.profiler.attach_thread(aio.loop_thread_ident())
+
+@bp.after_request
+def add_server_timing(response):
+    # Streams report their numbers in a trailing "stats" message instead
+    stats = g.get('request_stats')
+    if stats is not None and not response.is_streamed:
+        response.headers['Server-Timing'] = stats.server_timing()
+
+    profiler = g.get('profiler')
+    if profiler is not None:
+        route = request.endpoint.split('.')[-1]
+
+        # Closing happens after the last chunk of a streamed body, so the stream is fully covered
+        def finish_profile():
+            profiler.stop()
+            tags = {}
+            if stats is not None:
+                tags = {
+                    'upstream_requests': stats.upstream_requests,
+                    'parse_ms': round(stats.parse_time * 1000, 1),
+                    'network_ms': round(stats.network_time * 1000, 1),
+                }
+            try:
+                profiler.write(route, tags)
+            except OSError as e:
+                logger.warning(f"Could not write profile: {e}")
+
+        response.call_on_close(finish_profile)
+    return response
+
+@bp.route('/metrics')
+def metrics():
+    token = os.environ.get('METRICS_TOKEN')
+    if token and request.headers.get('Authorization') != f"Bearer {token}":
+        abort(401)
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+@bp.route('/ready')
+def ready():
+    # 503 until the startup warm-up (WARMUP=1, see app/startup.py) has finished
+    return {'ready': startup.is_ready(), **startup.report()}, 200 if startup.is_ready() else 503
+
+@bp.app_template_global()
+def asset_url(name, **query):
+    # Fingerprinted URL of a file under static/css or static/js (see app/assets.py)
+    return assets.ASSETS.url(name, **query)
+
+@bp.route('/assets/<path:filename>')
+def asset(filename):
+    response = assets.ASSETS.response(filename)
+    if response is None:
+        abort(404)
+    return response
+
+# App shell precached by the service worker (templates/sw.js); its version is a hash of these files,
+# so any change to them makes browsers install a fresh cache.
+SHELL_ASSETS = ('css/dashboard.css', 'js/grading.js', 'js/snapshot.js', 'js/dashboard.js')
+SHELL_FILES = ('templates/dashboard.html', 'templates/sw.js', 'static/js/status-worker.js') + \
+              tuple('static/' + name for name in SHELL_ASSETS)
+THIRD_PARTY_SCRIPTS = ('https://cdn.jsdelivr.net/npm/chart.js',
+                       'https://cdnjs.cloudflare.com/ajax/libs/html2canvas/1.4.1/html2canvas.min.js')
+
+@functools.lru_cache(maxsize=1)
+def shell_version(root_path):
+    digest = hashlib.sha1()
+    for name in SHELL_FILES:
+        with open(os.path.join(root_path, name), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+@bp.route('/sw.js')
+def service_worker():
+    precache = [url_for('main.dashboard')]
+    precache += [asset_url(name) for name in SHELL_ASSETS]
+    # The worker is started with its own query string (see dashboard.html)
+    precache.append(asset_url('js/status-worker.js', grading=asset_url('js/grading.js')))
+    precache += THIRD_PARTY_SCRIPTS
+    body = render_template('sw.js', version=shell_version(current_app.root_path), precache=precache)
+    # Browsers check for a new worker on each visit; never let an HTTP cache hide one
+    return Response(body, mimetype='application/javascript', headers={'Cache-Control': 'no-cache'})
 
 @bp.route('/')
 def index():
     return redirect(url_for('main.login'))
 
+def _busy_response(gate):
+    retry_after = gate.retry_after()
+    response = Response(render_template('login.html', error=f"Muitos acessos no momento. Tente novamente em {retry_after} segundos."),
+                        status=429)
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
 @bp.route('/login', methods=['GET', 'POST'])
-async def login():
+def login():
     if request.method == 'POST':
         username = request.form['username']
         password = request.form['password']
 
-        sigaa = Sigaa(SIGAA_URL, InstitutionType.IFAL)
-        try:
-            account = await sigaa.login(username, password)
+        ticket = LOGIN_GATE.acquire()
+        if ticket is None:
+            return _busy_response(LOGIN_GATE)
 
-            client_session = await sigaa.session._get_session()
-            cookies = {}
-            for cookie in client_session.cookie_jar:
-                cookies[cookie.key] = cookie.value
+        async def do_login():
+            from .sigaa_api.sigaa import Sigaa, InstitutionType
+            sigaa = Sigaa(SIGAA_URL, InstitutionType.IFAL)
+            try:
+                account = await sigaa.login(username, password)
+                # Several bonds with courses: each one gets its own SIGAA login so the stream can scrape them
+                # in parallel. The bond list is kept either way; bonds without a login of their own
+                # (cookies None) share this one.
+                bonds = await sigaa.bond_sessions(account, username, password)
+                return (sigaa.session.get_cookies(), pipeline.bond_state(bonds) if len(bonds) > 1 else None,
+                        [bond.registration for bond, _ in bonds])
+            finally:
+                await sigaa.close()
 
-            session['sigaa_cookies'] = cookies
+        try:
+            session['sigaa_cookies'], session['sigaa_bonds'], session['sigaa_registrations'] = aio.run(do_login())
             return redirect(url_for('main.dashboard'))
         except Exception as e:
             logger.error(f"Login failed: {type(e).__name__}")
             # Ensure we don't leak full HTML or sensitive stack traces to user
             return render_template('login.html', error="Falha no login. Verifique suas credenciais.")
         finally:
-            await sigaa.close()
+            ticket.release()
 
     return render_template('login.html')
 
+# Pages that are the same for everyone are rendered once per process and revalidated with an ETag
+_rendered_pages = {}
+
+def _static_page(template, **context):
+    page = _rendered_pages.get(template)
+    if page is None or current_app.debug:
+        page = _rendered_pages[template] = render_template(template, **context)
+    response = Response(page)
+    response.add_etag()
+    return response.make_conditional(request)
+
 @bp.route('/apoio')
 def support():
-    return render_template('support.html')
+    return _static_page('support.html')
 
 @bp.route('/privacy')
 def privacy():
-    return render_template('privacy.html')
-
-def process_grades(raw_grades):
+    # The grade history is opt-in (HISTORY_DB); when it's on, the page says what is kept and for how long
+    return _static_page('privacy.html', history_days=history.RETENTION_DAYS if history.HISTORY is not None else None)
 
-    data = {
-        'b1Notes': [], 'b2Notes': [], 'b3Notes': [], 'b4Notes': [],
-        'r1Note': None, 'r2Note': None
-    }
+INLINE_SNAPSHOT = os.environ.get('INLINE_SNAPSHOT', '1') == '1'
 
-    repos = []
+def _card_order(course):
+    # Same order as compareCourses() in the dashboard, so the first flush moves nothing
+    return (not course.status.is_critical, -course.status.falta)
 
-    for item in raw_grades:
-        name = item.get('name', '').strip()
-        val = None
-
-        if item.get('type') == 'single':
-            val = item.get('value')
-        elif item.get('type') == 'group':
-
-            last_val = None
-            for sub in item.get('grades', []):
-                 if sub.get('value') is not None:
-                     last_val = sub.get('value')
-
-            if last_val is not None:
-                val = last_val
-
-        if val is None:
-            continue
-
-        try:
-            val = float(val)
-        except (ValueError, TypeError):
-            continue
-
-        if name == '1':
-            data['b1Notes'] = [val]
-        elif name == '2':
-            data['b2Notes'] = [val]
-        elif name == '3':
-            data['b3Notes'] = [val]
-        elif name == '4':
-            data['b4Notes'] = [val]
-        elif 'Reposição' in name or 'Recuperação' in name:
-            repos.append(val)
-
-    if len(repos) > 0:
-        data['r1Note'] = repos[0]
-    if len(repos) > 1:
-        data['r2Note'] = repos[1]
-
-    return data
+def _snapshot_json(courses):
+    body = '[' + ', '.join(ndjson.snapshot_course_json(course) for course in courses) + ']'
+    # Inlined in a <script> element
+    return body.replace('<', '\\u003c')
 
 @bp.route('/dashboard')
-async def dashboard():
+def dashboard():
     """
     Renders the dashboard shell. The actual data will be loaded via the /api/stream_grades endpoint.
     """
@@ -112,153 +203,298 @@ async def dashboard():
     if not cookies:
         return redirect(url_for('main.login'))
 
-    return render_template('dashboard.html')
+    # First paint from the student's last stream in this process; the stream then only patches what changed.
+    # Never for the service worker's shared app shell (X-App-Shell), which is cached on the device.
+    courses = []
+    if INLINE_SNAPSHOT and not request.headers.get('X-App-Shell'):
+        courses = snapshots.STORE.latest(session.get('sigaa_registrations') or ())
+    response = Response(render_template('dashboard.html', snapshot_courses=sorted(courses, key=_card_order),
+                                        snapshot_json=_snapshot_json(courses) if courses else None,
+                                        card_badges=card_badges))
+    response.vary.add('X-App-Shell')
+    return response
 
 @bp.route('/demo')
 def demo():
     return render_template('dashboard.html')
 
+def _int_arg(name, default, low, high):
+    try:
+        value = int(request.args.get(name, default))
+    except ValueError:
+        value = default
+    return max(low, min(high, value))
+
+def _sleep_is_cooperative():
+    # Under the gevent worker time.sleep only parks the greenlet
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched('time')
+
 @bp.route('/api/stream_demo')
 def stream_demo():
-    def generate():
-        # Simulate network delay for realism
-        time.sleep(0.5)
-
-        for data in get_demo_data():
-            # Small delay between chunks to simulate streaming
-            time.sleep(0.1)
-            yield json.dumps(data) + "\n"
-
-    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    """
+    Demo stream. ?courses=N&groups=G&frequency=0&seed=S switch to a synthetic student of any size.
+    Pacing (?pace_ms=) is done by the dashboard, so the whole payload goes out at once;
+    ?pace=server sleeps between lines instead, but only where sleeping doesn't block the worker.
+    """
+    courses = _int_arg('courses', 1, 1, MAX_COURSES) if request.args.get('courses') else None
+    lines = demo_lines(courses=courses,
+                       groups=_int_arg('groups', 2, 1, MAX_GROUPS),
+                       frequency=request.args.get('frequency', '1') != '0',
+                       seed=_int_arg('seed', 0, 0, 2 ** 31))
+    pace_ms = _int_arg('pace_ms', 100, 0, 2000)
+
+    if request.args.get('pace') == 'server' and _sleep_is_cooperative():
+        def generate():
+            time.sleep(pace_ms * 5 / 1000)
+            for line in lines:
+                time.sleep(pace_ms / 1000)
+                yield line
+        return Response(generate(), mimetype='application/x-ndjson')
+
+    header = ndjson.dumps_line({"type": "demo", "pace_ms": pace_ms}).encode()
+    return Response(header + b''.join(lines), mimetype='application/x-ndjson')
+
+@contextlib.asynccontextmanager
+async def sigaa_account(cookies, bond_state):
+    """
+    The student's SIGAA Account for one request, rebuilt from the Flask session (cookies and
+    'sigaa_bonds'); None if the SIGAA session has expired. Every SIGAA session it opened is closed on exit.
+    """
+    # Imported here so the app starts (and serves /login) without loading aiohttp/bs4
+    from .sigaa_api.sigaa import Sigaa, InstitutionType
+    from .sigaa_api.account import Account
+    from .sigaa_api.session import SigaaSession
+
+    sigaa = Sigaa(SIGAA_URL, InstitutionType.IFAL, cookies=cookies)
+    bond_sessions = []
+
+    def open_session(bond_cookies):
+        bond_sessions.append(SigaaSession(SIGAA_URL, cookies=bond_cookies))
+        return bond_sessions[-1]
+
+    try:
+        response = await sigaa.session.get("/sigaa/portais/discente/discente.jsf")
+        if "login" in response.url.path:
+            yield None
+            return
+
+        account = Account(sigaa.session, response)
+        if bond_state:
+            account.active_bonds = pipeline.restore_bonds(bond_state, sigaa.session, open_session)
+        yield account
+    finally:
+        await sigaa.close()
+        for bond_session in bond_sessions:
+            await bond_session.close()
+
+def _session_key(cookies):
+    # Which SIGAA session a request works on, for pipeline.SESSIONS
+    return cookies.get('JSESSIONID') or tuple(sorted(cookies.items()))
+
+async def _is_supporter(account):
+    from . import supporters
+
+    registration = account.active_bonds[0].registration if account.active_bonds else None
+    with timed('supporters', per_request=True):
+        return await supporters.is_supporter(registration)
 
 @bp.route('/api/stream_grades')
 def stream_grades():
     """
-    Sync route wrapper that yields from an async generator using a local event loop.
+    Sync route wrapper that yields from an async generator running on the shared event loop.
     This bypasses WSGI limitations with async generators.
+    ?lazy=1 sends the last known values of courses instead of fetching them (see pipeline.py).
     """
     cookies = session.get('sigaa_cookies')
     if not cookies:
         return Response("Unauthorized", status=401)
+    bond_state = session.get('sigaa_bonds')
+    lazy = request.args.get('lazy') == '1'
+
+    ticket = STREAM_GATE.acquire()
+    if ticket is None:
+        retry_after = STREAM_GATE.retry_after()
+        return Response(ndjson.busy_line(retry_after), status=429, mimetype='application/x-ndjson',
+                        headers={'Retry-After': str(retry_after)})
 
     async def async_generate():
-        sigaa = Sigaa(SIGAA_URL, InstitutionType.IFAL, cookies=cookies)
+        memory = MemoryTracker().start() if should_track() else None
         try:
-            response = await sigaa.session.get("/sigaa/portais/discente/discente.jsf")
-            if "login" in response.url.path:
-                 yield json.dumps({"error": "Session expired"}) + "\n"
-                 return
-
-            from .sigaa_api.account import Account
-            account = Account(sigaa.session, response)
+            async with pipeline.SESSIONS.stream(_session_key(cookies)), sigaa_account(cookies, bond_state) as account:
+                if account is None:
+                    yield ndjson.error_line("Session expired")
+                    return
 
-            name = await account.get_name()
+                name = await account.get_name()
+                is_supporter = await _is_supporter(account)
+                yield ndjson.user_info_line(name, is_supporter)
 
-            # Check for Supporter Status
-            is_supporter = False
-            registration = None
-            if account.active_bonds:
-                registration = account.active_bonds[0].registration
-
-            supporters = []
-            try:
-                # Try to fetch from online list
-                async with aiohttp.ClientSession() as session_http:
-                    async with session_http.get(SUPPORTERS_URL) as resp:
-                        if resp.status == 200:
-                            supporters = await resp.json(content_type=None)
-            except Exception as e:
-                logger.warning(f"Error fetching online supporters list: {e}")
-                # Fallback to local file
-                try:
-                    with open('app/apoio/apoiadores.json', 'r') as f:
-                        supporters = json.load(f)
-                except Exception:
-                    pass
-
-            # Optimize lookup
-            supporters_set = {str(s) for s in supporters}
-            if registration and str(registration) in supporters_set:
-                 is_supporter = True
-
-            yield json.dumps({
-                "type": "user_info",
-                "name": name,
-                "is_supporter": is_supporter
-            }) + "\n"
-
-            if account.active_bonds:
-                for bond in account.active_bonds:
-                    courses = await bond.get_courses()
-                    if courses:
-                        for i, course in enumerate(courses):
-                            course_id = i + 1
-                            yield json.dumps({
-                                "type": "course_start",
-                                "id": course_id,
-                                "name": course.title,
-                                "obs": bond.program
-                            }) + "\n"
-
-                            grades_data = {
-                                'b1Notes': [], 'b2Notes': [], 'b3Notes': [], 'b4Notes': [],
-                                'r1Note': None, 'r2Note': None
-                            }
-                            try:
-                                raw_grades = await course.get_grades()
-                                if raw_grades:
-                                    grades_data = process_grades(raw_grades)
-                            except Exception as e:
-                                logger.error(f"Error fetching grades for {course.title}: {type(e).__name__}")
-
-                            yield json.dumps({
-                                "type": "course_data",
-                                "id": course_id,
-                                "data": grades_data
-                            }) + "\n"
-
-                            # Fetch Frequency (Only for Supporters)
-                            if is_supporter:
-                                freq_data = None
-                                try:
-                                    freq_data = await course.get_frequency()
-                                except Exception as e:
-                                    logger.error(f"Error fetching frequency for {course.title}: {type(e).__name__}")
-
-                                if freq_data:
-                                    yield json.dumps({
-                                        "type": "course_frequency",
-                                        "id": course_id,
-                                        "data": freq_data
-                                    }) + "\n"
+                async for line in pipeline.stream_bonds(account, is_supporter, lazy=lazy):
+                    yield line
 
         except Exception as e:
             logger.error(f"Stream error: {e}")
-            yield json.dumps({"error": "Erro no carregamento dos dados."}) + "\n"
+            yield ndjson.error_line("Erro no carregamento dos dados.")
         finally:
-            await sigaa.close()
+            # Also reached on early return / client disconnect, so tracemalloc is always released
+            peak = memory.stop() if memory is not None else None
+
+        STREAM_SECONDS.observe(stats.elapsed)
+        summary = stats.as_dict()
+        if peak is not None:
+            summary['peak_memory_kb'] = round(peak / 1024)
+        yield ndjson.dumps_line({"type": "stats", **summary})
+
+    # Each __anext__ below runs in a new Task that copies the current context,
+    # so the stats must be installed here rather than inside the async generator.
+    stats = start_request_stats()
+    g.request_stats = stats
 
     def sync_generate():
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
+        try:
+            yield from aio.iterate(async_generate())
+        except Exception as e:
+            logger.error(f"Sync wrapper error: {e}")
+            yield ndjson.error_line("Internal Server Error")
+
+    response = Response(stream_with_context(sync_generate()), mimetype='application/x-ndjson')
+    # Runs after the last chunk, or when the client goes away
+    response.call_on_close(ticket.release)
+    return response
+
+# path: the fallback key is the course title, which may contain '/'
+@bp.route('/api/course/<path:key>')
+def course_details(key):
+    """
+    Grades (and frequency, for supporters) of one course, fetched from SIGAA now. <key> is the
+    course_start line's "key". The dashboard calls it when a course sent as cached is opened.
+    """
+    cookies = session.get('sigaa_cookies')
+    if not cookies:
+        return Response("Unauthorized", status=401)
+    bond_state = session.get('sigaa_bonds')
+
+    ticket = STREAM_GATE.acquire()
+    if ticket is None:
+        retry_after = STREAM_GATE.retry_after()
+        return Response(ndjson.busy_line(retry_after), status=429, mimetype='application/json',
+                        headers={'Retry-After': str(retry_after)})
+
+    async def fetch():
+        async with pipeline.SESSIONS.stream(_session_key(cookies)), sigaa_account(cookies, bond_state) as account:
+            if account is None:
+                return 'expired'
+            return await pipeline.course_details(account, key, await _is_supporter(account))
+
+    failed = Response(ndjson.error_line("Erro no carregamento dos dados."), status=502, mimetype='application/json')
+    g.request_stats = start_request_stats()
+    try:
+        found = aio.run(fetch())
+    except Exception as e:
+        logger.error(f"Course details error: {type(e).__name__}: {e}")
+        return failed
+    finally:
+        ticket.release()
+
+    if found == 'expired':
+        return Response("Unauthorized", status=401)
+    if found is None:
+        abort(404)
+    result, ok, changed = found
+    if not ok:
+        return failed
+    return Response(ndjson.course_json(result, changed), mimetype='application/json', headers={'Cache-Control': 'no-store'})
+
+@bp.route('/api/stream_past_terms')
+def stream_past_terms():
+    """
+    NDJSON with the grades of the student's past terms (one past_term line per term), from the
+    archive (app/archive.py) where possible. Only when the archive is on (HISTORY_DB): without it
+    every call would crawl every past term again. Shares the SIGAA session with the grade stream,
+    which takes precedence (pipeline.SessionGuard): the crawl stops early and resumes on the next call.
+    """
+    if archive.ARCHIVE is None:
+        abort(404)
+    cookies = session.get('sigaa_cookies')
+    if not cookies:
+        return Response("Unauthorized", status=401)
+    bond_state = session.get('sigaa_bonds')
+
+    ticket = STREAM_GATE.acquire()
+    if ticket is None:
+        retry_after = STREAM_GATE.retry_after()
+        return Response(ndjson.busy_line(retry_after), status=429, mimetype='application/x-ndjson',
+                        headers={'Retry-After': str(retry_after)})
+
+    async def async_generate():
+        try:
+            async with pipeline.SESSIONS.crawl(_session_key(cookies)) as stop:
+                if stop is None:
+                    yield ndjson.error_line("Notas sendo carregadas, tente novamente em instantes.")
+                    return
+
+                async with sigaa_account(cookies, bond_state) as account:
+                    if account is None:
+                        yield ndjson.error_line("Session expired")
+                        return
+
+                    ids = itertools.count(1)
+                    for bond in account.active_bonds:
+                        async for line in pipeline.past_term_lines(bond, ids, stop=stop):
+                            yield line
+                        if stop.is_set():
+                            break
+
+                if stop.is_set():
+                    yield ndjson.error_line("Notas sendo carregadas, tente novamente em instantes.")
+
+        except Exception as e:
+            logger.error(f"Past terms stream error: {e}")
+            yield ndjson.error_line("Erro no carregamento dos dados.")
 
-        gen = async_generate()
+        yield ndjson.dumps_line({"type": "stats", **stats.as_dict()})
 
+    stats = start_request_stats()
+    g.request_stats = stats
+
+    def sync_generate():
         try:
-            while True:
-                data = loop.run_until_complete(gen.__anext__())
-                yield data
-        except StopAsyncIteration:
-            pass
+            yield from aio.iterate(async_generate())
         except Exception as e:
             logger.error(f"Sync wrapper error: {e}")
-            yield json.dumps({"error": "Internal Server Error"}) + "\n"
-        finally:
-            loop.close()
+            yield ndjson.error_line("Internal Server Error")
+
+    response = Response(stream_with_context(sync_generate()), mimetype='application/x-ndjson')
+    response.call_on_close(ticket.release)
+    return response
 
-    return Response(stream_with_context(sync_generate()), mimetype='application/x-ndjson')
+@bp.route('/api/changes')
+def changes():
+    """
+    Courses whose grades or frequency changed since ?since= (unix time), from the grade history
+    (app/history.py). `now` is the cursor for the next call.
+    """
+    if not session.get('sigaa_cookies'):
+        return Response("Unauthorized", status=401)
+    try:
+        since = float(request.args.get('since', 0))
+    except ValueError:
+        abort(400)
+
+    now = time.time()
+    found = []
+    if history.HISTORY is not None:
+        for registration in session.get('sigaa_registrations') or ():
+            found += history.HISTORY.changes_since(registration, since)
+    return {'now': now, 'changes': found}
 
 @bp.route('/logout')
 def logout():
     session.pop('sigaa_cookies', None)
+    session.pop('sigaa_bonds', None)
+    session.pop('sigaa_registrations', None)
     return redirect(url_for('main.login'))
\ No newline at end of file
@@ -14,13 +14,19 @@ class Account:
 
         self._parse_homepage(homepage)
 
+        # Everything needed from the homepage is extracted now, don't keep its tree
+        # alive for the whole stream
+        if '/portais/discente/discente.jsf' in str(homepage.url):
+            self._name = self._parse_name(homepage)
+        homepage.release()
+
     def _remove_tags(self, text):
         if not text:
             return ""
         return re.sub(r'<[^>]+>', '', str(text)).strip()
 
     def _parse_homepage(self, homepage):
-        if 'O sistema comportou-se de forma inesperada' in homepage.body:
+        if homepage.contains('O sistema comportou-se de forma inesperada'):
              raise ValueError('SIGAA: Invalid homepage, system error.')
 
         url_str = str(homepage.url)
@@ -100,24 +106,24 @@ class Account:
 
         if registration and program:
             bond = StudentBond(self.session, registration, program, None)
+            # Same tree as the rest of the homepage: read the course rows now, the page is released after
+            bond.prefetch_courses(page)
             if status in ['CURSANDO', 'CONCLUINTE', 'ATIVO']:
                 self.active_bonds.append(bond)
             else:
                 self.inactive_bonds.append(bond)
 
+    def _parse_name(self, page):
+        name_el = page.soup.select_one('p.usuario > span')
+        if name_el:
+            return name_el.get_text(strip=True)
+        return None
+
     async def get_name(self):
         if self._name:
             return self._name
 
-        if '/portais/discente/discente.jsf' in str(self.homepage.url):
-             name_el = self.homepage.soup.select_one('p.usuario > span')
-             if name_el:
-                 self._name = name_el.get_text(strip=True)
-                 return self._name
-
         page = await self.session.get('/sigaa/portais/discente/discente.jsf')
-        name_el = page.soup.select_one('p.usuario > span')
-        if name_el:
-            self._name = name_el.get_text(strip=True)
-            return self._name
-        return None
+        self._name = self._parse_name(page)
+        page.release()
+        return self._name
@@ -1,6 +1,12 @@
+import re
 from urllib.parse import urljoin
 from .exceptions import SigaaConnectionError
 from .course import Course
+from .metrics import timed_async
+
+# Every course of the bond, grouped by period ("Ver turmas anteriores" on the portal)
+ALL_COURSES_PATH = '/sigaa/portais/discente/turmas.jsf'
+PERIOD_RE = re.compile(r'^\d{4}\.\d$')
 
 class StudentBond:
     def __init__(self, session, registration, program, switch_url=None):
@@ -9,21 +15,45 @@ class StudentBond:
         self.program = program
         self.switch_url = switch_url
         self.courses = []
+        # Courses read from the portal page the account was built from: the first get_courses()
+        # returns them instead of fetching (and parsing) the same page again
+        self._prefetched = None
+
+    def prefetch_courses(self, page):
+        """Reads this bond's courses from a portal page that is already parsed, before it is released."""
+        self._prefetched = self._parse_courses(page)
 
+    @timed_async('get_courses')
     async def get_courses(self):
+        if self._prefetched is not None:
+            self.courses, self._prefetched = self._prefetched, None
+            return self.courses
 
-        page = None
         if self.switch_url:
              page = await self.session.get(self.switch_url)
         else:
-
              page = await self.session.get('/sigaa/portais/discente/discente.jsf')
 
         self.courses = self._parse_courses(page)
+        page.release()
         return self.courses
 
+    @timed_async('get_all_courses')
+    async def get_all_courses(self):
+        """Courses of every period of the bond, current one included; each has .period set."""
+        if self.switch_url:
+            # Selects this bond in the server-side session
+            page = await self.session.get(self.switch_url)
+            page.release()
+
+        page = await self.session.get(ALL_COURSES_PATH)
+        courses = self._parse_courses(page)
+        page.release()
+        return courses
+
     def _parse_courses(self, page):
         courses = []
+        period = None
 
         tables = page.soup.find_all('table')
 
@@ -57,7 +87,9 @@ class StudentBond:
                 rows = table.find_all('tr') #
 
             for row in rows:
-                if 'periodo' in row.get('class', []):
+                # Period rows ("2024.1") head the courses below them
+                if 'periodo' in row.get('class', []) or PERIOD_RE.match(row.get_text(strip=True)):
+                    period = row.get_text(strip=True)
                     continue
 
                 row_text_clean = row.get_text(strip=True)
@@ -111,7 +143,7 @@ class StudentBond:
                     js_code = access_link['onclick']
                     try:
                         form_data = page.parse_jsfcljs(js_code)
-                        course = Course(self.session, title, form_data)
+                        course = Course(self.session, title, form_data, period, self.registration)
                         courses.append(course)
                     except Exception:
                         pass # Failed to parse form, skip
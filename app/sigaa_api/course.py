@@ -1,120 +1,264 @@
-from .exceptions import SigaaConnectionError
+import datetime
+import html
+import logging
+import os
+import re
+from .exceptions import SigaaConnectionError, SigaaSessionExpired
+from .models import Grade, GradeGroup, Frequency
+from .metrics import timed_async
+from .navigation import MARKERS, NAV_JUMPS, PLANS, Step
+
+logger = logging.getLogger(__name__)
+
+_DATE_RE = re.compile(r'(\d{2})/(\d{2})/(\d{4})')
+# "2 Faltas", "1 Falta(s)", or just "Falta" for a single absence
+_ABSENCES_RE = re.compile(r'(?:(\d+)\s*)?Falta')
+_TOTAL_RE = re.compile(r'Total de Faltas:\s*(\d+)')
+_MAX_RE = re.compile(r'Máximo de Faltas Permitido:\s*(\d+)')
+
+
+def _bimester_calendar(value):
+    """{year: (start of the 2nd, 3rd and 4th bimesters)} from "2025-04-22,2025-07-21,2025-10-06,..."."""
+    starts = {}
+    try:
+        for part in filter(None, (p.strip() for p in value.split(','))):
+            day = datetime.date.fromisoformat(part)
+            starts.setdefault(day.year, []).append(day)
+    except ValueError:
+        logger.warning(f"Ignoring invalid SIGAA_BIMESTER_STARTS={value!r}, absences won't be split per bimester")
+        return {}
+    for year, days in list(starts.items()):
+        if len(days) != 3:
+            logger.warning(f"SIGAA_BIMESTER_STARTS needs 3 dates for {year}, got {len(days)}; ignoring that year")
+            del starts[year]
+    return {year: tuple(sorted(days)) for year, days in starts.items()}
+
+
+# SIGAA's attendance map doesn't say which bimester a lesson belongs to, and the school calendar
+# changes every year, so the split is only made for the years configured here. Lessons of any other
+# year leave Frequency.bimesters empty.
+BIMESTER_STARTS = _bimester_calendar(os.environ.get('SIGAA_BIMESTER_STARTS', ''))
+
+
+def _bimester(day):
+    """0-3 for a lesson date, None when its year has no configured calendar."""
+    starts = BIMESTER_STARTS.get(day.year)
+    if starts is None:
+        return None
+    return sum(1 for start in starts if day >= start)
 
 
 class Course:
-    def __init__(self, session, title, form_data):
+    def __init__(self, session, title, form_data, period=None, registration=None):
         self.session = session
         self.title = title
         self.form_data = form_data
+        # "2024.1"; None when the page listing it has no period rows
+        self.period = period
+        # Student the course was listed for; navigation plans are kept per student
+        self.registration = registration
         self.id = form_data['post_values'].get('idTurma')
         self.grades = []
 
     def __repr__(self):
         return f"<Course title='{self.title}'>"
 
+    @timed_async('get_grades')
     async def get_grades(self):
-
-        course_page = await self._enter_course()
-
-        # 2. Navigate to "Ver Notas"
-        grades_page = await self._navigate_to_grades(course_page)
-
-        # 3. Parse grades
+        grades_page = await self._open('grades')
         self.grades = self._parse_grades(grades_page)
+        grades_page.release()
         return self.grades
 
+    @timed_async('get_frequency')
     async def get_frequency(self):
-        course_page = await self._enter_course()
-        freq_page = await self._navigate_to_frequency(course_page)
+        freq_page = await self._open('frequency')
         self.frequency = self._parse_frequency(freq_page)
+        freq_page.release()
         return self.frequency
 
+    async def _open(self, kind):
+        """The grades or frequency page: straight from the navigation plan if SIGAA takes it, else through the menu."""
+        step = PLANS.get(self.registration, self.id, kind)
+        # Without its marker (no grades yet) a page can't be told apart from a jump SIGAA ignored,
+        # so steps to pages known to lack it always go through the menu
+        if step is not None and step.marked is not False:
+            page = await self._jump(kind, step)
+            if page is not None:
+                return page
+
+        course_page = await self._enter_course()
+        try:
+            return await self._navigate(course_page, kind)
+        finally:
+            course_page.release()
+
     async def _enter_course(self):
         page = await self.session.post(
             self.form_data['action'],
             data=self.form_data['post_values']
         )
+        self._viewing(page)
         return page
 
-    async def _navigate_to_grades(self, course_page):
-        menu_items = course_page.soup.find_all(string="Ver Notas")
-        for item in menu_items:
-            parent = item.parent
-            while parent:
-                if parent.name in ['td', 'div', 'a']:
-                    if parent.get('onclick'):
-                        js_code = parent['onclick']
-                        form_data = course_page.parse_jsfcljs(js_code)
-                        page = await self.session.post(
-                            form_data['action'],
-                            data=form_data['post_values']
-                        )
-                        return page
-                parent = parent.parent
-                if not parent or parent.name == 'body':
-                    break
+    def _viewing(self, page, view_state=None):
+        # The session is on this course; pages without a form of their own keep the previous ViewState
+        self.session.course_view = (self.id, page.view_state or view_state) if self.id else None
 
-        raise ValueError("Could not find 'Ver Notas' menu item.")
+    def _landed(self, page, kind):
+        """Whether a jump reached the course's page rather than an error, another course or the same view."""
+        if not (page.contains(self.title) or page.contains(html.escape(self.title, quote=False))):
+            return False
+        return page.contains(MARKERS[kind])
+
+    async def _jump(self, kind, step):
+        view = self.session.course_view
+        if view is not None and view[0] == self.id and view[1]:
+            view_state = view[1]
+        else:
+            # Selects the course on the server; only its ViewState is read, the page isn't parsed
+            course_page = await self._enter_course()
+            view_state = course_page.view_state
+            course_page.release()
+            if not view_state:
+                return None
+
+        try:
+            page = await self.session.post(step.action, data=step.form(view_state))
+        except SigaaSessionExpired:
+            page = None
+        if page is None or not self._landed(page, kind):
+            NAV_JUMPS.inc(1, 'rejected')
+            if page is not None:
+                page.release()
+            PLANS.rejected(self.registration, self.id, kind)
+            return None
 
-    async def _navigate_to_frequency(self, course_page):
-        # Look for "Frequência" link, handling encoding if necessary
-        # Usually checking for "Frequência" or "Frequencia" covers it
-        menu_items = course_page.soup.find_all(lambda text: text and "Frequência" in text)
+        NAV_JUMPS.inc(1, 'ok')
+        PLANS.accepted(self.registration, self.id, kind)
+        step.marked = True
+        self._viewing(page, view_state)
+        return page
 
-        if not menu_items:
-             menu_items = course_page.soup.find_all(lambda text: text and "Frequencia" in text)
+    def _menu_form(self, course_page, kind):
+        """jsfcljs form data of the course menu entry for kind ('grades' or 'frequency'), None if missing."""
+        if kind == 'grades':
+            menu_items = course_page.soup.find_all(string="Ver Notas")
+        else:
+            # Look for "Frequência" link, handling encoding if necessary
+            # Usually checking for "Frequência" or "Frequencia" covers it
+            menu_items = course_page.soup.find_all(lambda text: text and "Frequência" in text)
+            if not menu_items:
+                menu_items = course_page.soup.find_all(lambda text: text and "Frequencia" in text)
 
         for item in menu_items:
             parent = item.parent
             while parent:
                 if parent.name in ['td', 'div', 'a']:
                     if parent.get('onclick'):
-                        js_code = parent['onclick']
-                        form_data = course_page.parse_jsfcljs(js_code)
-                        page = await self.session.post(
-                            form_data['action'],
-                            data=form_data['post_values']
-                        )
-                        return page
+                        return course_page.parse_jsfcljs(parent['onclick'])
                 parent = parent.parent
                 if not parent or parent.name == 'body':
                     break
+        return None
 
-        raise ValueError("Could not find 'Frequência' menu item.")
+    async def _navigate(self, course_page, kind):
+        form_data = self._menu_form(course_page, kind)
+        if form_data is None:
+            label = 'Ver Notas' if kind == 'grades' else 'Frequência'
+            raise ValueError(f"Could not find '{label}' menu item.")
+
+        page = await self.session.post(
+            form_data['action'],
+            data=form_data['post_values']
+        )
+        self._viewing(page, course_page.view_state)
+
+        # Both menu entries are on the course page already parsed; the other one is kept for later
+        plan = {kind: Step(form_data['action'], form_data['post_values'], page.contains(MARKERS[kind]))}
+        for other in MARKERS:
+            if other != kind:
+                try:
+                    other_form = self._menu_form(course_page, other)
+                except ValueError:
+                    other_form = None
+                if other_form is not None:
+                    # Not followed yet: unknown whether its page has the marker
+                    plan[other] = Step(other_form['action'], other_form['post_values'])
+        PLANS.put(self.registration, self.id, plan)
+        return page
 
     def _parse_frequency(self, page):
-        # Parse the "Mapa de Frequências" page
-        data = {
-            'total_faltas': 0,
-            'max_faltas': 0,
-            'percent': 0.0
-        }
-
-        # The footer usually contains:
-        # "Total de Faltas: 0"
-        # "Máximo de Faltas Permitido: 10"
-
-        # We can look for the text directly
-        import re
-
-        text_content = page.soup.get_text()
-
-        total_match = re.search(r'Total de Faltas:\s*(\d+)', text_content)
-        if total_match:
-            data['total_faltas'] = int(total_match.group(1))
-
-        max_match = re.search(r'Máximo de Faltas Permitido:\s*(\d+)', text_content)
-        if max_match:
-            data['max_faltas'] = int(max_match.group(1))
-
-        # Calculate percentage based on 25% rule
-        # If Max = 25%, then Total Classes = Max * 4
-        # Percentage = (Total Faltas / Total Classes) * 100
-        if data['max_faltas'] > 0:
-            total_classes = data['max_faltas'] * 4
-            data['percent'] = (data['total_faltas'] / total_classes) * 100
+        # "Mapa de Frequências": one row per lesson date, then a footer with
+        # "Total de Faltas: N" and "Máximo de Faltas Permitido: N".
+        # Only the table rows and the footer elements are read, from the lxml tree (no soup).
+        data = Frequency()
+        tree = page.tree
+        if tree is None:
+            return data
+
+        table = None
+        for candidate in tree.iter('table'):
+            header = next(candidate.iter('th'), None)
+            if header is not None and ''.join(header.itertext()).strip() == 'Data':
+                table = candidate
+                break
+
+        dates = []
+        bimesters = [0, 0, 0, 0]
+        if table is not None:
+            for row in table.iter('tr'):
+                cells = row.findall('td')
+                if len(cells) < 2:
+                    continue
+                date = _DATE_RE.search(''.join(cells[0].itertext()))
+                situation = ''.join(cells[1].itertext()).strip()
+                if not date:
+                    continue
+                if situation.startswith('Presente'):
+                    absences = 0
+                else:
+                    match = _ABSENCES_RE.search(situation)
+                    if not match:
+                        continue  # Lesson without attendance registered yet
+                    absences = int(match.group(1) or 1)
+
+                day, month, year = (int(part) for part in date.groups())
+                try:
+                    lesson = datetime.date(year, month, day)
+                except ValueError:
+                    continue
+                dates.append((lesson.isoformat(), absences))
+                bimester = _bimester(lesson)
+                if bimester is None:
+                    bimesters = None
+                elif bimesters is not None:
+                    bimesters[bimester] += absences
+
+        data.lessons = len(dates)
+        data.bimesters = tuple(bimesters) if bimesters is not None and dates else ()
+        data.dates = tuple(dates)
+        data.total_faltas = sum(absences for _, absences in dates)
+
+        # Footer totals, after the table; SIGAA's own count wins over the sum of the rows.
+        # The number may follow the label's element ("<b>Total de Faltas:</b> 3").
+        if table is not None:
+            labels = table.xpath('following::*[text()[contains(., "Faltas")]]')
         else:
-            data['percent'] = 0.0
+            labels = tree.xpath('//*[text()[contains(., "Faltas")]]')
+        for element in labels:
+            text = ''.join(element.itertext()) + (element.tail or '')
+            total_match = _TOTAL_RE.search(text)
+            if total_match:
+                data.total_faltas = int(total_match.group(1))
+            max_match = _MAX_RE.search(text)
+            if max_match:
+                data.max_faltas = int(max_match.group(1))
+
+        # The map only lists the lessons registered so far; the course's number of classes comes from
+        # the limit, which SIGAA sets at 25% of them
+        data.total_classes = data.max_faltas * 4
+        data.percent = data.total_faltas / data.total_classes * 100 if data.total_classes else 0.0
 
         return data
 
@@ -195,11 +339,7 @@ class Course:
                     val = self._parse_float(val_text)
 
                     if val is not None or val_text not in ['', '-', '--', 'S/N']:
-                        grades.append({
-                            'name': group_name,
-                            'value': val,
-                            'type': 'single'
-                        })
+                        grades.append(Grade(group_name, val))
                 current_cell_idx += 1
             else:
                 # Multiple sub-grades
@@ -236,17 +376,10 @@ class Course:
                     # Add ALL grades to maintain structure
                     # Only skip completely empty cells (no text at all)
                     if val_text:  # Has some text (even if it's "-" or "S/N")
-                        sub_grades.append({
-                            'name': sub_name,
-                            'value': val
-                        })
+                        sub_grades.append(Grade(sub_name, val))
 
                 if sub_grades:
-                    grades.append({
-                        'name': group_name,
-                        'type': 'group',
-                        'grades': sub_grades
-                    })
+                    grades.append(GradeGroup(group_name, sub_grades))
 
                 current_cell_idx += colspan
 
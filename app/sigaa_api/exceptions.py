@@ -13,3 +13,7 @@ class SigaaInvalidCredentials(SigaaException):
 class SigaaConnectionError(SigaaException):
     """Raised when connection fails."""
     pass
+
+class SigaaResponseTooLarge(SigaaException):
+    """Raised when a response body exceeds the configured size limit."""
+    pass
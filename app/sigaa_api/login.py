@@ -1,5 +1,47 @@
+import os
+import re
+import threading
+import time
 from urllib.parse import urljoin
 from .exceptions import SigaaInvalidCredentials
+from .metrics import REGISTRY, timed_async
+
+# The login form (action + hidden fields) is the same for everybody, so it is cached per
+# SIGAA base URL and most logins POST directly, skipping the GET + parse of verTelaLogin.do.
+# If a POST with the cached form lands back on the login page, the template is dropped and
+# the login is retried once with the full flow.
+LOGIN_FORM_TTL = float(os.environ.get('SIGAA_LOGIN_FORM_TTL', 600))
+
+LOGIN_FORM_CACHE = REGISTRY.counter('sigaa_login_form_cache_total', 'Login form template lookups.', ('result',))
+
+_JSESSIONID = re.compile(r';jsessionid=[^?#]*', re.IGNORECASE)
+_form_cache = {}
+_form_cache_lock = threading.Lock()
+
+
+def get_cached_login_form(base_url):
+    with _form_cache_lock:
+        entry = _form_cache.get(base_url)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return entry[1], dict(entry[2])
+
+
+def cache_login_form(base_url, action_url, post_values):
+    # A jsessionid in the action belongs to whoever fetched the form, not to the template
+    with _form_cache_lock:
+        _form_cache[base_url] = (time.monotonic() + LOGIN_FORM_TTL, _JSESSIONID.sub('', action_url),
+                                 dict(post_values))
+
+
+def invalidate_login_form(base_url):
+    with _form_cache_lock:
+        _form_cache.pop(base_url, None)
+
+
+class _StaleLoginForm(Exception):
+    pass
+
 
 class SigaaLogin:
     def __init__(self, session):
@@ -16,7 +58,11 @@ class SigaaLoginImpl(SigaaLogin):
 
     async def get_login_form(self):
         page = await self.session.get('/sigaa/verTelaLogin.do')
-        return self._parse_login_form(page)
+        form = self._parse_login_form(page)
+        page.release()
+        if LOGIN_FORM_TTL > 0:
+            cache_login_form(self.session.base_url, *form)
+        return form
 
     def _parse_login_form(self, page):
         form = page.soup.find('form', attrs={'name': 'loginForm'})
@@ -38,14 +84,28 @@ class SigaaLoginImpl(SigaaLogin):
 
         return full_action_url, post_values
 
+    @timed_async('login')
     async def login(self, username, password):
         if self.login_status:
             # If already logged in, return current page logic?
             # Ideally we shouldn't be here, but let's assume valid state.
             pass
 
+        cached = get_cached_login_form(self.session.base_url) if LOGIN_FORM_TTL > 0 else None
+        if cached is not None:
+            LOGIN_FORM_CACHE.inc(1, 'hit')
+            try:
+                return await self._submit(*cached, username, password, cached=True)
+            except _StaleLoginForm:
+                LOGIN_FORM_CACHE.inc(1, 'stale')
+                invalidate_login_form(self.session.base_url)
+        else:
+            LOGIN_FORM_CACHE.inc(1, 'miss')
+
         action_url, post_values = await self.get_login_form()
+        return await self._submit(action_url, post_values, username, password)
 
+    async def _submit(self, action_url, post_values, username, password, cached=False):
         post_values['user.login'] = username
         post_values['user.senha'] = password
 
@@ -62,9 +122,12 @@ class SigaaLoginImpl(SigaaLogin):
 
         # Check if we are logged in.
         # IFAL might differ slightly in text, but usually "Entrar no Sistema" indicates failure/redirect back to login.
-        if 'Entrar no Sistema' in page.body or 'Usuário e/ou senha inválidos' in page.body:
-             if 'Usuário e/ou senha inválidos' in page.body:
+        if page.contains('Entrar no Sistema') or page.contains('Usuário e/ou senha inválidos'):
+             if page.contains('Usuário e/ou senha inválidos'):
                  raise SigaaInvalidCredentials('SIGAA: Invalid credentials.')
+             elif cached:
+                 # Back on the login form without an error: the cached form no longer works
+                 raise _StaleLoginForm()
              else:
                  # Check if it's just a redirect back to login without error message (session expire during login?)
                  # Or maybe successful login redirects elsewhere?
@@ -0,0 +1,233 @@
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+# Lightweight in-process metrics (no external dependency).
+# Histograms/counters are rendered in the Prometheus text format by REGISTRY.render(),
+# and RequestStats accumulates per-request totals through a context variable so that
+# the hot paths in sigaa_api don't need to know which Flask request they serve.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    inner = ','.join('%s="%s"' % (k, str(v).replace('\\', '\\\\').replace('"', '\\"')) for k, v in pairs)
+    return '{' + inner + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets) + (float('inf'),)
+        self._lock = threading.Lock()
+        # label values -> [bucket counts..., sum, count]
+        self._series = {}
+
+    def observe(self, value, *labelvalues):
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted(self._series.items())
+            for labelvalues, series in items:
+                for i, bound in enumerate(self.buckets):
+                    labels = _format_labels(self.labelnames, labelvalues, ('le', _format_value(bound)))
+                    lines.append(f"{self.name}_bucket{labels} {series[i]}")
+                labels = _format_labels(self.labelnames, labelvalues)
+                lines.append(f"{self.name}_sum{labels} {series[-2]!r}")
+                lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, amount=1, *labelvalues):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labelvalues, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}")
+        return lines
+
+
+class Gauge:
+    """Gauge whose value is read from a callback at render time."""
+
+    def __init__(self, name, documentation, callback):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+
+    def render(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge",
+                f"{self.name} {_format_value(self.callback())}"]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            return metric
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets)
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, callback):
+        return self._get_or_create(Gauge, name, documentation, callback)
+
+    def render(self):
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    'sigaa_stage_duration_seconds', 'Time spent per pipeline stage.', ('stage',))
+UPSTREAM_REQUESTS = REGISTRY.counter(
+    'sigaa_upstream_requests_total', 'Requests sent to SIGAA.', ('method',))
+UPSTREAM_BYTES = REGISTRY.counter(
+    'sigaa_upstream_response_bytes_total', 'Response body bytes received from SIGAA.')
+
+
+class RequestStats:
+    """Per-request totals, summarized in Server-Timing and in the stream stats message."""
+    __slots__ = ('started', 'network_time', 'parse_time', 'upstream_requests', 'bytes_received', 'stages')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.network_time = 0.0
+        self.parse_time = 0.0
+        self.upstream_requests = 0
+        self.bytes_received = 0
+        self.stages = {}
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def add_stage(self, stage, seconds):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def as_dict(self):
+        return {
+            'total_ms': round(self.elapsed * 1000, 1),
+            'network_ms': round(self.network_time * 1000, 1),
+            'parse_ms': round(self.parse_time * 1000, 1),
+            'upstream_requests': self.upstream_requests,
+            'bytes': self.bytes_received,
+            'stages_ms': {k: round(v * 1000, 1) for k, v in self.stages.items()},
+        }
+
+    def server_timing(self):
+        parts = [
+            f'upstream;dur={self.network_time * 1000:.1f};desc="{self.upstream_requests} requests"',
+            f'parse;dur={self.parse_time * 1000:.1f}',
+        ]
+        for stage, seconds in self.stages.items():
+            parts.append(f'{stage};dur={seconds * 1000:.1f}')
+        parts.append(f'total;dur={self.elapsed * 1000:.1f}')
+        return ', '.join(parts)
+
+
+_current_stats = contextvars.ContextVar('sigaa_request_stats', default=None)
+
+
+def start_request_stats():
+    stats = RequestStats()
+    _current_stats.set(stats)
+    return stats
+
+
+def current_stats():
+    return _current_stats.get()
+
+
+def record_upstream(method, seconds, size):
+    STAGE_SECONDS.observe(seconds, 'upstream_request')
+    UPSTREAM_REQUESTS.inc(1, method)
+    UPSTREAM_BYTES.inc(size)
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.network_time += seconds
+        stats.upstream_requests += 1
+        stats.bytes_received += size
+
+
+def record_parse(seconds):
+    STAGE_SECONDS.observe(seconds, 'parse')
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.parse_time += seconds
+
+
+@contextmanager
+def timed(stage, per_request=False):
+    """Observes the block duration in the stage histogram (and in RequestStats.stages if per_request)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage)
+        if per_request:
+            stats = _current_stats.get()
+            if stats is not None:
+                stats.add_stage(stage, elapsed)
+
+
+def timed_async(stage):
+    """Decorator version of timed() for coroutines."""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with timed(stage):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,96 @@
+class Grade:
+    """A single grade cell. Also used for the sub-grades of a GradeGroup."""
+    __slots__ = ('name', 'value')
+    type = 'single'
+
+    def __init__(self, name, value):
+        self.name = name
+        self.value = value
+
+    def __repr__(self):
+        return f"<Grade name='{self.name}' value={self.value}>"
+
+
+class GradeGroup:
+    """A unit column split into sub-grades (A1, A2, Nota...)."""
+    __slots__ = ('name', 'grades')
+    type = 'group'
+
+    def __init__(self, name, grades):
+        self.name = name
+        self.grades = grades
+
+    @property
+    def value(self):
+        # SIGAA keeps the consolidated unit grade in the last filled sub-column
+        last_val = None
+        for sub in self.grades:
+            if sub.value is not None:
+                last_val = sub.value
+        return last_val
+
+    def __repr__(self):
+        return f"<GradeGroup name='{self.name}' grades={len(self.grades)}>"
+
+
+class Frequency:
+    """Absences of a course; the per-date map ("Mapa de Frequências") when SIGAA shows one."""
+    __slots__ = ('total_faltas', 'max_faltas', 'percent', 'lessons', 'bimesters', 'dates', 'total_classes')
+
+    def __init__(self, total_faltas=0, max_faltas=0, percent=0.0, lessons=0, bimesters=(), dates=(),
+                 total_classes=None):
+        self.total_faltas = total_faltas
+        self.max_faltas = max_faltas
+        self.percent = percent
+        # Lesson dates registered so far, absences per bimester (empty when the school calendar of
+        # those dates isn't configured, see course.BIMESTER_STARTS), and ((iso date, absences), ...)
+        self.lessons = lessons
+        self.bimesters = tuple(bimesters)
+        self.dates = tuple(dates)
+        # Classes in the whole course, percent's denominator (SIGAA's limit is 25% of them)
+        self.total_classes = max_faltas * 4 if total_classes is None else total_classes
+
+    def __repr__(self):
+        return f"<Frequency faltas={self.total_faltas}/{self.max_faltas}>"
+
+
+class CourseGrades:
+    """Bimester notes in the shape the dashboard expects (b1Notes ... r2Note)."""
+    __slots__ = ('b1_notes', 'b2_notes', 'b3_notes', 'b4_notes', 'r1_note', 'r2_note')
+
+    def __init__(self, b1_notes=(), b2_notes=(), b3_notes=(), b4_notes=(), r1_note=None, r2_note=None):
+        # Tuples: immutable, smaller than lists and safe to share between cached snapshots
+        self.b1_notes = tuple(b1_notes)
+        self.b2_notes = tuple(b2_notes)
+        self.b3_notes = tuple(b3_notes)
+        self.b4_notes = tuple(b4_notes)
+        self.r1_note = r1_note
+        self.r2_note = r2_note
+
+    def __eq__(self, other):
+        if not isinstance(other, CourseGrades):
+            return NotImplemented
+        return all(getattr(self, attr) == getattr(other, attr) for attr in self.__slots__)
+
+    def __repr__(self):
+        return (f"<CourseGrades b1={self.b1_notes} b2={self.b2_notes} b3={self.b3_notes} "
+                f"b4={self.b4_notes} r1={self.r1_note} r2={self.r2_note}>")
+
+
+class CourseResult:
+    """Everything the stream knows about one course of the student."""
+    __slots__ = ('id', 'name', 'obs', 'grades', 'frequency', 'status', 'key')
+
+    def __init__(self, id, name, obs, grades=None, frequency=None, status=None, key=None):
+        self.id = id
+        self.name = name
+        self.obs = obs
+        self.grades = grades
+        self.frequency = frequency
+        # Server-computed SubjectStatus (see app/grading.py), optional
+        self.status = status
+        # pipeline.course_key of the SIGAA course, for /api/course/<key>
+        self.key = key
+
+    def __repr__(self):
+        return f"<CourseResult id={self.id} name='{self.name}'>"
@@ -0,0 +1,96 @@
+import collections
+import os
+
+from .metrics import REGISTRY
+
+# How to reach a course's grades and frequency pages, learned from its menu the first time.
+# Opening them normally takes: enter the course (POST from the portal), parse the course page,
+# find "Ver Notas"/"Frequência" and parse its jsfcljs call, then POST it. A plan keeps that last
+# POST (action and form values, without the ViewState), so the next time the menu action is sent
+# straight away with a fresh ViewState. If SIGAA doesn't take it (new menu ids after a deploy,
+# expired view, another course selected) the caller goes through the menu again.
+#
+# The course still has to be entered first: SIGAA keeps the selected course in the server-side
+# session. That entry is skipped when the session is already on the course (frequency right after
+# grades). Plans are per student and idTurma, so they are per semester too.
+
+NAV_PLANS_MAX = int(os.environ.get('NAV_PLANS_MAX', 20000))
+# Rejected jumps in a row after which a course's grades (or frequency) page is always opened through the menu
+MAX_REJECTIONS = 2
+
+VIEW_STATE = 'javax.faces.ViewState'
+# Found on the target page when it has content; a jump whose page lacks it is rejected
+MARKERS = {'grades': 'tabelaRelatorio', 'frequency': 'Total de Faltas'}
+
+NAV_JUMPS = REGISTRY.counter(
+    'sigaa_navigation_jumps_total', 'Grade/frequency pages requested straight from a cached plan.', ('result',))
+
+
+class Step:
+    __slots__ = ('action', 'values', 'marked')
+
+    def __init__(self, action, values, marked=None):
+        self.action = action
+        self.values = {k: v for k, v in values.items() if k != VIEW_STATE}
+        # Whether the page had its marker: True/False once it was opened (through the menu or a jump),
+        # None for a step read from the menu but not followed yet. A jump only counts when its page has
+        # the marker, so a course without grades yet (no grades table, marked False) isn't jumped to:
+        # Course._open goes through the menu until the table shows up.
+        self.marked = marked
+
+    def form(self, view_state):
+        return {**self.values, VIEW_STATE: view_state}
+
+    def same(self, other):
+        return self.action == other.action and self.values == other.values
+
+
+class PlanStore:
+    # Used from the event loop thread only
+    def __init__(self, max_courses=NAV_PLANS_MAX):
+        self.max_courses = max_courses
+        # (registration, idTurma) -> [{kind: Step}, {kind: rejections in a row}]
+        self._courses = collections.OrderedDict()
+
+    def get(self, registration, course_id, kind):
+        entry = self._courses.get((registration, course_id))
+        if entry is None:
+            return None
+        self._courses.move_to_end((registration, course_id))
+        return entry[0].get(kind)
+
+    def put(self, registration, course_id, steps):
+        """Steps ({kind: Step}) learned from the course menu; replaces what was known for the course."""
+        if not course_id or not steps:
+            return
+        entry = self._courses.setdefault((registration, course_id), [{}, {}])
+        known, rejections = entry
+        plan = {}
+        for kind, step in steps.items():
+            # Jumps that keep failing for a page (one SIGAA renders differently) cost a request each;
+            # they are counted per kind, so a bad frequency step doesn't cost the grades plan
+            if rejections.get(kind, 0) >= MAX_REJECTIONS:
+                continue
+            # A step that wasn't followed this time keeps what the last visit learned about its page
+            previous = known.get(kind)
+            if step.marked is None and previous is not None and previous.same(step):
+                step = previous
+            plan[kind] = step
+        entry[0] = plan
+        self._courses.move_to_end((registration, course_id))
+        while len(self._courses) > self.max_courses:
+            self._courses.popitem(last=False)
+
+    def accepted(self, registration, course_id, kind):
+        entry = self._courses.get((registration, course_id))
+        if entry is not None:
+            entry[1].pop(kind, None)
+
+    def rejected(self, registration, course_id, kind):
+        entry = self._courses.get((registration, course_id))
+        if entry is not None:
+            entry[0].pop(kind, None)
+            entry[1][kind] = entry[1].get(kind, 0) + 1
+
+
+PLANS = PlanStore()
@@ -1,35 +1,119 @@
+import html
 import json
 import re
+import time
+import weakref
 from urllib.parse import urljoin
 from bs4 import BeautifulSoup
+from lxml import etree
 from .types import HTTPMethod
 from .exceptions import SigaaSessionExpired
+from .metrics import REGISTRY, record_parse
+
+# Every page still referenced somewhere, used to report what keeps memory alive
+_live_pages = weakref.WeakSet()
+
+_VIEW_STATE_INPUT = re.compile(r'<input\b[^>]*\bname=["\']javax\.faces\.ViewState["\'][^>]*>', re.IGNORECASE)
+_VALUE_ATTR = re.compile(r'\bvalue=["\']([^"\']*)["\']')
 
 class SigaaPage:
-    def __init__(self, url, body, headers, method, status_code, request_headers=None):
+    # BeautifulSoup tree builder; bench/parsers.py swaps it to compare backends
+    features = 'lxml'
+
+    def __init__(self, url, body, headers, method, status_code, request_headers=None, charset=None):
         self.url = url
-        self.body = body
+        # body may be the raw bytes of the response (with their charset) or already decoded text.
+        # Raw bytes go straight to lxml; the text is only decoded if someone asks for page.body.
+        if isinstance(body, bytes):
+            self.content = body
+            self._body = None
+        else:
+            self.content = None
+            self._body = body
+        self.charset = charset
         self.headers = headers
         self.method = method
         self.status_code = status_code
         self.request_headers = request_headers or {}
         self._soup = None
+        self._tree = None
         self._view_state = None
 
+        _live_pages.add(self)
         self.check_session_expired()
 
+    @property
+    def body(self):
+        if self._body is None and self.content is not None:
+            self._body = self.content.decode(self.charset or 'utf-8', errors='replace')
+        return self._body
+
+    @property
+    def size(self):
+        return len(self.content) if self.content is not None else len(self._body or '')
+
+    def contains(self, text):
+        """Substring check that doesn't decode the whole page."""
+        if self._body is None and self.content is not None:
+            try:
+                return text.encode(self.charset or 'utf-8') in self.content
+            except UnicodeEncodeError:
+                pass
+        return text in self.body
+
     @property
     def soup(self):
         if self._soup is None:
-            self._soup = BeautifulSoup(self.body, 'lxml')
+            start = time.perf_counter()
+            if self.content is not None:
+                # A known encoding skips bs4's detection pass
+                self._soup = BeautifulSoup(self.content, self.features, from_encoding=self.charset)
+            else:
+                self._soup = BeautifulSoup(self._body, self.features)
+            record_parse(time.perf_counter() - start)
         return self._soup
 
+    @property
+    def tree(self):
+        """
+        Plain lxml tree of the page, for parsers that only pick a few elements out of it:
+        several times cheaper to build than the BeautifulSoup one.
+        """
+        if self._tree is None:
+            start = time.perf_counter()
+            if self.content is not None:
+                self._tree = etree.fromstring(self.content, etree.HTMLParser(encoding=self.charset))
+            else:
+                self._tree = etree.fromstring(self._body, etree.HTMLParser())
+            record_parse(time.perf_counter() - start)
+        return self._tree
+
+    def release(self):
+        """
+        Drops the parsed tree (and decoded text) once a parser is done with the page.
+        The raw body is kept, so both are rebuilt lazily if someone still needs them.
+        """
+        if self._soup is not None:
+            # decompose() breaks the parent/child cycles so the tree is freed right away
+            self._soup.decompose()
+            self._soup = None
+        self._tree = None
+        if self.content is not None:
+            # Decoded text can be rebuilt from the bytes too
+            self._body = None
+
     @property
     def view_state(self):
         if self._view_state is None:
-            input_el = self.soup.find('input', attrs={'name': 'javax.faces.ViewState'})
-            if input_el:
-                self._view_state = input_el.get('value')
+            # Plain text search first: a navigation that only needs the ViewState shouldn't build the soup
+            match = _VIEW_STATE_INPUT.search(self.body)
+            value = _VALUE_ATTR.search(match.group(0)) if match else None
+            if value:
+                self._view_state = html.unescape(value.group(1))
+            elif self.contains('javax.faces.ViewState'):
+                input_el = self.soup.find('input', attrs={'name': 'javax.faces.ViewState'})
+                if input_el:
+                    self._view_state = input_el.get('value')
         return self._view_state
 
     def check_session_expired(self):
@@ -126,3 +210,23 @@ class SigaaPage:
             'action': action,
             'post_values': post_values
         }
+
+
+def retained_pages_report(limit=5):
+    """Largest pages still alive in this process, biggest first."""
+    pages = sorted(list(_live_pages), key=lambda p: p.size, reverse=True)
+    return [{
+        'url': str(page.url),
+        'size': page.size,
+        'has_text': page._body is not None,
+        'has_soup': page._soup is not None,
+        'has_tree': page._tree is not None,
+    } for page in pages[:limit]]
+
+
+REGISTRY.gauge('sigaa_retained_pages', 'SigaaPage objects alive in this process.',
+               lambda: len(_live_pages))
+REGISTRY.gauge('sigaa_retained_page_soups', 'Alive SigaaPage objects holding a parsed tree.',
+               lambda: sum(1 for page in list(_live_pages) if page._soup is not None))
+REGISTRY.gauge('sigaa_retained_page_body_size', 'Total body size (bytes, or chars for text pages) of alive SigaaPage objects.',
+               lambda: sum(page.size for page in list(_live_pages)))
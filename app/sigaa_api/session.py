@@ -1,14 +1,51 @@
-import aiohttp
 import asyncio
+import codecs
+import os
+import re
+import time
 from .types import HTTPMethod
 from .page import SigaaPage
-from .exceptions import SigaaConnectionError
-from urllib.parse import urljoin
+from .metrics import record_upstream
+from .transport import AiohttpTransport
+from urllib.parse import urljoin, urlsplit
+
+# SIGAA pages are a few hundred KB at most; anything bigger is an error page loop or abuse
+DEFAULT_MAX_BODY_SIZE = int(os.environ.get('SIGAA_MAX_BODY_BYTES', 5 * 1024 * 1024))
+
+_META_CHARSET = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?([\w.:-]+)', re.IGNORECASE)
+# SIGAA serves every page of a host with the same charset, so the <meta> sniff is done once per host
+_host_charsets = {}
+
+
+def _codec_name(charset):
+    try:
+        return codecs.lookup(charset).name if charset else None
+    except LookupError:
+        return None
+
+
+def resolve_charset(url, header_charset, body):
+    """Content-Type header first, then the host's cached decision, then a <meta> sniff."""
+    charset = _codec_name(header_charset)
+    if charset:
+        return charset
+
+    host = urlsplit(str(url)).netloc
+    charset = _host_charsets.get(host)
+    if charset:
+        return charset
+
+    match = _META_CHARSET.search(body, 0, 4096)
+    charset = _codec_name(match.group(1).decode('ascii')) if match else None
+    if charset:
+        _host_charsets[host] = charset
+    return charset or 'utf-8'
+
 
 class SigaaSession:
-    def __init__(self, url, cookies=None):
+    def __init__(self, url, cookies=None, max_body_size=DEFAULT_MAX_BODY_SIZE, transport=None):
         self.base_url = url
-        self._session = None
+        self.max_body_size = max_body_size
         self.headers = {
             'User-Agent': 'SIGAA-Api/1.0 (https://github.com/GeovaneSchmitz/sigaa-api)',
             'Accept-Encoding': 'br, gzip, deflate',
@@ -16,64 +53,49 @@ class SigaaSession:
             'Cache-Control': 'max-age=0',
             'DNT': '1'
         }
-        self._initial_cookies = cookies
-
-    async def _get_session(self):
-        if self._session is None:
-            # unsafe=True is required to handle legacy cookies from SIGAA that might violate RFCs (e.g., IP domains or special chars)
-            # This is a known acceptance of risk for compatibility.
-            cookie_jar = aiohttp.CookieJar(unsafe=True)
-            if self._initial_cookies:
-                # Assuming _initial_cookies is a dict or simple cookie list
-                # aiohttp.CookieJar updates from dict or SimpleCookie
-                cookie_jar.update_cookies(self._initial_cookies)
-
-            self._session = aiohttp.ClientSession(
-                headers=self.headers,
-                cookie_jar=cookie_jar
-            )
-        return self._session
+        # See transport.py for the record/replay transports used offline
+        self.transport = transport or AiohttpTransport(self.headers, cookies=cookies, max_body_size=max_body_size)
+        # (idTurma, ViewState) while the last response was a page of that course; Course sets it,
+        # any other request clears it (see navigation.py)
+        self.course_view = None
+
+    def get_cookies(self):
+        return self.transport.cookies()
 
     async def close(self):
-        if self._session:
-            await self._session.close()
-            self._session = None
+        await self.transport.close()
 
     async def request(self, method, path, data=None, json=None, retry_count=0, **kwargs):
-        session = await self._get_session()
         url = path if path.startswith('http') else f"{self.base_url}{path}"
-
-        try:
-            async with session.request(method, url, data=data, json=json, **kwargs) as response:
-                # We read body here because we close the response context
-                # SigaaPage expects full body
-                body = await response.text()
-                # body_bytes = await response.read() # For binary if needed
-
-                page = SigaaPage(
-                    url=response.url,
-                    body=body,
-                    headers=dict(response.headers),
-                    method=method,
-                    status_code=response.status,
-                    request_headers=dict(response.request_info.headers)
-                )
-
-                # Global Questionnaire Interceptor
-                # If we encounter the questionnaire, we try to skip it and then retry the original request
-                if page.soup.find(id='btnNaoResponderContinuarSigaa'):
-                    if retry_count >= 3:
-                        # Avoid infinite loops if skipping fails repeatedly
-                        return page
-
-                    await self._handle_questionnaire(page)
-                    # Retry the original request
-                    return await self.request(method, path, data=data, json=json, retry_count=retry_count+1, **kwargs)
-
+        self.course_view = None
+
+        start = time.perf_counter()
+        response = await self.transport.send(method, url, data=data, json=json, **kwargs)
+        record_upstream(method, time.perf_counter() - start, len(response.body))
+
+        # The page keeps the raw bytes; lxml parses them directly and text is decoded only on demand
+        page = SigaaPage(
+            url=response.url,
+            body=response.body,
+            headers=response.headers,
+            method=method,
+            status_code=response.status,
+            request_headers=response.request_headers,
+            charset=resolve_charset(response.url, response.charset, response.body)
+        )
+
+        # Global Questionnaire Interceptor
+        # If we encounter the questionnaire, we try to skip it and then retry the original request
+        if page.contains('btnNaoResponderContinuarSigaa') and page.soup.find(id='btnNaoResponderContinuarSigaa'):
+            if retry_count >= 3:
+                # Avoid infinite loops if skipping fails repeatedly
                 return page
 
-        except aiohttp.ClientError as e:
-            raise SigaaConnectionError(f"Connection error: {e}")
+            await self._handle_questionnaire(page)
+            # Retry the original request
+            return await self.request(method, path, data=data, json=json, retry_count=retry_count+1, **kwargs)
+
+        return page
 
     async def _handle_questionnaire(self, page):
         """
@@ -116,13 +138,11 @@ class SigaaSession:
         # Using self.post is fine because if it recurses, it means skipping failed, which is a real error.
         # But to avoid deep recursion, let's assume one level is enough.
 
-        # Actually, let's use the underlying session to avoid triggering the interceptor on the skip request itself
+        # Actually, let's use the transport directly to avoid triggering the interceptor on the skip request itself
         # (though strictly speaking we might want to check the skip response too).
         # But the skip response is usually just a redirect or partial update.
 
-        session = await self._get_session()
-        async with session.post(action_url, data=post_values) as resp:
-             await resp.text() # Consume body
+        await self.transport.send(HTTPMethod.POST.value, action_url, data=post_values)
 
     async def get(self, path, **kwargs):
         return await self.request(HTTPMethod.GET.value, path, **kwargs)
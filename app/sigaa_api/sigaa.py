@@ -1,13 +1,27 @@
+import asyncio
+import logging
+import os
 from .session import SigaaSession
 from .login import SigaaLoginImpl
 from .account import Account
+from .bond import StudentBond
+from .metrics import REGISTRY
 from .types import InstitutionType
 
+logger = logging.getLogger(__name__)
+
+# SIGAA keeps the selected bond in the server-side session, so bonds sharing one login have to be
+# scraped one after the other. Up to this many bonds get a login (a JSESSIONID) of their own.
+MAX_BOND_SESSIONS = int(os.environ.get('SIGAA_MAX_BOND_SESSIONS', 4))
+
+BOND_LOGINS = REGISTRY.counter(
+    'sigaa_bond_logins_total', 'Extra SIGAA logins for multi-bond students, by outcome.', ('result',))
+
 class Sigaa:
-    def __init__(self, url, institution=InstitutionType.IFAL, cookies=None):
+    def __init__(self, url, institution=InstitutionType.IFAL, cookies=None, transport=None):
         self.url = url
         self.institution = institution
-        self.session = SigaaSession(url, cookies=cookies)
+        self.session = SigaaSession(url, cookies=cookies, transport=transport)
 
         # Use generic implementation for IFAL and IFSC as they are similar
         if institution in [InstitutionType.IFSC, InstitutionType.IFAL]:
@@ -22,5 +36,49 @@ class Sigaa:
         page = await self.login_controller.login(username, password)
         return Account(self.session, page)
 
+    async def bond_sessions(self, account, username, password, limit=MAX_BOND_SESSIONS):
+        """
+        Cookies of an isolated SIGAA session for each active student bond, as a list of
+        (bond, cookies) pairs. The first bond with courses keeps this session (cookies None); the
+        other bonds with courses log in again with the same credentials. Bonds without courses, and
+        a bond whose extra login fails, also get None and share this session.
+        """
+        bonds = [bond for bond in account.active_bonds if isinstance(bond, StudentBond)]
+        if len(bonds) < 2:
+            return [(bond, None) for bond in bonds]
+
+        # An extra login costs SIGAA a full password login; only worth it when there's something to
+        # scrape in parallel. Usually a single bond has courses (the other one finished or paused).
+        scraped = [bond for bond in bonds if await self._has_courses(bond)]
+        if len(scraped) < 2:
+            BOND_LOGINS.inc(len(bonds) - 1, 'skipped')
+            return [(bond, None) for bond in bonds]
+
+        async def login_again():
+            sigaa = Sigaa(self.url, self.institution)
+            try:
+                await sigaa.login(username, password)
+                return sigaa.session.get_cookies()
+            except Exception as e:
+                logger.warning(f"Extra bond login failed: {type(e).__name__}")
+                return None
+            finally:
+                await sigaa.close()
+
+        extra = await asyncio.gather(*(login_again() for _ in scraped[1:limit]))
+        for cookies in extra:
+            BOND_LOGINS.inc(1, 'ok' if cookies else 'failed')
+        own = dict(zip(map(id, scraped[1:limit]), extra))
+        return [(bond, own.get(id(bond))) for bond in bonds]
+
+    @staticmethod
+    async def _has_courses(bond):
+        try:
+            return bool(await bond.get_courses())
+        except Exception as e:
+            # Can't tell: assume it has, like before this check existed
+            logger.warning(f"Could not list courses of a bond: {type(e).__name__}")
+            return True
+
     async def close(self):
         await self.session.close()
@@ -0,0 +1,297 @@
+import asyncio
+import collections
+import gzip
+import json
+import os
+import random
+import re
+import weakref
+
+import aiohttp
+from yarl import URL
+
+from .exceptions import SigaaConnectionError, SigaaResponseTooLarge
+
+# Transports sit under SigaaSession.request and do the actual HTTP exchange.
+#   AiohttpTransport   - real network (default)
+#   RecordingTransport - wraps another transport and saves scrubbed exchanges to a cassette
+#   ReplayTransport    - serves exchanges from a cassette, no network at all
+#
+# Cassettes are gzip'ed JSON lines: a header line followed by one exchange per line.
+
+CASSETTE_VERSION = 1
+REDACTED = 'REDACTED'
+# Stands in for personal strings (the student's name) inside pages. It still looks like a name,
+# since the grades parser spots the student's row by it.
+REDACTED_NAME = 'Fulano de Tal'
+
+# Form fields that carry credentials
+_SECRET_FIELDS = re.compile(r'senha|password|login|cpf', re.IGNORECASE)
+_SECRET_HEADERS = {'cookie', 'set-cookie', 'authorization'}
+# Not meaningful once the body is scrubbed
+_DROPPED_HEADERS = _SECRET_HEADERS | {'content-length', 'content-encoding', 'transfer-encoding', 'date'}
+# Also found in page links and form actions, so it stops at anything that ends an attribute
+_JSESSIONID = re.compile(r';jsessionid=[^?#&"\'<>\s]*', re.IGNORECASE)
+_CPF = re.compile(r'\b\d{3}\.\d{3}\.\d{3}-\d{2}\b')
+_EMAIL = re.compile(r'[\w.+-]+@[\w-]+\.[\w.-]+')
+
+
+class TransportResponse:
+    __slots__ = ('url', 'status', 'headers', 'body', 'charset', 'request_headers')
+
+    def __init__(self, url, status, headers, body, charset=None, request_headers=None):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.charset = charset
+        self.request_headers = request_headers or {}
+
+
+# Keep-alive connections are shared by every session on the same event loop, so a user's
+# first request can reuse a TLS connection opened by someone else (or by the startup warm-up).
+# Cookies live in each ClientSession's jar, never in the pool.
+POOL_LIMIT = int(os.environ.get('SIGAA_POOL_LIMIT', 100))
+POOL_KEEPALIVE = float(os.environ.get('SIGAA_POOL_KEEPALIVE', 30))
+_connectors = weakref.WeakKeyDictionary()
+
+
+def shared_connector():
+    """Connection pool of the running event loop."""
+    loop = asyncio.get_running_loop()
+    connector = _connectors.get(loop)
+    if connector is None or connector.closed:
+        connector = _connectors[loop] = aiohttp.TCPConnector(
+            limit=POOL_LIMIT, keepalive_timeout=POOL_KEEPALIVE, ttl_dns_cache=300)
+    return connector
+
+
+async def close_shared_connector():
+    """Closes the running loop's pool, for short-lived loops (the export CLI) that end with the process."""
+    connector = _connectors.pop(asyncio.get_running_loop(), None)
+    if connector is not None:
+        await connector.close()
+
+
+class AiohttpTransport:
+    def __init__(self, headers, cookies=None, max_body_size=None):
+        self.headers = headers
+        self.max_body_size = max_body_size
+        self._initial_cookies = cookies
+        self._session = None
+
+    async def _get_session(self):
+        if self._session is None:
+            # unsafe=True is required to handle legacy cookies from SIGAA that might violate RFCs (e.g., IP domains or special chars)
+            # This is a known acceptance of risk for compatibility.
+            cookie_jar = aiohttp.CookieJar(unsafe=True)
+            if self._initial_cookies:
+                cookie_jar.update_cookies(self._initial_cookies)
+
+            self._session = aiohttp.ClientSession(
+                headers=self.headers,
+                cookie_jar=cookie_jar,
+                connector=shared_connector(),
+                connector_owner=False
+            )
+        return self._session
+
+    async def send(self, method, url, data=None, json=None, **kwargs):
+        session = await self._get_session()
+        try:
+            async with session.request(method, url, data=data, json=json, **kwargs) as response:
+                # We read body here because we close the response context
+                body = await self._read_body(response)
+                return TransportResponse(
+                    url=response.url,
+                    status=response.status,
+                    headers=dict(response.headers),
+                    body=body,
+                    charset=response.charset,
+                    request_headers=dict(response.request_info.headers)
+                )
+        except aiohttp.ClientError as e:
+            raise SigaaConnectionError(f"Connection error: {e}")
+
+    async def _read_body(self, response):
+        """Reads the body in chunks, giving up as soon as it exceeds max_body_size."""
+        limit = self.max_body_size
+        if limit and response.content_length is not None and response.content_length > limit:
+            raise SigaaResponseTooLarge(f"Response too large: {response.content_length} bytes")
+
+        buffer = bytearray()
+        async for chunk in response.content.iter_chunked(64 * 1024):
+            buffer += chunk
+            if limit and len(buffer) > limit:
+                raise SigaaResponseTooLarge(f"Response larger than {limit} bytes")
+        return bytes(buffer)
+
+    def cookies(self):
+        if self._session is None:
+            return dict(self._initial_cookies or {})
+        return {cookie.key: cookie.value for cookie in self._session.cookie_jar}
+
+    async def close(self):
+        if self._session:
+            await self._session.close()
+            self._session = None
+
+
+def _normalize_url(url):
+    # Session ids in the path change on every login and must not affect matching
+    return _JSESSIONID.sub('', str(url))
+
+
+def _match_key(method, url):
+    # Host is left out so a cassette recorded against SIGAA replays under any base URL
+    return method, URL(_normalize_url(url)).path_qs
+
+
+class Scrubber:
+    """Removes credentials, cookies and personal data from recorded exchanges."""
+
+    def __init__(self, redact=(), registrations=()):
+        self.redact = []
+        # {registration: placeholder}; compiled into one pattern when it changes
+        self.registrations = {}
+        self._registration_re = None
+        self.add(redact)
+        self.add_registrations(registrations)
+
+    def add(self, redact):
+        # Longest first so "Maria da Silva" wins over "Maria"
+        self.redact = sorted({*self.redact, *(s for s in redact if s)}, key=len, reverse=True)
+
+    def add_registrations(self, registrations):
+        """
+        Student registrations (matrículas). Each one gets its own placeholder of the same length,
+        so bonds stay apart on replay (snapshots, navigation plans and history are keyed by them).
+        """
+        for registration in registrations:
+            if registration and registration not in self.registrations:
+                number = str(len(self.registrations) + 1)
+                self.registrations[registration] = number.rjust(max(len(registration), len(number)), '0')
+        if self.registrations:
+            # Not inside longer numbers (idTurma and friends)
+            alternatives = '|'.join(map(re.escape, sorted(self.registrations, key=len, reverse=True)))
+            self._registration_re = re.compile(rf'(?<!\d)(?:{alternatives})(?!\d)')
+
+    def text(self, text):
+        for value in self.redact:
+            text = text.replace(value, REDACTED_NAME)
+        if self._registration_re is not None:
+            text = self._registration_re.sub(lambda m: self.registrations[m.group()], text)
+        text = _JSESSIONID.sub('', text)
+        text = _CPF.sub('000.000.000-00', text)
+        return _EMAIL.sub('redacted@example.com', text)
+
+    def form(self, data):
+        if not isinstance(data, dict):
+            return None
+        return {k: (REDACTED if _SECRET_FIELDS.search(k) else self.text(str(v)) if v is not None else None)
+                for k, v in data.items()}
+
+    def headers(self, headers):
+        # Location keeps the session id and may carry the registration in its query
+        return {k: self.text(v) for k, v in headers.items() if k.lower() not in _DROPPED_HEADERS}
+
+
+class RecordingTransport:
+    def __init__(self, inner, path, redact=(), registrations=()):
+        self.inner = inner
+        self.path = path
+        self.scrubber = Scrubber(redact, registrations)
+        self.exchanges = []
+
+    async def send(self, method, url, data=None, json=None, **kwargs):
+        response = await self.inner.send(method, url, data=data, json=json, **kwargs)
+        self.exchanges.append((method, url, data, response))
+        return response
+
+    def redact(self, *values):
+        """Personal strings learned mid-session (the student's name); applied to every exchange on save."""
+        self.scrubber.add(values)
+
+    def redact_registrations(self, *registrations):
+        """The student's registrations, once the bond list is known; applied to every exchange on save."""
+        self.scrubber.add_registrations(registrations)
+
+    def _scrubbed(self, method, url, data, response):
+        charset = response.charset or 'utf-8'
+        # surrogateescape keeps undecodable bytes, so replay returns the exact original body
+        body = response.body.decode(charset, errors='surrogateescape')
+        return {
+            'm': method,
+            # Scrubbed like the pages its links came from, so replayed requests still match
+            'u': self.scrubber.text(_match_key(method, url)[1]),
+            'd': self.scrubber.form(data),
+            's': response.status,
+            'fu': self.scrubber.text(_normalize_url(response.url)),
+            'h': self.scrubber.headers(response.headers),
+            'c': charset,
+            'b': self.scrubber.text(body),
+        }
+
+    def cookies(self):
+        return self.inner.cookies()
+
+    def save(self):
+        with gzip.open(self.path, 'wt', encoding='ascii') as f:
+            f.write(json.dumps({'version': CASSETTE_VERSION, 'exchanges': len(self.exchanges)}) + '\n')
+            for exchange in self.exchanges:
+                f.write(json.dumps(self._scrubbed(*exchange), separators=(',', ':')) + '\n')
+
+    async def close(self):
+        self.save()
+        await self.inner.close()
+
+
+def load_cassette(path):
+    with gzip.open(path, 'rt', encoding='ascii') as f:
+        header = json.loads(f.readline())
+        if header.get('version') != CASSETTE_VERSION:
+            raise ValueError(f"Unsupported cassette version: {header.get('version')}")
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class ReplayTransport:
+    """
+    Serves recorded exchanges in order for each (method, url).
+    latency/jitter (seconds) simulate SIGAA response times; the seed keeps runs reproducible.
+    """
+
+    def __init__(self, path_or_exchanges, latency=0.0, jitter=0.0, seed=0):
+        exchanges = path_or_exchanges
+        if isinstance(path_or_exchanges, str):
+            exchanges = load_cassette(path_or_exchanges)
+
+        self._queues = collections.defaultdict(collections.deque)
+        for exchange in exchanges:
+            self._queues[(exchange['m'], exchange['u'])].append(exchange)
+        self.latency = latency
+        self.jitter = jitter
+        self._random = random.Random(seed)
+
+    async def send(self, method, url, data=None, json=None, **kwargs):
+        queue = self._queues.get(_match_key(method, url))
+        if not queue:
+            raise SigaaConnectionError(f"Replay: no recorded exchange for {method} {_normalize_url(url)}")
+        exchange = queue.popleft() if len(queue) > 1 else queue[0]  # Last one repeats
+
+        delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        return TransportResponse(
+            url=URL(exchange['fu']),
+            status=exchange['s'],
+            headers=dict(exchange['h']),
+            body=exchange['b'].encode(exchange['c'], errors='surrogateescape'),
+            charset=exchange['c'],
+        )
+
+    def cookies(self):
+        return {}
+
+    async def close(self):
+        pass
@@ -0,0 +1,90 @@
+import collections
+import os
+import threading
+import time
+
+# Last known grades of each student, kept in memory per SIGAA registration.
+# Used to decide which courses to fetch first on the next stream; losing it (restart,
+# another worker) only means the default order is used.
+
+SNAPSHOT_MAX = int(os.environ.get('SNAPSHOT_MAX', 2000))
+RECENT_CHANGE_SECONDS = 7 * 24 * 3600
+
+# Fetch order buckets
+PRIORITY_RECENT = 0    # changed lately, or never seen: most likely to change again
+PRIORITY_PENDING = 1   # assessments still missing
+PRIORITY_SETTLED = 2   # every bimester graded and nothing changed lately
+
+
+class CourseSnapshot:
+    __slots__ = ('result', 'changed_at', 'seen_at')
+
+    def __init__(self, result, changed_at, seen_at):
+        self.result = result
+        self.changed_at = changed_at
+        self.seen_at = seen_at
+
+
+class SnapshotStore:
+    def __init__(self, max_students=SNAPSHOT_MAX):
+        self.max_students = max_students
+        self._students = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, registration):
+        """{course key: CourseSnapshot} for a student (a copy), empty if unknown."""
+        with self._lock:
+            courses = self._students.get(registration)
+            if courses is None:
+                return {}
+            self._students.move_to_end(registration)
+            return dict(courses)
+
+    def update(self, registration, key, result, now=None):
+        """Stores a freshly fetched CourseResult; returns True if its grades changed."""
+        now = now or time.time()
+        with self._lock:
+            courses = self._students.get(registration)
+            if courses is None:
+                courses = self._students[registration] = {}
+                while len(self._students) > self.max_students:
+                    self._students.popitem(last=False)
+            self._students.move_to_end(registration)
+
+            previous = courses.get(key)
+            # First sighting: we don't know when it last changed
+            changed = previous is not None and previous.result.grades != result.grades
+            changed_at = now if changed else (previous.changed_at if previous else None)
+            courses[key] = CourseSnapshot(result, changed_at, now)
+            return changed
+
+    def retain(self, registration, keys):
+        """Forgets courses the student no longer has (new period, dropped course)."""
+        keys = set(keys)
+        with self._lock:
+            courses = self._students.get(registration)
+            if courses is not None:
+                for key in [key for key in courses if key not in keys]:
+                    del courses[key]
+
+    def latest(self, registrations):
+        """CourseResults of the students' last streams, in stream (id) order."""
+        results = []
+        for registration in registrations:
+            results += [snapshot.result for snapshot in self.get(registration).values()]
+        return sorted(results, key=lambda result: result.id)
+
+
+def priority(snapshot, now=None):
+    now = now or time.time()
+    if snapshot is None:
+        return PRIORITY_RECENT
+    if snapshot.changed_at is not None and now - snapshot.changed_at < RECENT_CHANGE_SECONDS:
+        return PRIORITY_RECENT
+    grades = snapshot.result.grades
+    if grades is None or not all((grades.b1_notes, grades.b2_notes, grades.b3_notes, grades.b4_notes)):
+        return PRIORITY_PENDING
+    return PRIORITY_SETTLED
+
+
+STORE = SnapshotStore()
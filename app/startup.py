@@ -0,0 +1,116 @@
+import importlib
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Cold start helpers. The host sleeps when idle, so the first request after wake-up pays
+# for everything: heavy imports, the first TLS handshake to SIGAA, the supporters download.
+#
+# The routes import aiohttp/bs4/lxml/numpy lazily, so the app comes up (and renders /login)
+# without them. With WARMUP=1 a background thread then loads them, builds the static assets
+# (app/assets.py), opens a pooled connection to SIGAA (caching the login form on the way) and
+# fetches the supporters list, while the user is still typing their password. /ready reports when that is done.
+
+HEAVY_MODULES = ('aiohttp', 'bs4', 'lxml.etree', 'app.sigaa_api.sigaa', 'numpy')
+
+_ready = threading.Event()
+_report = {'warmup': 'disabled'}
+
+
+def warmup_enabled():
+    return os.environ.get('WARMUP', '0') not in ('', '0', 'false')
+
+
+def is_ready():
+    return _ready.is_set()
+
+
+def report():
+    return dict(_report)
+
+
+def _import_all():
+    timings = {}
+    for name in HEAVY_MODULES:
+        start = time.perf_counter()
+        try:
+            if name == 'numpy':
+                from .grading import _load_numpy
+                _load_numpy()
+            else:
+                importlib.import_module(name)
+        except ImportError as e:
+            logger.warning(f"Warm-up could not import {name}: {e}")
+        timings[name] = round((time.perf_counter() - start) * 1000, 1)
+    return timings
+
+
+async def _warm_connections(sigaa_url):
+    from .sigaa_api.sigaa import Sigaa, InstitutionType
+    from . import supporters
+
+    result = {}
+    start = time.perf_counter()
+    sigaa = Sigaa(sigaa_url, InstitutionType.IFAL)
+    try:
+        # Leaves a keep-alive connection in the shared pool and the login form in its cache
+        await sigaa.login_controller.get_login_form()
+        result['sigaa_ms'] = round((time.perf_counter() - start) * 1000, 1)
+    except Exception as e:
+        result['sigaa_error'] = type(e).__name__
+    finally:
+        await sigaa.close()
+
+    start = time.perf_counter()
+    result['supporters'] = len(await supporters.get_supporters())
+    result['supporters_ms'] = round((time.perf_counter() - start) * 1000, 1)
+    return result
+
+
+def _warmup(sigaa_url):
+    from . import aio, assets
+
+    start = time.perf_counter()
+    try:
+        _report['imports_ms'] = _import_all()
+        assets_start = time.perf_counter()
+        assets.ASSETS.build()
+        _report['assets_ms'] = round((time.perf_counter() - assets_start) * 1000, 1)
+        _report.update(aio.run(_warm_connections(sigaa_url)))
+        _report['warmup'] = 'done'
+    except Exception as e:
+        logger.error(f"Warm-up failed: {e}")
+        _report['warmup'] = 'failed'
+    finally:
+        _report['total_ms'] = round((time.perf_counter() - start) * 1000, 1)
+        _ready.set()
+        logger.info(f"Warm-up finished: {_report}")
+
+
+def start(sigaa_url):
+    if not warmup_enabled():
+        _ready.set()
+        return
+    _report['warmup'] = 'running'
+    threading.Thread(target=_warmup, args=(sigaa_url,), name='warmup', daemon=True).start()
+
+
+def import_times(limit=25):
+    """Slowest imports of a fresh interpreter creating the app, from python -X importtime."""
+    code = 'from app import create_app; create_app()'
+    env = dict(os.environ, WARMUP='0')
+    output = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], env=env,
+                            capture_output=True, text=True).stderr
+    rows = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        rows.append((int(cumulative), name.rstrip()))
+    rows.sort(reverse=True)
+    return rows[:limit]
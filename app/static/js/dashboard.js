@@ -0,0 +1,936 @@
+// --- CONFIG E DADOS ---
+// URLs vêm da página (dashboard.html), este arquivo é estático
+const URLS = JSON.parse(document.getElementById('dashboard-urls').textContent);
+// Disciplinas por id, na ordem de chegada. Cada uma guarda a situação (st) e os selos já calculados.
+const courses = new Map();
+const allCourses = () => [...courses.values()];
+const loadedCourses = () => allCourses().filter(d => !d.isLoading);
+let chart = null;
+let isStreamActive = false;
+let supportCardShown = false;
+let isSupporter = false;
+// Recarregar logo depois de um stream completo usa o stream "lazy": as disciplinas que o servidor
+// já conhece vêm do cache dele e só são buscadas no SIGAA quando abertas (/api/course/<key>).
+const LAZY_WINDOW_MS = 10 * 60 * 1000;
+
+// --- NAVEGAÇÃO DE ABAS ---
+window.switchTab = function(viewId) {
+  document.querySelectorAll('.view-section').forEach(el => el.classList.remove('active'));
+  document.querySelectorAll('.tab-btn').forEach(el => el.classList.remove('active'));
+
+  document.getElementById('view-' + viewId).classList.add('active');
+
+  const buttons = document.querySelectorAll('.tab-btn');
+  if(viewId === 'list') buttons[0].classList.add('active');
+  else if(viewId === 'stats') buttons[1].classList.add('active');
+  else if(viewId === 'frequency') buttons[2].classList.add('active');
+
+  if (viewId === 'stats') {
+      renderChart();
+  }
+  if (viewId === 'frequency') {
+      renderFrequency();
+  }
+  if (viewId === 'achievements') {
+      renderAchievements();
+  }
+}
+
+// --- PRIVACY MODE ---
+function togglePrivacy() {
+    document.body.classList.toggle('privacy-active');
+}
+
+// --- CARD DE APOIO ---
+function showSupportCard() {
+  if (supportCardShown) return;
+  supportCardShown = true;
+
+  const container = document.getElementById('cards-container');
+  const supportDiv = document.createElement('div');
+  supportDiv.className = 'card support-card';
+  supportDiv.onclick = () => window.location.href = URLS.support;
+
+  supportDiv.innerHTML = `
+    <div class="card-indicator" style="background:rgba(255,255,255,0.3)"></div>
+    <div class="row-top">
+      <div>
+        <div class="subj-name">✨ Apoie o Projeto</div>
+        <span class="subj-obs">Tenha acesso a funções antecipadas!</span>
+      </div>
+      <div class="score-box">
+        <div class="score-val">💝</div>
+        <span class="score-label">Premium</span>
+      </div>
+    </div>
+  `;
+
+  container.appendChild(supportDiv);
+}
+
+// Mostrar card de apoio após 5 segundos
+setTimeout(() => {
+  if (!isStreamActive) return;
+  showSupportCard();
+}, 5000);
+
+// --- UTILS ---
+function escapeHtml(text) {
+  if (text == null) return '';
+  return String(text)
+    .replace(/&/g, "&amp;")
+    .replace(/</g, "&lt;")
+    .replace(/>/g, "&gt;")
+    .replace(/"/g, "&quot;")
+    .replace(/'/g, "&#039;");
+}
+
+// --- WORKER DE SITUAÇÃO ---
+// Situação, selos e conquistas são calculados em static/js/status-worker.js, fora da thread da página.
+// Sem Worker (ou se ele falhar) as mesmas funções de grading.js rodam aqui.
+let statusWorker = null;
+const awaitingStatus = new Map(); // id -> disciplina enviada ao worker, ainda sem resposta
+let statusSeq = 0;
+const achievementsCallbacks = [];
+
+function computeLocally() {
+    statusWorker = null;
+    awaitingStatus.forEach(course => applySummary(course.id, courseSummary(course)));
+    awaitingStatus.clear();
+    while (achievementsCallbacks.length) achievementsCallbacks.shift()(new Set(unlockedAchievementIds(loadedCourses())));
+}
+
+try {
+    statusWorker = new Worker(URLS.statusWorker);
+    statusWorker.onmessage = (e) => {
+        const msg = e.data;
+        if (msg.type === 'course') {
+            // Only the answer to the latest request for a course still on the page
+            const course = awaitingStatus.get(msg.id);
+            if (!course || course.statusSeq !== msg.seq) return;
+            awaitingStatus.delete(msg.id);
+            applySummary(msg.id, msg);
+        } else if (msg.type === 'achievements' && achievementsCallbacks.length) {
+            achievementsCallbacks.shift()(new Set(msg.unlocked));
+        }
+    };
+    statusWorker.onerror = (e) => {
+        console.error("Status worker failed:", e);
+        computeLocally();
+    };
+} catch (e) {
+    statusWorker = null;
+}
+
+function requestStatus(course) {
+    if (!statusWorker) {
+        applySummary(course.id, courseSummary(course));
+        return;
+    }
+    course.statusSeq = ++statusSeq;
+    awaitingStatus.set(course.id, course);
+    statusWorker.postMessage({ type: 'course', course });
+}
+
+// A disciplina saiu da tela ou voltou a ser esqueleto: o worker não deve mais contá-la nas conquistas
+function forgetStatus(id) {
+    awaitingStatus.delete(id);
+    if (statusWorker) statusWorker.postMessage({ type: 'remove', id });
+}
+
+function applySummary(id, summary) {
+    const course = courses.get(id);
+    if (!course) return;
+    course.st = summary.st;
+    course.badges = summary.badges;
+    course.isLoading = false;
+    headerDirty = true;
+    freqDirty = true;
+    achievementsStale = true;
+    markDirty(id);
+}
+
+function requestAchievements(callback) {
+    if (!statusWorker) {
+        callback(new Set(unlockedAchievementIds(loadedCourses())));
+        return;
+    }
+    achievementsCallbacks.push(callback);
+    statusWorker.postMessage({ type: 'achievements' });
+}
+
+// --- RENDERIZAÇÃO EM LOTE ---
+// As mensagens do stream só marcam o que mudou; a tela é atualizada no máximo uma vez por frame.
+const dirtyCards = new Set();
+let headerDirty = false;
+let freqDirty = false;
+let achievementsStale = false;
+let frameRequested = false;
+
+function isViewActive(viewId) {
+    return document.getElementById('view-' + viewId).classList.contains('active');
+}
+
+function markDirty(id) {
+    dirtyCards.add(id);
+    scheduleRender();
+}
+
+function scheduleRender() {
+    if (frameRequested) return;
+    frameRequested = true;
+    requestAnimationFrame(flushRender);
+}
+
+function flushRender() {
+    frameRequested = false;
+    if (dirtyCards.size) {
+        renderList(dirtyCards);
+        dirtyCards.clear();
+    }
+    if (headerDirty) {
+        headerDirty = false;
+        updateHeader();
+    }
+    if (freqDirty && isViewActive('frequency')) {
+        freqDirty = false;
+        renderFrequency();
+    }
+    if (achievementsStale && isViewActive('achievements')) {
+        achievementsStale = false;
+        renderAchievements();
+    }
+}
+
+// --- SNAPSHOT (IndexedDB) ---
+// As últimas notas aparecem na hora; o stream revalida disciplina por disciplina.
+// Disciplinas do snapshot que o stream não trouxer de volta são removidas no fim.
+let snapshotSavedAt = null;
+const seenIds = new Set();
+
+function showSnapshot(snapshot) {
+    snapshotSavedAt = snapshot.savedAt;
+    isSupporter = snapshot.isSupporter;
+    snapshot.courses.forEach(c => {
+        // With the server's status the card is complete right away; the worker only adds badges
+        const course = { ...c, st: c.serverStatus || null, isLoading: !c.serverStatus, hasData: true, fromSnapshot: true };
+        courses.set(c.id, course);
+
+        // Card already rendered by the server (inline snapshot): adopt it instead of drawing it again
+        const div = document.querySelector(`#cards-container [data-course-id="${c.id}"]`);
+        if (div) {
+            // Badges as rendered by the server (grading.card_badges); a mismatch gets redrawn
+            const badges = [...div.querySelectorAll('.subj-name span')].map(span => span.textContent);
+            div.signature = cardSignature({ ...course, badges });
+            div.onclick = () => openModal(c.id);
+            cardEls.set(c.id, div);
+        }
+        requestStatus(course);
+    });
+    if (snapshot.courses.length) document.getElementById('empty-list-msg').style.display = 'none';
+}
+
+// Snapshot inlined by the server (routes.dashboard), without the date: it is the current session's
+function inlineSnapshot() {
+    const el = document.getElementById('inline-snapshot');
+    if (!el) return null;
+    try {
+        return { savedAt: null, isSupporter: false, courses: JSON.parse(el.textContent) };
+    } catch (e) {
+        return null;
+    }
+}
+
+function storeSnapshot() {
+    saveSnapshot({
+        savedAt: Date.now(),
+        isSupporter: isSupporter,
+        // hasData rather than !isLoading: the last worker answers may still be on their way
+        courses: allCourses().filter(c => c.hasData).map(c => ({
+            id: c.id, name: c.name, obs: c.obs,
+            b1Notes: c.b1Notes, b2Notes: c.b2Notes, b3Notes: c.b3Notes, b4Notes: c.b4Notes,
+            r1Note: c.r1Note, r2Note: c.r2Note,
+            serverStatus: c.serverStatus || null, frequency: c.frequency || null
+        }))
+    });
+}
+
+function removeCourse(id) {
+    courses.delete(id);
+    forgetStatus(id);
+    const div = cardEls.get(id);
+    if (div) div.remove();
+    cardEls.delete(id);
+    headerDirty = true;
+    freqDirty = true;
+    achievementsStale = true;
+    scheduleRender();
+}
+
+// --- STREAMING LOGIC ---
+const sleep = (ms) => new Promise(resolve => setTimeout(resolve, ms));
+
+async function startDataStream() {
+  // Check if Demo Mode
+  const isDemo = window.location.pathname === '/demo';
+
+  if (isDemo) {
+      document.body.insertAdjacentHTML('afterbegin', `
+          <div style="background:var(--warning); color:#000; text-align:center; padding:8px; font-weight:700; font-size:12px; position:sticky; top:0; z-index:9999;">
+              MODO DEMONSTRAÇÃO - DADOS FICTÍCIOS
+          </div>
+      `);
+      // Disable Logout Link
+      const logoutLink = document.querySelector('header a[href*="logout"]');
+      if(logoutLink) {
+          logoutLink.href = "/login";
+          logoutLink.textContent = "Fazer Login";
+      }
+  }
+
+  // Last known grades (skip in demo to always show the fresh animation)
+  if (!isDemo) {
+      if (courses.size === 0) {
+          const snapshot = inlineSnapshot() || await loadSnapshot();
+          if (snapshot) showSnapshot(snapshot);
+      }
+  }
+
+  isStreamActive = true;
+  // Set when the server sheds the request (HTTP 429 + "busy" message)
+  let busyRetry = 0;
+  let completed = false;
+  seenIds.clear();
+  const lazy = !isDemo && Date.now() - (parseFloat(localStorage.getItem('full_stream_at')) || 0) < LAZY_WINDOW_MS;
+  try {
+      // Demo params (?courses=40&groups=3&pace_ms=0...) are passed through to the synthetic stream
+      const endpoint = isDemo ? '/api/stream_demo' + window.location.search : '/api/stream_grades' + (lazy ? '?lazy=1' : '');
+      const response = await fetch(endpoint);
+      if (response.status === 401) {
+          // Shell served by the service worker after the session ended
+          window.location.href = URLS.login;
+          return;
+      }
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      // The demo stream arrives all at once; the animation pace is applied here
+      let paceMs = 0;
+
+      while (true) {
+          const { done, value } = await reader.read();
+          if (done) break;
+          buffer += decoder.decode(value, { stream: true });
+
+          const lines = buffer.split('\n');
+          buffer = lines.pop();
+
+          for (const line of lines) {
+              if (!line.trim()) continue;
+              let msg;
+              try {
+                  msg = JSON.parse(line);
+              } catch (e) {
+                  console.error("JSON parse error:", e);
+                  continue;
+              }
+              if (msg.type === 'busy') {
+                  busyRetry = msg.retry_after || 5;
+                  continue;
+              }
+              if (msg.type === 'demo') {
+                  paceMs = msg.pace_ms || 0;
+                  if (paceMs) await sleep(paceMs * 5);
+                  continue;
+              }
+              if (paceMs) await sleep(paceMs);
+              handleStreamMessage(msg);
+          }
+      }
+      completed = true;
+  } catch (e) {
+      console.error("Stream failed:", e);
+      if (snapshotSavedAt) {
+          const when = new Date(snapshotSavedAt).toLocaleString('pt-BR', { day: '2-digit', month: '2-digit', hour: '2-digit', minute: '2-digit' });
+          document.getElementById('totalResume').textContent = `Sem conexão. Mostrando notas salvas em ${when}.`;
+      } else {
+          document.getElementById('totalResume').textContent = "Erro na conexão.";
+      }
+  } finally {
+      isStreamActive = false;
+      if (busyRetry) {
+          // Nothing was loaded, keep the saved state and try again later
+          document.getElementById('totalResume').textContent = `Muitos acessos no momento. Tentando novamente em ${busyRetry}s...`;
+          setTimeout(startDataStream, busyRetry * 1000);
+      } else {
+          document.getElementById('totalResume').textContent = document.getElementById('totalResume').textContent === "Carregando..." ? "Concluído." : document.getElementById('totalResume').textContent;
+          if (completed && !isDemo && seenIds.size) {
+              courses.forEach(c => { if (!seenIds.has(c.id)) removeCourse(c.id); });
+              storeSnapshot();
+              // A lazy stream fetched almost nothing: no news to look for, and the next full one stays due
+              if (!lazy) localStorage.setItem('full_stream_at', Date.now());
+          }
+      }
+  }
+}
+
+// --- NOTAS NOVAS ---
+// With the grade history on (app/history.py), the server tags each fetched course with "changed",
+// compared with what it recorded last time. Without it, the grades shown before the stream (this
+// device's snapshot) are the reference. First visit on a device: nothing is flagged, like before.
+function gradesSignature(c) {
+    return JSON.stringify([c.b1Notes, c.b2Notes, c.b3Notes, c.b4Notes, c.r1Note, c.r2Note]);
+}
+
+function gradesChanged(course, msg, data) {
+    if ('changed' in msg) return msg.changed;
+    return !!course.fromSnapshot && gradesSignature(course) !== gradesSignature(data);
+}
+
+function flagNew(course) {
+    course.isNew = true;
+    markDirty(course.id);
+    setTimeout(() => {
+        course.isNew = false;
+        markDirty(course.id);
+    }, 15000);
+}
+
+function handleStreamMessage(msg) {
+  if (msg.error) {
+      if(msg.error === "Session expired") window.location.href = "/login";
+      return;
+  }
+
+  if (msg.type === 'user_info') {
+      isSupporter = msg.is_supporter;
+      if(isSupporter) {
+          console.log("User is a supporter!");
+      }
+  }
+  else if (msg.type === 'course_start') {
+      seenIds.add(msg.id);
+      const known = courses.get(msg.id);
+      if (known && known.fromSnapshot && known.name === msg.name) {
+          // Keep showing the saved grades until course_data arrives
+          known.obs = msg.obs;
+          known.key = msg.key;
+          markDirty(msg.id);
+          return;
+      }
+      if (known) forgetStatus(msg.id);
+      courses.set(msg.id, {
+          id: msg.id,
+          key: msg.key,
+          name: msg.name,
+          obs: msg.obs,
+          b1Notes: [], b2Notes: [], b3Notes: [], b4Notes: [],
+          r1Note: null, r2Note: null,
+          isLoading: true
+      });
+      markDirty(msg.id);
+      document.getElementById('empty-list-msg').style.display = 'none';
+      document.getElementById('totalResume').textContent = "Carregando notas...";
+  }
+  else if (msg.type === 'course_data') {
+      const course = courses.get(msg.id);
+      if (course) {
+          const changed = !msg.cached && gradesChanged(course, msg, msg.data);
+          Object.assign(course, msg.data, { serverStatus: msg.status || null, hasData: true, fromSnapshot: false, cached: !!msg.cached });
+          if (changed) flagNew(course);
+          // The card leaves the skeleton state once the worker answers (applySummary)
+          requestStatus(course);
+      }
+  }
+  else if (msg.type === 'course_frequency') {
+      const course = courses.get(msg.id);
+      if (course) setFrequency(course, msg.data);
+  }
+}
+
+function setFrequency(course, frequency) {
+    course.frequency = frequency;
+    if (statusWorker) statusWorker.postMessage({ type: 'frequency', id: course.id, frequency });
+    freqDirty = true;
+    achievementsStale = true;
+    scheduleRender();
+}
+
+// --- DISCIPLINA SOB DEMANDA ---
+// Disciplina que veio do cache do servidor (stream lazy): busca as notas atuais ao ser aberta.
+async function refreshCourse(course) {
+    if (!course.cached || !course.key || course.refreshing) return;
+    course.refreshing = true;
+    try {
+        const response = await fetch('/api/course/' + encodeURIComponent(course.key));
+        if (response.status === 401) {
+            window.location.href = URLS.login;
+            return;
+        }
+        if (!response.ok) return;
+        const result = await response.json();
+        // Opened from a lazy stream: the grades shown are the last known ones, so compare with them
+        const changed = 'changed' in result ? result.changed : gradesSignature(course) !== gradesSignature(result.data);
+        Object.assign(course, result.data, { serverStatus: result.status || null, hasData: true, cached: false });
+        if (changed) flagNew(course);
+        requestStatus(course);
+        if (result.frequency) setFrequency(course, result.frequency);
+        storeSnapshot();
+        // Modal still showing this course: show the fresh grades
+        if (editingId === course.id && document.getElementById('modal').style.display === 'flex') openModal(course.id);
+    } catch (e) {
+        console.error("Course refresh failed:", e);
+    } finally {
+        course.refreshing = false;
+    }
+}
+
+function renderAchievements() {
+    requestAchievements(drawAchievements);
+}
+
+function drawAchievements(unlocked) {
+    const list = document.getElementById('achievements-list');
+    list.innerHTML = '';
+    const achs = ACHIEVEMENTS_DB.map(ach => ({ ...ach, unlocked: unlocked.has(ach.id) }));
+
+    // Sort: Unlocked first
+    achs.sort((a,b) => (b.unlocked ? 1 : 0) - (a.unlocked ? 1 : 0));
+
+    achs.forEach(a => {
+        const div = document.createElement('div');
+        div.className = `achievement-card ${!a.unlocked ? 'locked-achievement' : ''}`;
+        div.innerHTML = `
+           <div class="achievement-img">${a.icon}</div>
+           <div>
+               <div style="font-weight:700; font-size:14px; color:${a.unlocked ? '#fff' : 'var(--muted)'}">${a.name}</div>
+               <div style="font-size:12px; color:var(--muted)">${a.desc}</div>
+               ${!a.unlocked ? '<div style="font-size:10px; color:#555; margin-top:4px;">BLOQUEADO</div>' : ''}
+           </div>
+        `;
+        list.appendChild(div);
+    });
+}
+
+// --- WRAPPED GENERATOR ---
+function generateWrapped() {
+    const modal = document.getElementById('wrapped-modal');
+    const validData = loadedCourses();
+
+    if(validData.length === 0) { alert('Aguarde o carregamento das notas.'); return; }
+
+    const stats = validData;
+    const approvedCount = stats.filter(s => s.st.final_ok).length;
+    const generalAvg = stats.reduce((a,b) => a + b.st.roundedFinalAvg, 0) / stats.length;
+    const allGrades = stats.flatMap(s => [...s.b1Notes, ...s.b2Notes, ...s.b3Notes, ...s.b4Notes]);
+    const bestGrade = allGrades.length ? Math.max(...allGrades.filter(n=>!isNaN(n))) : 0;
+    const totalFaltas = validData.reduce((a,b) => a + (b.frequency ? b.frequency.total_faltas : 0), 0);
+    const pendingCount = stats.length - approvedCount;
+
+    document.getElementById('wr-approved').textContent = approvedCount;
+    document.getElementById('wr-avg').textContent = generalAvg.toFixed(1);
+    document.getElementById('wr-best').textContent = bestGrade;
+    document.getElementById('wr-msg').textContent = `${pendingCount} matérias restantes. Foco na missão!`;
+
+    const freqContainer = document.getElementById('wr-freq-container');
+    if(isSupporter) {
+        freqContainer.style.display = 'block';
+        document.getElementById('wr-freq').textContent = totalFaltas;
+    } else {
+        freqContainer.style.display = 'none';
+    }
+
+    modal.style.display = 'flex';
+}
+
+function downloadWrapped() {
+    const el = document.getElementById('wrapped-content');
+    // Temporarily remove blur if active
+    const privacyActive = document.body.classList.contains('privacy-active');
+    if(privacyActive) document.body.classList.remove('privacy-active');
+
+    html2canvas(el, {
+        backgroundColor: null,
+        scale: 2
+    }).then(canvas => {
+        const link = document.createElement('a');
+        link.download = 'boletim-wrapped-2025.png';
+        link.href = canvas.toDataURL();
+        link.click();
+
+        if(privacyActive) document.body.classList.add('privacy-active');
+    });
+}
+
+// --- RENDERIZAÇÃO DA UI ---
+function getStatusColor(status){
+  if(status === 'Concluído') return 'bd-ok';
+  if(status === 'S/N') return 'bd-info';
+  if(status === 'Parcial') return 'bd-warn';
+  return 'bd-danger';
+}
+
+function updateHeader(){
+  const stats = loadedCourses().map(d => d.st);
+  const pending = stats.filter(s => !s.final_ok && s.falta > 0).length;
+  const critical = stats.filter(s => s.isCritical).length;
+  const passed = stats.filter(s => s.final_ok).length;
+
+  const html = `${passed} concluídas • ${pending} pendentes • <span style="color:var(--danger)">${critical} críticas</span>`;
+  const header = document.getElementById('totalResume');
+  // Unchanged header (e.g. the server-rendered one) is not written again
+  if (header.innerHTML !== html) header.innerHTML = html;
+}
+
+// Cards por id: só os que mudaram são redesenhados, e reordenar move os nós existentes
+const cardEls = new Map();
+
+function compareCourses(a, b) {
+    if (a.isLoading && !b.isLoading) return 1;
+    if (!a.isLoading && b.isLoading) return -1;
+    if (a.isLoading) return 0;
+
+    const sa = a.st;
+    const sb = b.st;
+
+    if(sa.isCritical && !sb.isCritical) return -1;
+    if(sb.isCritical && !sa.isCritical) return 1;
+    return sb.falta - sa.falta;
+}
+
+// What a card shows; a card whose signature didn't change is left alone (no DOM write, no new paint)
+function cardSignature(item) {
+    return JSON.stringify([item.isLoading, item.name, item.obs, item.isNew || false, item.st || null, item.badges || []]);
+}
+
+function fillCard(div, item) {
+    const signature = cardSignature(item);
+    if (div.signature === signature) return;
+    div.signature = signature;
+
+    if (item.isLoading) {
+        div.className = 'card skeleton';
+        div.onclick = null;
+        div.innerHTML = `
+          <div class="row-top">
+            <div class="subj-name">${escapeHtml(item.name)} <span style="font-weight:400; font-size:12px; color:var(--muted)">...</span></div>
+          </div>
+          <div class="subj-obs">${escapeHtml(item.obs)}</div>
+        `;
+        return;
+    }
+
+    const st = item.st;
+    const sideColor = st.isCritical ? 'var(--danger)' : (st.final_ok ? 'var(--success)' : 'var(--accent)');
+    const scoreColor = st.final_ok ? 'var(--success)' : (st.isCritical ? 'var(--danger)' : '#fff');
+    const scoreLabel = st.final_ok ? 'OK' : 'Falta';
+    const scoreDisplay = st.final_ok ? '✓' : st.falta.toFixed(1);
+
+    let extraBadges = '';
+    if(item.isNew) extraBadges += `<span class="tag-new">NOVA</span>`;
+
+    // Specific achievements badges (computed by the worker)
+    (item.badges || []).forEach(icon => extraBadges += ` <span style="font-size:12px">${icon}</span>`);
+
+    div.className = 'card';
+    div.onclick = () => openModal(item.id);
+
+    div.innerHTML = `
+      <div class="card-indicator" style="background:${sideColor}"></div>
+      <div class="row-top">
+        <div>
+          <div class="subj-name">${escapeHtml(item.name)} ${extraBadges}</div>
+          <div class="badges-row">
+            <span class="badge ${getStatusColor(st.s1_status)}">S1: ${st.s1_status === 'Concluído' ? 'OK' : st.s1_total + '/12'}</span>
+            <span class="badge ${getStatusColor(st.s2_status)}">S2: ${st.s2_status === 'Concluído' ? 'OK' : st.s2_total + '/12'}</span>
+          </div>
+        </div>
+        <div class="score-box">
+           <div class="score-val" style="color:${scoreColor}">${scoreDisplay}</div>
+           <span class="score-label">${scoreLabel}</span>
+           <span class="score-label" style="color:#fff; margin-top:4px;">Média: ${st.roundedFinalAvg.toFixed(1)}</span>
+        </div>
+      </div>
+      ${item.obs ? `<span class="subj-obs">${escapeHtml(item.obs)}</span>` : ''}
+    `;
+}
+
+function renderList(changedIds){
+  const container = document.getElementById('cards-container');
+
+  changedIds.forEach(id => {
+      const item = courses.get(id);
+      if (!item) return;
+      let div = cardEls.get(id);
+      if (!div) {
+          div = document.createElement('div');
+          cardEls.set(id, div);
+      }
+      fillCard(div, item);
+  });
+
+  // Disciplinas antes do card de apoio (se existir); nós já no lugar certo não são tocados
+  let cursor = container.firstElementChild;
+  allCourses().sort(compareCourses).forEach(item => {
+      const div = cardEls.get(item.id);
+      if (div === cursor) {
+          cursor = cursor.nextElementSibling;
+      } else {
+          container.insertBefore(div, cursor);
+      }
+  });
+}
+
+// --- FREQUÊNCIA ---
+function renderFrequency() {
+    const container = document.getElementById('frequency-container');
+    container.innerHTML = '';
+
+    // --- SUPPORTER GATE ---
+    if (!isSupporter) {
+        const lockedCard = document.createElement('div');
+        lockedCard.className = 'card support-card';
+        lockedCard.onclick = () => window.location.href = URLS.support;
+        lockedCard.style.padding = '32px 20px';
+        lockedCard.style.textAlign = 'center';
+        lockedCard.innerHTML = `
+          <div class="card-indicator" style="background:rgba(255,255,255,0.3)"></div>
+          <h3 style="margin:0 0 10px 0; font-size:20px; color:#fff;">🔒 Recurso Premium</h3>
+          <p style="font-size:14px; color:rgba(255,255,255,0.8); margin-bottom:20px;">
+            A análise detalhada de frequência é exclusiva para apoiadores do projeto.
+          </p>
+          <div style="background:rgba(0,0,0,0.2); padding:10px 20px; border-radius:12px; display:inline-block; font-weight:600; color:#ffd700;">
+            ✨ Tornar-se Apoiador
+          </div>
+        `;
+        container.appendChild(lockedCard);
+        return;
+    }
+    // ---------------------
+
+    const items = loadedCourses();
+
+    if (items.length === 0) {
+        container.innerHTML = '<div style="text-align:center; padding:20px; color:var(--muted)">Carregando ou sem dados...</div>';
+        return;
+    }
+
+    // -- Calculate and Display Overall Average --
+    const itemsWithFreq = items.filter(d => d.frequency);
+    let overallAvg = 0;
+    let sumTotalFaltas = 0;
+    let sumMaxFaltas = 0;
+
+    if (itemsWithFreq.length > 0) {
+        const totalPct = itemsWithFreq.reduce((sum, d) => sum + d.frequency.percent, 0);
+        overallAvg = totalPct / itemsWithFreq.length;
+
+        sumTotalFaltas = itemsWithFreq.reduce((sum, d) => sum + d.frequency.total_faltas, 0);
+        sumMaxFaltas = itemsWithFreq.reduce((sum, d) => sum + d.frequency.max_faltas, 0);
+    }
+
+    const overallColor = overallAvg > 25 ? 'var(--danger)' : 'var(--accent)';
+
+    const summaryCard = document.createElement('div');
+    summaryCard.className = 'card';
+    summaryCard.innerHTML = `
+       <div class="row-top">
+         <div class="subj-name">Média Geral de Faltas</div>
+         <div onclick="alert('Essa porcentagem é referente ao máximo de faltas totais do ano. Ou seja, quando o ano acabar você terá essa porcentagem de faltas')" style="cursor:pointer; color:var(--muted);">
+           <svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" fill="currentColor" viewBox="0 0 16 16">
+             <path d="M8 15A7 7 0 1 1 8 1a7 7 0 0 1 0 14zm0 1A8 8 0 1 0 8 0a8 8 0 0 0 0 16z"/>
+             <path d="M5.255 5.786a.237.237 0 0 0 .241.247h.825c.138 0 .248-.113.266-.25.09-.656.54-1.134 1.342-1.134.686 0 1.314.343 1.314 1.168 0 .635-.374.927-.965 1.371-.673.489-1.206 1.06-1.168 1.987l.003.217a.25.25 0 0 0 .25.246h.811a.25.25 0 0 0 .25-.25v-.105c0-.718.273-.927 1.01-1.486.609-.463 1.244-.977 1.244-2.056 0-1.511-1.276-2.241-2.673-2.241-1.267 0-2.655.59-2.75 2.286zm1.557 5.763c0 .533.425.927 1.01.927.609 0 1.028-.394 1.028-.927 0-.552-.42-.94-1.029-.94-.584 0-1.009.388-1.009.94z"/>
+           </svg>
+         </div>
+       </div>
+       <div style="text-align:center; padding:10px 0;">
+          <div style="font-size:32px; font-weight:800; color:${overallColor}">${overallAvg.toFixed(1)}%</div>
+          <div style="font-size:16px; font-weight:600; color:#fff; margin-top: 4px;">${sumTotalFaltas}/${sumMaxFaltas}</div>
+
+       </div>
+    `;
+    container.appendChild(summaryCard);
+    // ------------------------------------------
+
+    items.forEach(item => {
+        const div = document.createElement('div');
+        div.className = 'card';
+
+        let freqContent = '';
+        if (item.frequency) {
+            const { total_faltas, max_faltas, percent, lessons, bimesters } = item.frequency;
+
+            // percent = total_faltas / total_classes; SIGAA's limit (max_faltas) is 25% of the classes
+
+            const pctDisplay = percent.toFixed(1) + '%';
+
+            // Status based on percentage. > 25% is failed.
+            // Or total_faltas > max_faltas
+            const isFailed = total_faltas > max_faltas;
+            const statusColor = isFailed ? 'var(--danger)' : 'var(--success)';
+            const statusText = isFailed ? 'Limite indicado ultrapassado' : 'Dentro do Limite';
+
+            freqContent = `
+                <div style="display:flex; justify-content:space-between; align-items:flex-end; margin-top:8px;">
+                    <div>
+                        <div style="font-size:12px; color:var(--muted)">Faltas / Limite</div>
+                        <div style="font-size:16px; font-weight:600; color:#fff">${total_faltas} / ${max_faltas}</div>
+                    </div>
+                    <div style="text-align:right">
+                        <div style="font-size:12px; color:var(--muted)">Ausência</div>
+                        <div style="font-size:24px; font-weight:800; color:${statusColor}">${pctDisplay}</div>
+                    </div>
+                </div>
+                <div style="margin-top:4px; font-size:10px; color:${statusColor}; text-align:right; font-weight:700; text-transform:uppercase;">
+                    ${statusText}
+                </div>
+            `;
+
+            // Mapa de frequências: só vem do SIGAA de verdade (no demo não há datas)
+            if (lessons) {
+                // Por bimestre só quando o calendário do ano está configurado no servidor
+                const perBimester = (bimesters || []).length
+                    ? 'Faltas por bimestre: ' + bimesters.map((n, i) => `${i + 1}º: ${n}`).join(' · ') + ' — '
+                    : '';
+                freqContent += `
+                <div style="margin-top:6px; font-size:11px; color:var(--muted)">
+                    ${perBimester}${lessons} aulas registradas
+                </div>`;
+            }
+        } else {
+            freqContent = `<div style="margin-top:8px; font-size:12px; color:var(--muted)">Carregando frequência...</div>`;
+        }
+
+        div.innerHTML = `
+            <div class="row-top">
+                <div class="subj-name">${escapeHtml(item.name)}</div>
+            </div>
+            ${freqContent}
+        `;
+        container.appendChild(div);
+    });
+}
+
+// --- GRÁFICOS E ANÁLISE ---
+function renderPriority(){
+  const list = document.getElementById('priority-list');
+  list.innerHTML = '';
+
+  const priorityItems = loadedCourses()
+      .map(item => ({...item, status: item.st}))
+      .filter(d => d.status.isCritical || d.status.falta > 0)
+      .sort((a,b) => b.status.falta - a.status.falta);
+
+  if(priorityItems.length === 0) {
+      list.innerHTML = '<div style="color:var(--muted); font-size:12px">Parabéns! Tudo concluído.</div>';
+  } else {
+      priorityItems.forEach(c => {
+          const div = document.createElement('div');
+          div.className = 'card';
+          div.style.padding = '12px';
+          div.innerHTML = `<div style="font-weight:700">${escapeHtml(c.name)}</div>
+                           <div style="font-size:12px; color:var(--muted)">
+                              ${c.status.isCritical ? '<span style="color:var(--danger)">STATUS CRÍTICO (Reprovado em Semestre)</span>' : `Falta ${c.status.falta.toFixed(1)} pts`}
+                           </div>`;
+          list.appendChild(div);
+      });
+  }
+}
+
+function renderChart(){
+  const ctx = document.getElementById('chartCanvas').getContext('2d');
+
+  const active = loadedCourses()
+      .map(item => ({...item, status: item.st}))
+      .filter(d => d.status.falta > 0)
+      .sort((a,b) => b.status.falta - a.status.falta)
+      .slice(0, 10);
+
+  if(chart) chart.destroy();
+
+  chart = new Chart(ctx, {
+      type: 'bar',
+      data: {
+          labels: active.map(d => d.name.substring(0,8)),
+          datasets: [{
+              label: 'Falta',
+              data: active.map(d => d.status.falta),
+              backgroundColor: active.map(d => d.status.isCritical ? '#ef4444' : '#38bdf8'),
+              borderRadius:4
+          }]
+      },
+      options: {
+          responsive:true,
+          maintainAspectRatio:false,
+          plugins: { legend:{display:false} },
+          scales: {
+              y: { beginAtZero:true, grid:{color:'rgba(255,255,255,0.1)'} },
+              x: { ticks:{color:'#999', font:{size:10}}, grid:{display:false} }
+          }
+      }
+  });
+  renderPriority();
+}
+
+// --- MODAL E INPUTS DINÂMICOS ---
+
+function renderNoteInputs(bimester, notesArray = []) {
+  const container = document.getElementById(`notes-container-${bimester}`);
+  container.innerHTML = '';
+  notesArray.forEach((noteValue, index) => {
+    createNoteInput(container, noteValue, index);
+  });
+}
+
+function createNoteInput(container, value = null) {
+    const noteRow = document.createElement('div');
+    noteRow.className = 'note-input-row';
+
+    const input = document.createElement('input');
+    input.type = 'number';
+    input.step = '0.1';
+    input.inputMode = 'decimal';
+    input.placeholder = `0.0`;
+    input.disabled = true;
+    if (value !== null) input.value = value;
+
+    noteRow.appendChild(input);
+    container.appendChild(noteRow);
+}
+
+function openModal(id = null){
+  const modal = document.getElementById('modal');
+  modal.style.display = 'flex';
+  editingId = id;
+
+  if(id){
+      const item = courses.get(id);
+      if(!item || item.isLoading) return;
+      refreshCourse(item);
+
+      document.getElementById('m-title').textContent = 'Detalhes';
+      document.getElementById('inpName').value = item.name;
+      document.getElementById('inpR1').value = item.r1Note || '';
+      document.getElementById('inpR2').value = item.r2Note || '';
+      document.getElementById('inpObs').value = item.obs || '';
+
+      renderNoteInputs('B1', item.b1Notes);
+      renderNoteInputs('B2', item.b2Notes);
+      renderNoteInputs('B3', item.b3Notes);
+      renderNoteInputs('B4', item.b4Notes);
+  }
+}
+
+function closeModal(){ document.getElementById('modal').style.display='none'; }
+
+document.getElementById('modal').addEventListener('click', (e) => {
+  if(e.target.id === 'modal') closeModal();
+});
+
+// Start Streaming on Load
+startDataStream();
+
+// Offline app shell + snapshot cleanup on login/logout (templates/sw.js)
+if ('serviceWorker' in navigator && window.location.pathname !== '/demo') {
+    navigator.serviceWorker.register(URLS.serviceWorker).catch(e => console.error("Service worker failed:", e));
+}
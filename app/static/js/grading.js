@@ -0,0 +1,180 @@
+// Cálculo de situação e conquistas, sem acesso ao DOM.
+// Carregado pelo dashboard e pelo status-worker.js (importScripts), que faz o trabalho fora da thread da página.
+
+const ANNUAL_PASS_SCORE = 24;
+const SEMESTER_PASS_SCORE = 12;
+
+function roundSigga(val) {
+    // Arredonda para 0.0 ou 0.5 mais próximo
+    return Math.round(val * 2) / 2;
+}
+
+function calculateBimesterAverage(notesArray) {
+  const validNotes = notesArray.filter(n => !isNaN(n) && n !== null);
+  if (validNotes.length === 0) return { total: 0, count: 0, average: 0, hasNotes: false };
+  const sum = validNotes.reduce((a, b) => a + b, 0);
+  const avg = sum / validNotes.length;
+  return { total: sum, count: validNotes.length, average: roundSigga(avg), hasNotes: true };
+}
+
+function applyRecovery(b1_avg, b2_avg, rNote) {
+    if (rNote === null || rNote === undefined || isNaN(rNote)) {
+        return { total: b1_avg + b2_avg, usedRecovery: false };
+    }
+
+    const currentTotal = b1_avg + b2_avg;
+    const minScore = Math.min(b1_avg, b2_avg);
+
+    if (rNote > minScore) {
+        return { total: currentTotal - minScore + rNote, usedRecovery: true };
+    }
+
+    return { total: currentTotal, usedRecovery: false };
+}
+
+function calculateSubjectStatus(item) {
+  // Status pré-calculado pelo servidor (app/grading.py) quando disponível
+  if (item.serverStatus) return item.serverStatus;
+
+  const b1 = calculateBimesterAverage(item.b1Notes);
+  const b2 = calculateBimesterAverage(item.b2Notes);
+  const b3 = calculateBimesterAverage(item.b3Notes);
+  const b4 = calculateBimesterAverage(item.b4Notes);
+
+  const s1_logic = applyRecovery(b1.average, b2.average, item.r1Note);
+  const s1_total = parseFloat(s1_logic.total.toFixed(2));
+
+  const s2_logic = applyRecovery(b3.average, b4.average, item.r2Note);
+  const s2_total = parseFloat(s2_logic.total.toFixed(2));
+
+  const total_score = parseFloat((s1_total + s2_total).toFixed(2));
+
+  let s1_status = 'S/N';
+  const hasS1Activity = b1.hasNotes || b2.hasNotes || (item.r1Note != null);
+
+  if (hasS1Activity) {
+    if (s1_total >= SEMESTER_PASS_SCORE) s1_status = 'Concluído';
+    else if (b1.hasNotes && b2.hasNotes) s1_status = 'Reprovado';
+    else s1_status = 'Parcial';
+  }
+
+  let s2_status = 'S/N';
+  const hasS2Activity = b3.hasNotes || b4.hasNotes || (item.r2Note != null);
+
+  if (hasS2Activity) {
+    if (s2_total >= SEMESTER_PASS_SCORE) s2_status = 'Concluído';
+    else if (b3.hasNotes && b4.hasNotes) s2_status = 'Reprovado';
+    else s2_status = 'Parcial';
+  }
+
+  // Logic update: Final grade average is rounded, and if >= 6.0, the student passes.
+  // total_score is the sum of rounded bimesters.
+  // Average = total_score / 4.
+  // Rounded Average = roundSigga(Average).
+  const finalAvg = total_score / 4;
+  const roundedFinalAvg = roundSigga(finalAvg);
+
+  // Pass if score >= 24 (legacy/sum check) OR if rounded average >= 6.0
+  // Actually, user says "caso marquem 6 o user deve ser considerado aprovado".
+  // 6.0 * 4 = 24.0. So checking roundedFinalAvg >= 6.0 covers the 24 sum requirement effectively if using rounded averages.
+
+  const final_ok = (s1_status === 'Concluído' && s2_status === 'Concluído') || (roundedFinalAvg >= 6.0);
+
+  const isCritical = !final_ok && (s1_status === 'Reprovado' || s2_status === 'Reprovado');
+
+  return {
+    s1_status, s2_status, s1_total, s2_total, total_score, isCritical, final_ok, roundedFinalAvg,
+    falta: final_ok ? 0 : Math.max(0, ANNUAL_PASS_SCORE - total_score)
+  };
+}
+
+// Situação já calculada (c.st) quando existir
+function statusOf(c) {
+    return c.st || calculateSubjectStatus(c);
+}
+
+// --- CONQUISTAS ---
+const ACHIEVEMENTS_DB = [
+    { id: 'nerd_supremo', icon: '📘', name: 'Nerd Supremo', desc: 'Tirar 10 em qualquer disciplina',
+      check: (d) => d.some(c => hasGrade(c, 10)) },
+    { id: 'genio_incompreendido', icon: '📘', name: 'Gênio Incompreendido', desc: 'Média 9+ em 3 matérias',
+      check: (d) => d.filter(c => statusOf(c).roundedFinalAvg >= 9).length >= 3 },
+    { id: 'potencial_oculto', icon: '📘', name: 'Potencial Oculto', desc: 'Subir 2 pontos entre bimestres',
+      check: (d) => d.some(c => checkImprovement(c, 2)) },
+    { id: 'mestre_calc', icon: '📘', name: 'Mestre dos Cálculos', desc: 'Nota > 8 em Matemática (2 bimestres seguidos)',
+      check: (d) => d.some(c => c.name.includes('Matemática') && checkSequential(c, 8)) },
+    { id: 'caneta_ouro', icon: '📘', name: 'Caneta de Ouro', desc: 'Nota 10 em Redação ou Português',
+      check: (d) => d.some(c => (c.name.includes('Português') || c.name.includes('Redação') || c.name.includes('Língua Portuguesa')) && hasGrade(c, 10)) },
+    { id: 'sobrevivente', icon: '🔥', name: 'Sobrevivente', desc: 'Passar na recuperação',
+      check: (d) => d.some(c => c.r1Note || c.r2Note) }, // Simplificado: Se tem nota de recup, é sobrevivente
+    { id: 'ultimo_guerreiro', icon: '🔥', name: 'Último Guerreiro', desc: 'Passar na recuperação em TODAS',
+      check: (d) => d.length > 0 && d.every(c => c.r1Note || c.r2Note) },
+    { id: 'reviravolta', icon: '🔥', name: 'Reviravolta Épica', desc: 'Recuperação p/ Média > 7',
+      check: (d) => d.some(c => (c.r1Note || c.r2Note) && statusOf(c).roundedFinalAvg > 7) },
+    { id: 'onipresente', icon: '🕒', name: 'Onipresente', desc: '100% de Frequência',
+      check: (d) => d.some(c => c.frequency && c.frequency.percent === 0) }, // 0% ausência
+    { id: 'fantasminha', icon: '🕒', name: 'Fantasminha Camarada', desc: 'Max 1 falta no bimestre',
+      check: (d) => false }, // Difícil checar por bimestre sem dados granulares, skip ou mock
+    { id: 'ressurgido', icon: '🕒', name: 'Ressurgido', desc: 'Melhorar frequência drasticamente',
+      check: (d) => false }, // Requer histórico temporal
+    { id: 'cartola', icon: '📝', name: 'Cartola do Semestre', desc: 'Todas notas > 8',
+      check: (d) => d.length > 0 && d.every(c => statusOf(c).roundedFinalAvg > 8) },
+    { id: 'lendario', icon: '🌟', name: 'Lendário do IF', desc: 'Média Geral > 9',
+      check: (d) => {
+           const avgs = d.map(c => statusOf(c).roundedFinalAvg);
+           if(avgs.length === 0) return false;
+           const general = avgs.reduce((a,b)=>a+b,0) / avgs.length;
+           return general > 9;
+      }},
+    { id: 'mago_rec', icon: '🌟', name: 'Mago da Recuperação', desc: 'Tirar 10 na recuperação',
+      check: (d) => d.some(c => c.r1Note === 10 || c.r2Note === 10) },
+    { id: 'bencao_sono', icon: '🌟', name: 'A Benção do Sono', desc: 'Notas boas com baixa frequência',
+      check: (d) => d.some(c => statusOf(c).roundedFinalAvg > 8 && c.frequency && c.frequency.percent > 20) }
+];
+
+// Conquistas mostradas como selo no card da disciplina
+const BADGE_ACHIEVEMENTS = ['mestre_calc', 'caneta_ouro', 'sobrevivente', 'mago_rec']
+    .map(id => ACHIEVEMENTS_DB.find(a => a.id === id));
+
+function hasGrade(course, val) {
+    const all = [...course.b1Notes, ...course.b2Notes, ...course.b3Notes, ...course.b4Notes];
+    return all.some(n => n === val);
+}
+function checkImprovement(course, delta) {
+    // Simplificado: Check b1->b2, b2->b3, etc.
+    const avgs = [
+        calculateBimesterAverage(course.b1Notes).average,
+        calculateBimesterAverage(course.b2Notes).average,
+        calculateBimesterAverage(course.b3Notes).average,
+        calculateBimesterAverage(course.b4Notes).average
+    ];
+    for(let i=0; i<3; i++) {
+        if(avgs[i+1] - avgs[i] >= delta) return true;
+    }
+    return false;
+}
+function checkSequential(course, threshold) {
+    const avgs = [
+        calculateBimesterAverage(course.b1Notes).average,
+        calculateBimesterAverage(course.b2Notes).average,
+        calculateBimesterAverage(course.b3Notes).average,
+        calculateBimesterAverage(course.b4Notes).average
+    ];
+    for(let i=0; i<3; i++) {
+        if(avgs[i] > threshold && avgs[i+1] > threshold) return true;
+    }
+    return false;
+}
+
+// Tudo o que o card de uma disciplina precisa: situação e selos
+function courseSummary(course) {
+    return {
+        st: calculateSubjectStatus(course),
+        badges: BADGE_ACHIEVEMENTS.filter(a => a.check([course])).map(a => a.icon)
+    };
+}
+
+// Ids das conquistas desbloqueadas por um conjunto de disciplinas já carregadas
+function unlockedAchievementIds(courses) {
+    return ACHIEVEMENTS_DB.filter(a => a.check(courses)).map(a => a.id);
+}
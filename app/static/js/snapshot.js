@@ -0,0 +1,35 @@
+// Últimas notas recebidas, guardadas no IndexedDB para o dashboard abrir na hora (e sem conexão).
+// Usado pela página e pelo service worker (sw.js), que apaga o snapshot no login e no logout.
+const SNAPSHOT_DB = 'boletim';
+const SNAPSHOT_STORE = 'snapshot';
+
+function openSnapshotDb() {
+    return new Promise((resolve, reject) => {
+        const req = indexedDB.open(SNAPSHOT_DB, 1);
+        req.onupgradeneeded = () => req.result.createObjectStore(SNAPSHOT_STORE);
+        req.onsuccess = () => resolve(req.result);
+        req.onerror = () => reject(req.error);
+    });
+}
+
+function snapshotRequest(mode, action) {
+    return openSnapshotDb().then(db => new Promise((resolve, reject) => {
+        const tx = db.transaction(SNAPSHOT_STORE, mode);
+        const req = action(tx.objectStore(SNAPSHOT_STORE));
+        tx.oncomplete = () => { db.close(); resolve(req.result); };
+        tx.onerror = tx.onabort = () => { db.close(); reject(tx.error); };
+    }));
+}
+
+// Sem IndexedDB (modo privado em alguns navegadores) tudo vira no-op
+function loadSnapshot() {
+    return snapshotRequest('readonly', store => store.get('last')).catch(() => null);
+}
+
+function saveSnapshot(snapshot) {
+    return snapshotRequest('readwrite', store => store.put(snapshot, 'last')).catch(() => {});
+}
+
+function clearSnapshot() {
+    return snapshotRequest('readwrite', store => store.clear()).catch(() => {});
+}
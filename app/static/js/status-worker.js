@@ -0,0 +1,28 @@
+// Calcula situação, selos e conquistas fora da thread da página (ver dashboard.js).
+//   {type:'course', course}            -> {type:'course', id, seq, st, badges}
+//   {type:'frequency', id, frequency}  -> (nada, só atualiza o estado)
+//   {type:'remove', id}                -> (nada, a disciplina sai das conquistas)
+//   {type:'achievements'}              -> {type:'achievements', unlocked: [ids]}
+// A página passa a URL do grading.js (com fingerprint, ver assets.py) em ?grading=
+importScripts(new URLSearchParams(self.location.search).get('grading') || 'grading.js');
+
+const courses = new Map();
+
+self.onmessage = (e) => {
+    const msg = e.data;
+    if (msg.type === 'course') {
+        const summary = courseSummary(msg.course);
+        courses.set(msg.course.id, { ...msg.course, st: summary.st });
+        self.postMessage({ type: 'course', id: msg.course.id, seq: msg.course.statusSeq, ...summary });
+    }
+    else if (msg.type === 'remove') {
+        courses.delete(msg.id);
+    }
+    else if (msg.type === 'frequency') {
+        const course = courses.get(msg.id);
+        if (course) course.frequency = msg.frequency;
+    }
+    else if (msg.type === 'achievements') {
+        self.postMessage({ type: 'achievements', unlocked: unlockedAchievementIds([...courses.values()]) });
+    }
+};
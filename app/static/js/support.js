@@ -0,0 +1,46 @@
+function copyPixKey() {
+  const pixKey = document.getElementById('pixKey').textContent;
+
+  if (navigator.clipboard && navigator.clipboard.writeText) {
+    navigator.clipboard.writeText(pixKey).then(() => {
+      showCopyFeedback();
+    }).catch(err => {
+      fallbackCopy(pixKey);
+    });
+  } else {
+    fallbackCopy(pixKey);
+  }
+}
+
+function fallbackCopy(text) {
+  const textArea = document.createElement('textarea');
+  textArea.value = text;
+  textArea.style.position = 'fixed';
+  textArea.style.left = '-999999px';
+  document.body.appendChild(textArea);
+  textArea.select();
+
+  try {
+    document.execCommand('copy');
+    showCopyFeedback();
+  } catch (err) {
+    alert('Não foi possível copiar. Chave PIX: ' + text);
+  }
+
+  document.body.removeChild(textArea);
+}
+
+function showCopyFeedback() {
+  const btn = document.querySelector('.copy-btn');
+  const originalText = btn.innerHTML;
+
+  btn.innerHTML = '✅ Copiado!';
+  btn.style.background = '#22c55e';
+  btn.style.color = '#000';
+
+  setTimeout(() => {
+    btn.innerHTML = originalText;
+    btn.style.background = '#000';
+    btn.style.color = '#4ade80';
+  }, 2000);
+}
@@ -0,0 +1,65 @@
+import asyncio
+import json
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# Registrations of the project supporters (frequency is a supporter feature).
+# The online list is cached for SUPPORTERS_TTL seconds instead of being downloaded on every stream;
+# if a refresh fails the last good list is kept, and the bundled file is the last resort.
+
+SUPPORTERS_URL = "https://raw.githubusercontent.com/AlbertCohenhgs/public_lists/refs/heads/main/apoiadores.json"
+SUPPORTERS_TTL = float(os.environ.get('SUPPORTERS_TTL', 600))
+LOCAL_FILE = os.path.join(os.path.dirname(__file__), 'apoio', 'apoiadores.json')
+
+_supporters = None
+_expires = 0.0
+_refresh = None
+
+
+def _load_local():
+    try:
+        with open(LOCAL_FILE, 'r') as f:
+            return frozenset(str(s) for s in json.load(f))
+    except Exception:
+        return frozenset()
+
+
+async def _download():
+    import aiohttp
+
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10)) as session_http:
+        async with session_http.get(SUPPORTERS_URL) as resp:
+            if resp.status != 200:
+                raise ValueError(f"status {resp.status}")
+            return frozenset(str(s) for s in await resp.json(content_type=None))
+
+
+async def _update():
+    global _supporters, _expires
+    try:
+        _supporters = await _download()
+    except Exception as e:
+        logger.warning(f"Error fetching online supporters list: {e}")
+        if _supporters is None:
+            # Fallback to local file
+            _supporters = _load_local()
+    _expires = time.monotonic() + SUPPORTERS_TTL
+    return _supporters
+
+
+async def get_supporters():
+    """Set of supporter registrations (as strings). Concurrent callers share one download."""
+    global _refresh
+    if _supporters is not None and time.monotonic() < _expires:
+        return _supporters
+
+    if _refresh is None or _refresh.done():
+        _refresh = asyncio.ensure_future(_update())
+    return await asyncio.shield(_refresh)
+
+
+async def is_supporter(registration):
+    return registration is not None and str(registration) in await get_supporters()
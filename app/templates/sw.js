@@ -0,0 +1,117 @@
+// Service worker do dashboard (servido por /sw.js, ver routes.py).
+// - App shell (dashboard, scripts e CSS) pré-carregado em um cache versionado: a versão muda quando
+//   qualquer arquivo do shell muda, e o activate apaga os caches antigos.
+// - /dashboard abre do cache e é atualizado em segundo plano; as notas vêm do snapshot no IndexedDB
+//   enquanto /api/stream_grades revalida. A API nunca passa pelo cache.
+// - Login e logout apagam o snapshot: notas de um aluno não ficam para o próximo.
+// - O shell é sempre pedido com X-App-Shell, para o servidor não embutir as notas (dashboard()).
+// - Exceção: a navegação logo após o login vai à rede sem X-App-Shell. O snapshot acabou de ser
+//   apagado, então o shell em cache abriria vazio; o servidor já manda as notas embutidas.
+importScripts({{ asset_url('js/snapshot.js') | tojson }});
+
+const VERSION = {{ version | tojson }};
+const SHELL_CACHE = 'shell-' + VERSION;
+const SHELL_URL = {{ url_for('main.dashboard') | tojson }};
+const LOGIN_URL = {{ url_for('main.login') | tojson }};
+const PRECACHE = {{ precache | tojson }};
+// Scripts e fontes de terceiros: cache-first, guardados na primeira vez que são pedidos
+const THIRD_PARTY_HOSTS = ['cdn.jsdelivr.net', 'cdnjs.cloudflare.com', 'fonts.googleapis.com', 'fonts.gstatic.com'];
+
+async function cacheResponse(cache, request, response) {
+    // Nada de redirect (sessão expirada -> /login) nem erro no cache
+    if (response && (response.ok || response.type === 'opaque') && !response.redirected) {
+        await cache.put(request, response.clone());
+    }
+    return response;
+}
+
+async function precache() {
+    const cache = await caches.open(SHELL_CACHE);
+    await Promise.all(PRECACHE.map(async (url) => {
+        try {
+            const sameOrigin = new URL(url, self.location).origin === self.location.origin;
+            const response = await fetch(url === SHELL_URL ? shellRequest() : url,
+                                         sameOrigin ? { credentials: 'same-origin' } : { mode: 'no-cors' });
+            await cacheResponse(cache, url, response);
+        } catch (e) {
+            // Sem rede na instalação: o item é guardado quando for pedido
+        }
+    }));
+}
+
+self.addEventListener('install', (event) => {
+    event.waitUntil(precache().then(() => self.skipWaiting()));
+});
+
+self.addEventListener('activate', (event) => {
+    event.waitUntil((async () => {
+        const names = await caches.keys();
+        await Promise.all(names.filter(name => name !== SHELL_CACHE).map(name => caches.delete(name)));
+        await self.clients.claim();
+    })());
+});
+
+function shellRequest() {
+    return new Request(SHELL_URL, { credentials: 'same-origin', headers: { 'X-App-Shell': '1' } });
+}
+
+async function cacheFirst(request, background, networkRequest = request) {
+    const cache = await caches.open(SHELL_CACHE);
+    const cached = await cache.match(request, { ignoreSearch: request.mode === 'navigate' });
+    const network = fetch(networkRequest).then(response => cacheResponse(cache, request, response));
+    if (cached) {
+        // Stale-while-revalidate: responde na hora e atualiza para a próxima visita
+        if (background) background(network.catch(() => {}));
+        return cached;
+    }
+    return network;
+}
+
+async function networkFirst(request) {
+    // A resposta traz as notas do aluno embutidas: nunca vai para o cache do shell
+    try {
+        return await fetch(request);
+    } catch (e) {
+        const cached = await caches.open(SHELL_CACHE).then(cache => cache.match(SHELL_URL));
+        if (cached) return cached;
+        throw e;
+    }
+}
+
+// O worker pode ser encerrado entre o POST e o redirect; o referrer (/login) cobre esse caso
+let loginPending = false;
+
+function afterLogin(request) {
+    const referrer = request.referrer ? new URL(request.referrer) : null;
+    return loginPending || (referrer !== null && referrer.origin === self.location.origin && referrer.pathname === LOGIN_URL);
+}
+
+self.addEventListener('fetch', (event) => {
+    const request = event.request;
+    const url = new URL(request.url);
+
+    if (url.origin === self.location.origin) {
+        if (url.pathname === '/logout' || (url.pathname === LOGIN_URL && request.method === 'POST')) {
+            loginPending = url.pathname === LOGIN_URL;
+            event.waitUntil(clearSnapshot());
+            return;
+        }
+        if (request.method !== 'GET' || url.pathname.startsWith('/api/')) return;
+
+        if (request.mode === 'navigate' && url.pathname === SHELL_URL) {
+            if (afterLogin(request)) {
+                loginPending = false;
+                event.respondWith(networkFirst(request));
+                return;
+            }
+            event.respondWith(cacheFirst(request, (p) => event.waitUntil(p), shellRequest()));
+        } else if (url.pathname.startsWith('/assets/')) {
+            event.respondWith(cacheFirst(request));
+        }
+        return;
+    }
+
+    if (request.method === 'GET' && THIRD_PARTY_HOSTS.includes(url.hostname)) {
+        event.respondWith(cacheFirst(request));
+    }
+});
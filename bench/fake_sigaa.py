@@ -0,0 +1,215 @@
+"""
+Self-contained fake SIGAA for load tests and offline development.
+
+Emulates the flows the scraper walks: login form, questionnaire interception,
+bond selection, student portal, past terms ("turmas anteriores"), JSF course entry,
+"Ver Notas" and "Frequência".
+Any username logs in; the password "wrong" fails. Users whose name starts with
+"multi" get two bonds.
+
+    python -m bench.fake_sigaa --port 8081 --courses 12 --latency-ms 300
+    SIGAA_URL=http://127.0.0.1:8081 gunicorn run:app ...
+"""
+import argparse
+import asyncio
+import random
+import secrets
+
+from aiohttp import web
+
+from . import sigaa_pages as pages
+
+SESSION_COOKIE = 'JSESSIONID'
+
+
+class FakeSigaa:
+    def __init__(self, courses=10, groups=2, page_kb=0, latency_ms=0.0, latency_sigma=0.5,
+                 error_rate=0.0, questionnaire_rate=0.0, seed=0):
+        self.courses = courses
+        self.groups = groups
+        self.page_kb = page_kb
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.questionnaire_rate = questionnaire_rate
+        self.seed = seed
+        self.random = random.Random(seed)
+        self.sessions = {}
+        self.students = {}
+        self.request_count = 0
+
+    # --- helpers ---
+
+    def student(self, username):
+        if username not in self.students:
+            bonds = 2 if username.startswith('multi') else 1
+            self.students[username] = pages.make_student(
+                username, courses=self.courses, groups=self.groups, bonds=bonds, seed=self.seed)
+        return self.students[username]
+
+    async def delay(self):
+        if self.latency_ms > 0:
+            # Log-normal: most responses near the median, with a long tail like the real thing
+            await asyncio.sleep(self.random.lognormvariate(0, self.latency_sigma) * self.latency_ms / 1000)
+
+    def html(self, body, status=200):
+        return web.Response(body=body.encode(pages.CHARSET, errors='xmlcharrefreplace'), status=status,
+                            content_type='text/html', charset=pages.CHARSET)
+
+    def session_for(self, request):
+        return self.sessions.get(request.cookies.get(SESSION_COOKIE))
+
+    def course_for(self, state):
+        bond = self.student(state['user'])['bonds'][state['bond']]
+        for course in bond['courses'] + [c for _, courses in bond['past_terms'] for c in courses]:
+            if course['id_turma'] == state.get('turma'):
+                return course
+        return None
+
+    @web.middleware
+    async def middleware(self, request, handler):
+        self.request_count += 1
+        await self.delay()
+        if self.error_rate and self.random.random() < self.error_rate:
+            if self.random.random() < 0.5:
+                return self.html(pages.error_page())
+            return web.Response(status=500, text='Internal Server Error')
+
+        state = self.session_for(request)
+        public = request.path in ('/sigaa/verTelaLogin.do', '/sigaa/logar.do') or request.path.startswith('/_fake/')
+        if not public:
+            if state is None or not state.get('user'):
+                raise web.HTTPFound('/sigaa/verTelaLogin.do')
+            if state.get('questionnaire') and request.path != '/sigaa/questionarios.jsf':
+                return self.html(pages.questionnaire_page())
+        request['state'] = state
+        return await handler(request)
+
+    # --- routes ---
+
+    async def login_form(self, request):
+        response = self.html(pages.login_page())
+        if request.cookies.get(SESSION_COOKIE) not in self.sessions:
+            sid = secrets.token_hex(16).upper()
+            self.sessions[sid] = {}
+            response.set_cookie(SESSION_COOKIE, sid, path='/sigaa')
+        return response
+
+    async def login(self, request):
+        form = await request.post()
+        username = form.get('user.login', '')
+        if not username or form.get('user.senha') == 'wrong':
+            return self.html(pages.login_page('Usuário e/ou senha inválidos'))
+
+        sid = request.cookies.get(SESSION_COOKIE)
+        state = self.sessions.get(sid)
+        if state is None:
+            sid = secrets.token_hex(16).upper()
+            state = self.sessions[sid] = {}
+        state.update(user=username, bond=0, turma=None,
+                     questionnaire=self.random.random() < self.questionnaire_rate)
+
+        student = self.student(username)
+        location = '/sigaa/vinculos.jsf' if len(student['bonds']) > 1 else '/sigaa/portais/discente/discente.jsf'
+        if state['questionnaire']:
+            location = '/sigaa/questionarios.jsf'
+        response = web.Response(status=302, headers={'Location': location})
+        response.set_cookie(SESSION_COOKIE, sid, path='/sigaa')
+        return response
+
+    async def questionnaire(self, request):
+        state = request['state']
+        if request.method == 'POST':
+            state['questionnaire'] = False
+            raise web.HTTPFound('/sigaa/portais/discente/discente.jsf')
+        return self.html(pages.questionnaire_page())
+
+    async def portal_redirect(self, request):
+        raise web.HTTPFound('/sigaa/portais/discente/discente.jsf')
+
+    async def bonds(self, request):
+        return self.html(pages.bond_page(self.student(request['state']['user'])))
+
+    async def choose_bond(self, request):
+        state = request['state']
+        index = int(request.query.get('vinculo', 0))
+        if index < len(self.student(state['user'])['bonds']):
+            state['bond'] = index
+        raise web.HTTPFound('/sigaa/portais/discente/discente.jsf')
+
+    async def portal(self, request):
+        state = request['state']
+        student = self.student(state['user'])
+        if request.method == 'POST':
+            # JSF course entry from the portal's course list
+            form = await request.post()
+            state['turma'] = form.get('idTurma')
+            course = self.course_for(state)
+            if course is None:
+                return self.html(pages.error_page())
+            return self.html(pages.course_page(course, filler_kb=self.page_kb))
+        return self.html(pages.portal_page(student, state['bond'], filler_kb=self.page_kb))
+
+    async def all_courses(self, request):
+        state = request['state']
+        if request.method == 'POST':
+            return await self.portal(request)
+        return self.html(pages.all_courses_page(self.student(state['user']), state['bond'], filler_kb=self.page_kb))
+
+    async def course_menu(self, request):
+        state = request['state']
+        form = await request.post()
+        course = self.course_for(state)
+        if course is None:
+            raise web.HTTPFound('/sigaa/expirada.jsp')
+        student = self.student(state['user'])
+        if 'formMenu:j_id_jsp_notas' in form:
+            return self.html(pages.grades_page(student, course, state['bond'], filler_kb=self.page_kb))
+        if 'formMenu:j_id_jsp_frequencia' in form:
+            return self.html(pages.frequency_page(course, filler_kb=self.page_kb))
+        return self.html(pages.course_page(course, filler_kb=self.page_kb))
+
+    async def expired(self, request):
+        return self.html(pages.page('Sessão Expirada', '<p>Sua sessão expirou.</p>'))
+
+    async def stats(self, request):
+        return web.json_response({'requests': self.request_count, 'sessions': len(self.sessions)})
+
+    def app(self):
+        app = web.Application(middlewares=[self.middleware])
+        app.router.add_get('/sigaa/verTelaLogin.do', self.login_form)
+        app.router.add_post('/sigaa/logar.do', self.login)
+        app.router.add_route('*', '/sigaa/questionarios.jsf', self.questionnaire)
+        app.router.add_get('/sigaa/verPortalDiscente.do', self.portal_redirect)
+        app.router.add_get('/sigaa/vinculos.jsf', self.bonds)
+        app.router.add_get('/sigaa/escolhaVinculo.do', self.choose_bond)
+        app.router.add_route('*', '/sigaa/portais/discente/discente.jsf', self.portal)
+        app.router.add_route('*', '/sigaa/portais/discente/turmas.jsf', self.all_courses)
+        app.router.add_post('/sigaa/ava/index.jsf', self.course_menu)
+        app.router.add_get('/sigaa/expirada.jsp', self.expired)
+        app.router.add_get('/_fake/stats', self.stats)
+        return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--courses', type=int, default=10, help='courses per bond')
+    parser.add_argument('--groups', type=int, default=2, help='sub-grades per unit')
+    parser.add_argument('--page-kb', type=int, default=0, help='extra markup per page, in KB')
+    parser.add_argument('--latency-ms', type=float, default=0, help='median response latency')
+    parser.add_argument('--latency-sigma', type=float, default=0.5, help='log-normal spread of the latency')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered with errors')
+    parser.add_argument('--questionnaire-rate', type=float, default=0.0, help='fraction of logins hitting the questionnaire')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    fake = FakeSigaa(courses=args.courses, groups=args.groups, page_kb=args.page_kb,
+                     latency_ms=args.latency_ms, latency_sigma=args.latency_sigma,
+                     error_rate=args.error_rate, questionnaire_rate=args.questionnaire_rate, seed=args.seed)
+    web.run_app(fake.app(), host=args.host, port=args.port)
+
+
+if __name__ == '__main__':
+    main()
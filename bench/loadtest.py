@@ -0,0 +1,168 @@
+"""
+Load driver for the Flask app: logs in N virtual users and drives /api/stream_grades.
+
+Run the fake SIGAA and the app first, e.g.:
+
+    python -m bench.fake_sigaa --port 8081 --latency-ms 200
+    SIGAA_URL=http://127.0.0.1:8081 gunicorn run:app --worker-class gevent --workers 1 --bind 127.0.0.1:8000
+    python -m bench.loadtest --app http://127.0.0.1:8000 --users 50 --concurrency 10
+
+Reports login time, time-to-first-line and total stream time percentiles, upstream
+requests per user (from the stream's trailing stats message) and the worker RSS
+(sampled from /metrics while the test runs).
+"""
+import argparse
+import asyncio
+import json
+import re
+import statistics
+import time
+
+import aiohttp
+
+CSRF_RE = re.compile(r'name="csrf_token" value="([^"]+)"')
+RSS_RE = re.compile(r'^process_resident_memory_bytes (\S+)$', re.MULTILINE)
+
+
+def percentile(values, pct):
+    if not values:
+        return float('nan')
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100
+    low, high = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (k - low)
+
+
+class UserResult:
+    __slots__ = ('ok', 'error', 'login_time', 'first_line', 'total', 'lines', 'upstream_requests')
+
+    def __init__(self):
+        self.ok = False
+        self.error = None
+        self.login_time = None
+        self.first_line = None
+        self.total = None
+        self.lines = 0
+        self.upstream_requests = None
+
+
+async def run_user(app_url, username, password, timeout):
+    result = UserResult()
+    jar = aiohttp.CookieJar(unsafe=True)
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+    async with aiohttp.ClientSession(cookie_jar=jar, timeout=client_timeout) as http:
+        try:
+            start = time.perf_counter()
+            async with http.get(f"{app_url}/login") as resp:
+                match = CSRF_RE.search(await resp.text())
+            form = {'username': username, 'password': password}
+            if match:
+                form['csrf_token'] = match.group(1)
+            async with http.post(f"{app_url}/login", data=form, allow_redirects=False) as resp:
+                if resp.status != 302 or 'dashboard' not in resp.headers.get('Location', ''):
+                    result.error = f"login status {resp.status}"
+                    return result
+            result.login_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            async with http.get(f"{app_url}/api/stream_grades") as resp:
+                if resp.status != 200:
+                    result.error = f"stream status {resp.status}"
+                    return result
+                async for raw in resp.content:
+                    if not raw.strip():
+                        continue
+                    if result.first_line is None:
+                        result.first_line = time.perf_counter() - start
+                    result.lines += 1
+                    msg = json.loads(raw)
+                    if 'error' in msg:
+                        result.error = msg['error']
+                    elif msg.get('type') == 'stats':
+                        result.upstream_requests = msg.get('upstream_requests')
+            result.total = time.perf_counter() - start
+            result.ok = result.error is None
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            result.error = type(e).__name__
+    return result
+
+
+async def sample_rss(app_url, samples, stop):
+    async with aiohttp.ClientSession() as http:
+        while not stop.is_set():
+            try:
+                async with http.get(f"{app_url}/metrics") as resp:
+                    match = RSS_RE.search(await resp.text())
+                    if match:
+                        samples.append(float(match.group(1)))
+            except aiohttp.ClientError:
+                pass
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=1.0)
+            except asyncio.TimeoutError:
+                pass
+
+
+async def run(args):
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one(i):
+        async with semaphore:
+            return await run_user(args.app, f"{args.prefix}{i}", args.password, args.timeout)
+
+    rss_samples = []
+    stop = asyncio.Event()
+    sampler = asyncio.create_task(sample_rss(args.app, rss_samples, stop))
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(one(i) for i in range(args.users)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await sampler
+
+    report(results, elapsed, rss_samples)
+
+
+def _line(label, values, unit='s'):
+    if not values:
+        return f"  {label:<22} -"
+    return (f"  {label:<22} p50={percentile(values, 50):.3f}{unit}  p90={percentile(values, 90):.3f}{unit}  "
+            f"p99={percentile(values, 99):.3f}{unit}  max={max(values):.3f}{unit}")
+
+
+def report(results, elapsed, rss_samples):
+    ok = [r for r in results if r.ok]
+    errors = {}
+    for r in results:
+        if not r.ok:
+            errors[r.error] = errors.get(r.error, 0) + 1
+
+    print(f"Users: {len(results)}  ok: {len(ok)}  failed: {len(results) - len(ok)}  wall: {elapsed:.1f}s  "
+          f"throughput: {len(ok) / elapsed:.2f} users/s")
+    for error, count in sorted(errors.items(), key=lambda x: -x[1]):
+        print(f"  error {error!r}: {count}")
+    print(_line('login', [r.login_time for r in ok if r.login_time is not None]))
+    print(_line('time to first line', [r.first_line for r in ok if r.first_line is not None]))
+    print(_line('total stream', [r.total for r in ok if r.total is not None]))
+    upstream = [r.upstream_requests for r in ok if r.upstream_requests is not None]
+    if upstream:
+        print(f"  {'upstream req/user':<22} mean={statistics.mean(upstream):.1f}  max={max(upstream)}")
+    if rss_samples:
+        print(f"  {'worker RSS':<22} start={rss_samples[0] / 1048576:.1f}MB  peak={max(rss_samples) / 1048576:.1f}MB  "
+              f"end={rss_samples[-1] / 1048576:.1f}MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--app', default='http://127.0.0.1:8000', help='base URL of the Flask app')
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--concurrency', type=int, default=5)
+    parser.add_argument('--prefix', default='user', help='virtual usernames are <prefix><n>')
+    parser.add_argument('--password', default='secret')
+    parser.add_argument('--timeout', type=float, default=120)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
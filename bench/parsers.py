@@ -0,0 +1,423 @@
+"""
+Parser microbenchmarks over the HTML corpus in bench/corpus/.
+
+Each case builds a SigaaPage from a stored page and runs one parser on it, for each
+BeautifulSoup backend available. Reports ops/sec, peak and retained allocations per
+op and a digest of the parser output, and compares against bench/baselines/parsers.json.
+
+    python -m bench.parsers corpus                  # regenerate the synthetic corpus
+    python -m bench.parsers corpus --cassette x.gz  # also import pages from a recorded cassette
+    python -m bench.parsers run                     # run and compare with the baseline
+    python -m bench.parsers run --save              # run and store a new baseline
+
+Baselines are machine specific: record them on the machine you compare on.
+`run` exits with status 1 when a case is slower than the baseline by more than
+--threshold or its output changed.
+"""
+import argparse
+import datetime
+import fnmatch
+import gc
+import hashlib
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+from app.sigaa_api.account import Account
+from app.sigaa_api.bond import StudentBond
+from app.sigaa_api import course as course_module
+from app.sigaa_api.course import Course
+from app.sigaa_api.login import SigaaLoginImpl
+from app.sigaa_api.page import SigaaPage
+
+from . import sigaa_pages as pages
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CORPUS_DIR = os.path.join(BASE_DIR, 'corpus')
+BASELINE_PATH = os.path.join(BASE_DIR, 'baselines', 'parsers.json')
+BASE_URL = 'https://sigaa.ifal.edu.br'
+
+BACKENDS = ['lxml', 'html.parser', 'html5lib']
+
+# Where each kind of page lives on SIGAA; the parsers look at the URL
+KIND_PATHS = {
+    'login': '/sigaa/verTelaLogin.do',
+    'bonds': '/sigaa/vinculos.jsf',
+    'portal': '/sigaa/portais/discente/discente.jsf',
+    'course': '/sigaa/ava/index.jsf',
+    'grades': '/sigaa/ava/index.jsf',
+    'frequency': '/sigaa/ava/index.jsf',
+}
+
+
+# --- corpus ---
+
+def _synthetic_pages():
+    """(name, kind, html) for the generated part of the corpus."""
+    student = pages.make_student('corpus', courses=8, groups=2, bonds=1, seed=1)
+    busy = pages.make_student('corpus-busy', courses=40, groups=6, bonds=1, seed=1)
+    multi = pages.make_student('corpus-multi', courses=1, bonds=3, seed=1)
+    single = pages.make_student('corpus-single', courses=1, groups=1, bonds=1, seed=1)
+
+    course = student['bonds'][0]['courses'][0]
+    busy_course = max(busy['bonds'][0]['courses'], key=lambda c: len(c['units']))
+    absent_course = max(busy['bonds'][0]['courses'], key=lambda c: len({a for _, a in c['dates']}) * 100 + len(c['dates']))
+    return [
+        ('login', 'login', pages.login_page()),
+        ('bond_selection', 'bonds', pages.bond_page(multi)),
+        ('portal', 'portal', pages.portal_page(student)),
+        ('portal_many_courses', 'portal', pages.portal_page(busy, filler_kb=80)),
+        ('course_menu', 'course', pages.course_page(course, filler_kb=20)),
+        ('grades_small', 'grades', pages.grades_page(single, single['bonds'][0]['courses'][0])),
+        ('grades', 'grades', pages.grades_page(student, course)),
+        ('grades_large', 'grades', pages.grades_page(busy, busy_course, filler_kb=80)),
+        ('frequency', 'frequency', pages.frequency_page(busy_course)),
+        ('frequency_absences', 'frequency', pages.frequency_page(absent_course)),
+    ]
+
+
+def _kind_for_url(url):
+    if 'verTelaLogin' in url:
+        return 'login'
+    if 'vinculos.jsf' in url:
+        return 'bonds'
+    if 'discente.jsf' in url:
+        return 'portal'
+    return None
+
+
+def _cassette_pages(path):
+    """Pages from a recorded (already scrubbed) cassette. Course pages can't be told
+    apart by URL, so they are classified by content."""
+    from app.sigaa_api.transport import load_cassette
+
+    found = []
+    for i, exchange in enumerate(load_cassette(path)):
+        body = exchange['b']
+        kind = _kind_for_url(exchange['fu'])
+        if 'tabelaRelatorio' in body:
+            kind = 'grades'
+        elif 'Total de Faltas' in body:
+            kind = 'frequency'
+        elif 'formMenu' in body and kind is None:
+            kind = 'course'
+        if kind is None or exchange['s'] != 200:
+            continue
+        found.append((f"recorded_{kind}_{i}", kind, body, exchange['c']))
+    return found
+
+
+def build_corpus(cassette=None):
+    os.makedirs(CORPUS_DIR, exist_ok=True)
+    entries = [(name, kind, html, pages.CHARSET) for name, kind, html in _synthetic_pages()]
+    if cassette:
+        entries += _cassette_pages(cassette)
+
+    index = []
+    for name, kind, html, charset in entries:
+        filename = name + '.html'
+        with open(os.path.join(CORPUS_DIR, filename), 'wb') as f:
+            f.write(html.encode(charset, errors='xmlcharrefreplace'))
+        index.append({'name': name, 'kind': kind, 'file': filename, 'charset': charset})
+        print(f"  {filename:<32} {kind:<10} {len(html) / 1024:7.1f} KB")
+
+    with open(os.path.join(CORPUS_DIR, 'index.json'), 'w') as f:
+        json.dump(index, f, indent=1)
+
+
+def load_corpus():
+    with open(os.path.join(CORPUS_DIR, 'index.json')) as f:
+        index = json.load(f)
+    corpus = []
+    for entry in index:
+        with open(os.path.join(CORPUS_DIR, entry['file']), 'rb') as f:
+            entry['body'] = f.read()
+        corpus.append(entry)
+    return corpus
+
+
+# --- cases ---
+
+def _new_page(entry):
+    # Raw bytes plus charset, the way SigaaSession builds pages
+    return SigaaPage(BASE_URL + KIND_PATHS[entry['kind']], entry['body'], {}, 'GET', 200,
+                     charset=entry['charset'])
+
+
+def _parse_account(page):
+    account = Account(None, page)
+    return [account._name] + [repr(b) for b in account.active_bonds + account.inactive_bonds]
+
+
+def _parse_courses(page):
+    return [(c.title, c.id) for c in StudentBond(None, '', '')._parse_courses(page)]
+
+
+def _parse_grades(page):
+    return [(g.name, g.value, [(s.name, s.value) for s in getattr(g, 'grades', ())])
+            for g in _COURSE._parse_grades(page)]
+
+
+def _parse_frequency(page):
+    f = _COURSE._parse_frequency(page)
+    return [f.total_faltas, f.max_faltas, f.percent, f.total_classes, f.lessons, f.bimesters, f.dates]
+
+
+def _parse_login_form(page):
+    action, values = SigaaLoginImpl(None)._parse_login_form(page)
+    return [action, sorted(values)]
+
+
+_COURSE = Course(None, '', {'action': '', 'post_values': {}})
+# Absences are only split per bimester for configured years: pin a calendar so that part of the
+# frequency digest doesn't depend on SIGAA_BIMESTER_STARTS
+course_module.BIMESTER_STARTS = {year: (datetime.date(year, 4, 15), datetime.date(year, 7, 15), datetime.date(year, 10, 1))
+                                 for year in range(2000, 2100)}
+
+# kind -> [(parser name, function(page) -> comparable result)]
+PARSERS = {
+    'login': [('login_form', _parse_login_form)],
+    'bonds': [('account', _parse_account)],
+    'portal': [('account', _parse_account), ('courses', _parse_courses)],
+    'grades': [('grades', _parse_grades)],
+    'frequency': [('frequency', _parse_frequency)],
+}
+
+
+class Case:
+    def __init__(self, name, entry, parser, backend, warm=False):
+        self.name = name
+        self.entry = entry
+        self.parser = parser
+        self.backend = backend
+        # warm cases parse the tree once in setup and only time the parser itself
+        self.warm = warm
+        self.page = None
+
+    def setup(self):
+        if self.warm:
+            self.page = _new_page(self.entry)
+            self.page.soup
+
+    def op(self):
+        page = self.page if self.warm else _new_page(self.entry)
+        return self.parser(page)
+
+
+def _jsfcljs_case(entry, backend):
+    # The "Ver Notas" menu onclick, as Course._navigate passes it
+    def parse(page):
+        onclick = page.soup.find(string='Ver Notas').find_parent(onclick=True)['onclick']
+        result = page.parse_jsfcljs(onclick)
+        return [result['action'], sorted(result['post_values'].items())]
+    return Case(f"{entry['name']}/parse_jsfcljs", entry, parse, backend, warm=True)
+
+
+def build_cases(corpus, backends):
+    cases = []
+    for backend in backends:
+        for entry in corpus:
+            for parser_name, parser in PARSERS.get(entry['kind'], []):
+                cases.append(Case(f"{entry['name']}/{parser_name}", entry, parser, backend))
+            if entry['kind'] == 'course':
+                cases.append(_jsfcljs_case(entry, backend))
+    return cases
+
+
+def available_backends(requested=None):
+    found = []
+    for backend in requested or BACKENDS:
+        if backend == 'html5lib':
+            try:
+                import html5lib  # noqa: F401
+            except ImportError:
+                continue
+        found.append(backend)
+    return found
+
+
+# --- measurement ---
+
+def _digest(result):
+    return hashlib.sha1(json.dumps(result, default=str).encode()).hexdigest()[:12]
+
+
+def measure(case, min_time=0.2, repeat=5):
+    SigaaPage.features = case.backend
+    try:
+        case.setup()
+        digest = _digest(case.op())  # warm-up, also checks the output
+
+        # Calibrate how many ops fill min_time, then take the best of `repeat` rounds (like timeit)
+        number = 1
+        while True:
+            start = time.perf_counter()
+            for _ in range(number):
+                case.op()
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time or number >= 100000:
+                break
+            number *= 2
+
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            rounds = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                for _ in range(number):
+                    case.op()
+                rounds.append((time.perf_counter() - start) / number)
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+        # Allocations of a single op: peak while it runs and what is still alive afterwards
+        gc.collect()
+        tracemalloc.start()
+        try:
+            before, _ = tracemalloc.get_traced_memory()
+            result = case.op()
+            _, peak = tracemalloc.get_traced_memory()
+            del result
+            gc.collect()
+            after, _ = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    finally:
+        SigaaPage.features = 'lxml'
+
+    best = min(rounds)
+    return {
+        'ops_per_sec': round(1 / best, 1),
+        'spread_pct': round((statistics.median(rounds) - best) / best * 100, 1),
+        'peak_kb': round((peak - before) / 1024, 1),
+        'retained_kb': round((after - before) / 1024, 1),
+        'digest': digest,
+    }
+
+
+# --- baselines and report ---
+
+def _meta():
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+    }
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(path, results):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump({'meta': _meta(), 'results': results}, f, indent=1, sort_keys=True)
+        f.write('\n')
+
+
+def compare(results, baseline, threshold):
+    """Prints the comparison table and returns the keys that regressed."""
+    old_results = baseline['results'] if baseline else {}
+    if baseline and baseline['meta'].get('python') != platform.python_version():
+        print(f"warning: baseline recorded on Python {baseline['meta'].get('python')}, "
+              f"running {platform.python_version()}")
+
+    regressions = []
+    print(f"{'case':<44} {'backend':<12} {'ops/s':>9} {'vs base':>8} {'peak KB':>9} {'kept KB':>8}  note")
+    for key, current in results.items():
+        name, backend = key.rsplit('@', 1)
+        old = old_results.get(key)
+        delta = ''
+        notes = []
+        if old:
+            change = current['ops_per_sec'] / old['ops_per_sec'] - 1
+            delta = f"{change * 100:+.1f}%"
+            if change < -threshold:
+                notes.append('SLOWER')
+                regressions.append(key)
+            if current['digest'] != old['digest']:
+                notes.append('OUTPUT CHANGED')
+                regressions.append(key)
+            if current['retained_kb'] > old['retained_kb'] + 16:
+                notes.append('retains more')
+        elif baseline:
+            notes.append('new')
+        if current['spread_pct'] > 20:
+            notes.append(f"noisy ±{current['spread_pct']:.0f}%")
+        print(f"{name:<44} {backend:<12} {current['ops_per_sec']:>9.1f} {delta:>8} "
+              f"{current['peak_kb']:>9.1f} {current['retained_kb']:>8.1f}  {', '.join(notes)}")
+
+    # Different backends should agree with lxml, which is what production uses
+    for key, current in results.items():
+        name, backend = key.rsplit('@', 1)
+        reference = results.get(f"{name}@lxml")
+        if backend != 'lxml' and reference and reference['digest'] != current['digest']:
+            print(f"note: {name} parses differently with {backend} than with lxml")
+    return sorted(set(regressions))
+
+
+def run(args):
+    corpus = load_corpus()
+    cases = build_cases(corpus, available_backends(args.backend))
+    if args.case:
+        cases = [c for c in cases if any(fnmatch.fnmatch(c.name, pattern) for pattern in args.case)]
+
+    results = {}
+    for case in cases:
+        results[f"{case.name}@{case.backend}"] = measure(case, min_time=args.min_time, repeat=args.repeat)
+        print('.', end='', file=sys.stderr, flush=True)
+    print(file=sys.stderr)
+
+    baseline = load_baseline(args.baseline)
+    regressions = compare(results, baseline, args.threshold)
+
+    if args.save:
+        if args.case or args.backend:
+            # Keep the cases that weren't run this time
+            results = {**(baseline['results'] if baseline else {}), **results}
+        save_baseline(args.baseline, results)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if regressions:
+        print(f"{len(regressions)} regression(s) against the baseline (threshold {args.threshold:.0%})")
+        return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    corpus = sub.add_parser('corpus', help='regenerate bench/corpus')
+    corpus.add_argument('--cassette', help='also import pages from a recorded cassette')
+
+    bench = sub.add_parser('run', help='run the benchmarks')
+    bench.add_argument('--backend', action='append', help=f"one of {', '.join(BACKENDS)} (repeatable)")
+    bench.add_argument('--case', action='append', help='glob over case names, e.g. "grades*" (repeatable)')
+    bench.add_argument('--min-time', type=float, default=0.2, help='seconds per timing round')
+    bench.add_argument('--repeat', type=int, default=5)
+    bench.add_argument('--threshold', type=float, default=0.15, help='allowed slowdown before failing')
+    bench.add_argument('--baseline', default=BASELINE_PATH)
+    bench.add_argument('--save', action='store_true', help='store the results as the new baseline')
+
+    args = parser.parse_args()
+    if args.command == 'corpus':
+        build_corpus(args.cassette)
+        return 0
+    return run(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,305 @@
+"""
+HTML builders that mimic the SIGAA (IFAL) pages our scrapers read.
+
+Everything is synthetic: names, registrations and grades come from a seeded RNG,
+so the same username always produces the same student. Used by the fake SIGAA
+server (fake_sigaa.py) and to generate the parser benchmark corpus.
+"""
+import datetime
+import random
+from html import escape
+
+FIRST_NAMES = ['Ana', 'Bruno', 'Carla', 'Diego', 'Eduarda', 'Felipe', 'Gabriela', 'Heitor',
+               'Isabela', 'João', 'Larissa', 'Mateus', 'Natália', 'Otávio', 'Paula', 'Rafael']
+LAST_NAMES = ['Albuquerque', 'Barbosa', 'Cavalcante', 'Duarte', 'Ferreira', 'Gomes',
+              'Lima', 'Macedo', 'Nascimento', 'Oliveira', 'Pereira', 'Rocha', 'Santos', 'Tavares']
+COURSE_TITLES = ['Matemática', 'Língua Portuguesa', 'Física', 'Química', 'Biologia', 'História',
+                 'Geografia', 'Filosofia', 'Sociologia', 'Educação Física', 'Artes', 'Inglês',
+                 'Espanhol', 'Lógica de Programação', 'Banco de Dados', 'Redes de Computadores',
+                 'Programação Web', 'Sistemas Operacionais', 'Arquitetura de Computadores',
+                 'Engenharia de Software']
+PROGRAMS = ['Técnico em Informática', 'Técnico em Eletrotécnica', 'Técnico em Edificações']
+
+CHARSET = 'ISO-8859-1'
+
+
+def _rng(*parts):
+    return random.Random('|'.join(str(p) for p in parts))
+
+
+def make_student(username, courses=10, groups=2, bonds=1, seed=0, past_terms=2):
+    """Deterministic synthetic student for a username."""
+    rng = _rng(seed, username)
+    student = {
+        'username': username,
+        'name': f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {rng.choice(LAST_NAMES)}",
+        'bonds': [],
+    }
+    year = datetime.date.today().year
+    for b in range(bonds):
+        bond = {
+            'registration': f"{year}{rng.randrange(10 ** 7):07d}",
+            'program': PROGRAMS[(b + rng.randrange(len(PROGRAMS))) % len(PROGRAMS)],
+            'courses': [],
+        }
+        for c in range(courses):
+            bond['courses'].append(make_course(rng, b * 1000 + c, groups, year))
+
+        # Own RNG, so adding past terms leaves the current courses as they were
+        past_rng = _rng(seed, username, 'past', b)
+        bond['past_terms'] = []
+        for t in range(past_terms):
+            period = f"{year - 1 - t // 2}.{2 - t % 2}"
+            bond['past_terms'].append((period, [make_course(past_rng, b * 1000 + (t + 1) * 100 + c, groups, year)
+                                                for c in range(courses)]))
+        student['bonds'].append(bond)
+    return student
+
+
+def make_course(rng, index, groups, year):
+    title = COURSE_TITLES[index % len(COURSE_TITLES)]
+    if index >= len(COURSE_TITLES):
+        title += f" {index // len(COURSE_TITLES) + 1}"
+
+    # Units 1-4; later units may be missing (not graded yet)
+    graded_units = rng.randint(1, 4)
+    units = []
+    for unit in range(1, 5):
+        subs = []
+        for g in range(groups):
+            value = round(rng.uniform(3, 10), 1) if unit <= graded_units else None
+            subs.append((f"A{g + 1}", f"Avaliação {g + 1} - Unidade {unit}", value))
+        if groups > 1:
+            filled = [v for _, _, v in subs if v is not None]
+            subs.append(('Nota', 'Nota da Unidade', round(sum(filled) / len(filled), 1) if filled else None))
+        units.append((str(unit), subs))
+
+    recoveries = [round(rng.uniform(4, 10), 1) if rng.random() < 0.2 else None for _ in range(2)]
+
+    start = datetime.date(year, 2, 5)
+    dates = []
+    for week in range(rng.randint(10, 30)):
+        day = start + datetime.timedelta(days=7 * week)
+        roll = rng.random()
+        absences = 2 if roll < 0.05 else 1 if roll < 0.08 else 0
+        dates.append((day, absences))
+
+    return {
+        'id_turma': str(100000 + rng.randrange(900000)),
+        'title': title,
+        'units': units,
+        'recoveries': recoveries,
+        'dates': dates,
+        'max_faltas': len(dates) * 2 // 4,
+    }
+
+
+def _filler(kb):
+    """Menus, scripts and hidden markup real SIGAA pages carry around."""
+    if kb <= 0:
+        return ''
+    item = ('<li class="menu-item"><a href="#" onclick="return false;">Item de menu do portal '
+            'com texto longo</a><ul><li>Subitem</li></ul></li>\n')
+    return '<ul class="menu" style="display:none">' + item * max(1, kb * 1024 // len(item)) + '</ul>'
+
+
+def page(title, content, filler_kb=0):
+    return (f'<!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.0 Transitional//EN">\n'
+            f'<html><head><meta http-equiv="Content-Type" content="text/html; charset={CHARSET}">'
+            f'<title>{escape(title)}</title></head>\n<body>\n<div id="container">\n'
+            f'{_filler(filler_kb)}\n{content}\n</div>\n</body></html>')
+
+
+def login_page(error=None):
+    message = f'<center style="color: #922;">{escape(error)}</center>' if error else ''
+    return page('SIGAA - Sistema Integrado de Gestão de Atividades Acadêmicas', f'''
+{message}
+<form name="loginForm" method="post" action="/sigaa/logar.do?dispatch=logOn">
+  <input type="hidden" name="width" value="0" id="width"/>
+  <input type="hidden" name="height" value="0" id="height"/>
+  <input type="hidden" name="urlRedirect" value=""/>
+  <input type="hidden" name="acao" value=""/>
+  <table class="formulario"><caption>Entrar no Sistema</caption>
+    <tr><th>Usuário:</th><td><input type="text" name="user.login" value=""/></td></tr>
+    <tr><th>Senha:</th><td><input type="password" name="user.senha" value=""/></td></tr>
+    <tr><td colspan="2"><input type="submit" value="Entrar"/></td></tr>
+  </table>
+</form>''')
+
+
+def questionnaire_page():
+    return page('Questionário', '''
+<h2>Questionário de avaliação institucional</h2>
+<form id="formQuestionario" name="formQuestionario" method="post" action="/sigaa/questionarios.jsf">
+  <input type="hidden" name="formQuestionario" value="formQuestionario"/>
+  <input type="submit" id="btnNaoResponderContinuarSigaa" name="btnNaoResponderContinuarSigaa"
+         value="Não responder e continuar no SIGAA"/>
+  <input type="hidden" name="javax.faces.ViewState" id="javax.faces.ViewState" value="j_id1"/>
+</form>''')
+
+
+def error_page():
+    return page('Erro', '<div id="painel-erros">O sistema comportou-se de forma inesperada.</div>')
+
+
+def bond_page(student):
+    rows = []
+    for i, bond in enumerate(student['bonds']):
+        rows.append(f'''
+<tr>
+  <td id="tdTipo">Discente</td><td>{i + 1}</td><td>{bond["registration"]}</td><td>Sim</td>
+  <td>Curso: {escape(bond["program"])}</td>
+  <td><a href="/sigaa/escolhaVinculo.do?dispatch=escolher&amp;vinculo={i}">Acessar</a></td>
+</tr>''')
+    return page('Vínculos', f'''
+<table class="subFormulario"><thead><tr><th>Tipo</th><th>#</th><th>Identificador</th><th>Ativo</th>
+<th>Outras informações</th><th></th></tr></thead><tbody>{"".join(rows)}</tbody></table>''')
+
+
+def _course_rows(courses, action, view_state, start=0):
+    rows = []
+    forms = []
+    for i, course in enumerate(courses, start):
+        form_id = f'form_acessarTurmaVirtual_{i}'
+        onclick = (f"if(typeof jsfcljs == 'function'){{jsfcljs(document.getElementById('{form_id}'),"
+                   f"{{'{form_id}:turmaVirtual':'{form_id}:turmaVirtual','idTurma':'{course['id_turma']}'}},'');}}"
+                   f"return false")
+        rows.append(f'''
+<tr class="{'linhaPar' if i % 2 else 'linhaImpar'}">
+  <td class="descricao"><a href="#" onclick="{escape(onclick)}" title="Acessar Turma Virtual">
+    <span class="tituloDisciplina">{escape(course["title"])}</span></a></td>
+  <td class="info"><center>Sala {100 + i}</center></td>
+  <td class="info">{"TER" if i % 2 else "QUA"} 07:00-08:30</td>
+</tr>''')
+        forms.append(f'''
+<form id="{form_id}" name="{form_id}" method="post" action="{action}">
+  <input type="hidden" name="{form_id}" value="{form_id}"/>
+  <input type="hidden" name="javax.faces.ViewState" value="{view_state}"/>
+</form>''')
+    return rows, forms
+
+
+def portal_page(student, bond_index=0, view_state='j_id2', filler_kb=0):
+    bond = student['bonds'][bond_index]
+    rows, forms = _course_rows(bond['courses'], '/sigaa/portais/discente/discente.jsf', view_state)
+
+    return page('Portal do Discente', f'''
+<div id="info-usuario"><p class="usuario"><span>{escape(student["name"])}</span></p></div>
+<div id="perfil-docente"><table>
+  <tr><td>Matrícula:</td><td>{bond["registration"]}</td></tr>
+  <tr><td>Curso:</td><td>{escape(bond["program"])} - M</td></tr>
+  <tr><td>Nível:</td><td>TÉCNICO</td></tr>
+  <tr><td>Status:</td><td>CURSANDO</td></tr>
+</table></div>
+<div id="turmas-portal" class="simple-panel">
+<table>
+  <thead><tr><th>Componente Curricular</th><th>Local</th><th>Horário</th></tr></thead>
+  <tbody><tr class="periodo"><td colspan="3">{datetime.date.today().year}.1</td></tr>{"".join(rows)}</tbody>
+</table>
+{"".join(forms)}
+</div>''', filler_kb)
+
+
+def all_courses_page(student, bond_index=0, view_state='j_id4', filler_kb=0):
+    """ "Turmas anteriores": every period of the bond, newest (current) first."""
+    bond = student['bonds'][bond_index]
+    terms = [(f"{datetime.date.today().year}.1", bond['courses'])] + bond['past_terms']
+    body, forms = [], []
+    for period, courses in terms:
+        rows, term_forms = _course_rows(courses, '/sigaa/portais/discente/turmas.jsf', view_state, len(forms))
+        body.append(f'<tr class="periodo"><td colspan="3">{period}</td></tr>' + ''.join(rows))
+        forms += term_forms
+    return page('Turmas do Discente', f'''
+<table class="listagem">
+  <thead><tr><th>Componente Curricular</th><th>Local</th><th>Horário</th></tr></thead>
+  <tbody>{"".join(body)}</tbody>
+</table>
+{"".join(forms)}''', filler_kb)
+
+
+def _menu_item(label, key):
+    onclick = (f"if(typeof jsfcljs == 'function'){{jsfcljs(document.getElementById('formMenu'),"
+               f"{{'{key}':'{key}'}},'');}}return false")
+    return f'<div class="itemMenu" onclick="{escape(onclick)}"><span class="label">{escape(label)}</span></div>'
+
+
+def course_page(course, view_state='j_id3', filler_kb=0):
+    items = [
+        ('Principal', 'formMenu:j_id_jsp_principal'),
+        ('Participantes', 'formMenu:j_id_jsp_participantes'),
+        ('Frequência', 'formMenu:j_id_jsp_frequencia'),
+        ('Ver Notas', 'formMenu:j_id_jsp_notas'),
+        ('Tarefas', 'formMenu:j_id_jsp_tarefas'),
+    ]
+    menu = ''.join(_menu_item(label, key) for label, key in items)
+    return page(course['title'], f'''
+<form id="formMenu" name="formMenu" method="post" action="/sigaa/ava/index.jsf">
+  <input type="hidden" name="formMenu" value="formMenu"/>
+  <div id="menu-turma">{menu}</div>
+  <input type="hidden" name="javax.faces.ViewState" value="{view_state}"/>
+</form>
+<div id="conteudo"><h2>{escape(course["title"])}</h2><p>Bem-vindo à turma virtual.</p></div>''', filler_kb)
+
+
+def _fmt(value):
+    return '' if value is None else f"{value:.1f}".replace('.', ',')
+
+
+def grades_page(student, course, bond_index=0, filler_kb=0):
+    bond = student['bonds'][bond_index]
+    main = ['<th>Matrícula</th>', '<th>Nome</th>']
+    sub = ['<th></th>', '<th></th>']
+    values = [f'<td>{bond["registration"]}</td>', f'<td>{escape(student["name"]).upper()}</td>']
+    hidden = []
+
+    aval = 0
+    for unit, subs in course['units']:
+        if len(subs) == 1:
+            main.append(f'<th>{unit}</th>')
+            sub.append('<th></th>')
+            values.append(f'<td>{_fmt(subs[0][2])}</td>')
+            continue
+        main.append(f'<th colspan="{len(subs)}">{unit}</th>')
+        for short, description, value in subs:
+            aval += 1
+            sub.append(f'<th id="aval_{aval}">{short}</th>')
+            hidden.append(f'<input type="hidden" id="denAval_{aval}" value="{escape(description)}"/>')
+            values.append(f'<td>{_fmt(value)}</td>')
+
+    for i, recovery in enumerate(course['recoveries']):
+        main.append(f'<th>Recuperação S{i + 1}</th>')
+        sub.append('<th></th>')
+        values.append(f'<td>{_fmt(recovery)}</td>')
+
+    faltas = sum(a for _, a in course['dates'])
+    for label, value in (('Resultado', ''), ('Faltas', str(faltas)), ('Sit.', 'MATRICULADO')):
+        main.append(f'<th>{label}</th>')
+        sub.append('<th></th>')
+        values.append(f'<td>{value}</td>')
+
+    return page('Ver Notas', f'''
+<h2>{escape(course["title"])} - Notas</h2>
+{"".join(hidden)}
+<table class="tabelaRelatorio">
+  <thead><tr>{"".join(main)}</tr><tr>{"".join(sub)}</tr></thead>
+  <tbody><tr class="linhaPar">{"".join(values)}</tr></tbody>
+</table>''', filler_kb)
+
+
+def frequency_page(course, filler_kb=0):
+    rows = []
+    for day, absences in course['dates']:
+        # SIGAA writes a single absence without the number
+        situation = 'Presente' if absences == 0 else 'Falta' if absences == 1 else f'{absences} Faltas'
+        rows.append(f'<tr><td>{day.strftime("%d/%m/%Y")}</td><td>{situation}</td></tr>')
+    total = sum(a for _, a in course['dates'])
+    return page('Frequência', f'''
+<h2>{escape(course["title"])} - Mapa de Frequências</h2>
+<table class="listagem">
+  <thead><tr><th>Data</th><th>Situação</th></tr></thead>
+  <tbody>{"".join(rows)}</tbody>
+</table>
+<div class="botoes">
+  <p><b>Total de Faltas:</b> {total}</p>
+  <p><b>Máximo de Faltas Permitido:</b> {course["max_faltas"]}</p>
+</div>''', filler_kb)
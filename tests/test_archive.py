@@ -0,0 +1,147 @@
+import asyncio
+import json
+
+import pytest
+
+from app import archive, pipeline
+from app.archive import Archive
+from app.sigaa_api.models import Grade
+
+
+class FakeCourse:
+    def __init__(self, id, period, grade, fail=False):
+        self.id = id
+        self.title = f"Disciplina {id}"
+        self.period = period
+        self.grade = grade
+        self.fail = fail
+        self.fetches = 0
+
+    async def get_grades(self):
+        self.fetches += 1
+        if self.fail:
+            raise ConnectionError("SIGAA down")
+        return [Grade('1', self.grade)]
+
+
+class FakeBond:
+    registration = '2020001'
+    program = 'Técnico em Informática'
+
+    def __init__(self, courses):
+        self.courses = courses
+
+    async def get_all_courses(self):
+        return self.courses
+
+
+def student():
+    # 2024.1 is the current term (left to the grade stream), 2023.2 the newest past term
+    return [FakeCourse('1', '2024.1', 9.0),
+            FakeCourse('2', '2023.2', 7.0), FakeCourse('3', '2023.2', 8.0),
+            FakeCourse('4', '2023.1', 6.0)]
+
+
+async def crawl(bond, store, stop=None):
+    lines = [json.loads(line) async for line in pipeline.past_term_lines(bond, iter(range(1, 100)), store, stop)]
+    return {line['period']: line for line in lines}
+
+
+def fetches(courses):
+    return {course.id: course.fetches for course in courses}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return Archive(str(tmp_path / 'history.sqlite3'))
+
+
+async def test_complete_terms_come_from_the_archive(store):
+    courses = student()
+    terms = await crawl(FakeBond(courses), store)
+    assert sorted(terms) == ['2023.1', '2023.2']
+    assert not terms['2023.2']['cached']
+    assert fetches(courses) == {'1': 0, '2': 1, '3': 1, '4': 1}
+
+    terms = await crawl(FakeBond(courses), store)
+    assert terms['2023.1']['cached'] and terms['2023.2']['cached']
+    assert [c['name'] for c in terms['2023.2']['courses']] == ['Disciplina 2', 'Disciplina 3']
+    assert fetches(courses) == {'1': 0, '2': 1, '3': 1, '4': 1}
+
+
+async def test_interrupted_crawl_resumes_from_checkpoints(store):
+    courses = student()
+    courses[2].fail = True
+    terms = await crawl(FakeBond(courses), store)
+    # Not complete: sent as fetched now, and not marked complete in the archive
+    assert not terms['2023.2']['cached']
+    assert (await store.run(store.load, '2020001'))['2023.2'].crawled_at == 0
+
+    courses[2].fail = False
+    terms = await crawl(FakeBond(courses), store)
+    assert not terms['2023.2']['cached']
+    # Only the course that failed is fetched again
+    assert fetches(courses) == {'1': 0, '2': 1, '3': 2, '4': 1}
+
+    terms = await crawl(FakeBond(courses), store)
+    assert terms['2023.2']['cached']
+    assert fetches(courses) == {'1': 0, '2': 1, '3': 2, '4': 1}
+
+
+async def test_stop_keeps_checkpoints(store):
+    courses = student()
+    stop = asyncio.Event()
+    original = courses[1].get_grades
+
+    async def then_stop():
+        stop.set()
+        return await original()
+
+    courses[1].get_grades = then_stop
+    await crawl(FakeBond(courses), store, stop)
+    assert fetches(courses) == {'1': 0, '2': 1, '3': 0, '4': 0}
+
+    await crawl(FakeBond(courses), store)
+    assert fetches(courses) == {'1': 0, '2': 1, '3': 1, '4': 1}
+
+
+async def test_newest_past_term_is_crawled_again_after_the_ttl(store, monkeypatch):
+    courses = student()
+    await crawl(FakeBond(courses), store)
+
+    monkeypatch.setattr(archive, 'OPEN_TERM_TTL', -1)
+    terms = await crawl(FakeBond(courses), store)
+    # 2023.2 may still change; 2023.1 settled when a newer past term showed up
+    assert not terms['2023.2']['cached']
+    assert terms['2023.1']['cached']
+    assert fetches(courses) == {'1': 0, '2': 2, '3': 2, '4': 1}
+
+
+async def test_purge_drops_whole_terms(store):
+    courses = student()
+    await crawl(FakeBond(courses), store)
+
+    terms = await store.run(store.load, '2020001')
+    assert set(terms) == {'2023.1', '2023.2'}
+    await store.run(store.purge, terms['2023.2'].crawled_at + store.retention + 1)
+    assert await store.run(store.load, '2020001') == {}
+
+
+async def test_crawl_waits_for_the_grade_stream():
+    guard = pipeline.SessionGuard(stop_timeout=1)
+    async with guard.stream('session'):
+        async with guard.crawl('session') as stop:
+            assert stop is None
+
+    async with guard.crawl('session') as stop:
+        assert not stop.is_set()
+
+        async def stream():
+            async with guard.stream('session'):
+                return 'streamed'
+
+        task = asyncio.ensure_future(stream())
+        await asyncio.sleep(0)
+        # The stream asked the crawl to stop and waits for it to finish
+        assert stop.is_set() and not task.done()
+    assert await task == 'streamed'
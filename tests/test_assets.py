@@ -0,0 +1,48 @@
+import gzip
+
+import pytest
+from flask import Flask
+
+from app.assets import AssetStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    (tmp_path / 'js').mkdir()
+    (tmp_path / 'css').mkdir()
+    (tmp_path / 'js' / 'app.js').write_text('console.log("notas");\n' * 200)
+    return AssetStore(str(tmp_path))
+
+
+def serve(store, **headers):
+    with Flask(__name__).test_request_context('/assets/js/app.js', headers=headers):
+        return store.response('js/app.js')
+
+
+def test_gzip_with_zero_quality_is_refused(store):
+    response = serve(store, **{'Accept-Encoding': 'gzip;q=0, identity'})
+    assert response.headers.get('Content-Encoding') is None
+    assert response.get_data().startswith(b'console.log')
+
+
+def test_gzip_when_accepted(store):
+    response = serve(store, **{'Accept-Encoding': 'gzip, deflate'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.get_data()).startswith(b'console.log')
+
+
+def test_br_preferred_unless_ranked_lower(store):
+    pytest.importorskip('brotli')
+    assert serve(store, **{'Accept-Encoding': 'gzip, br'}).headers['Content-Encoding'] == 'br'
+    assert serve(store, **{'Accept-Encoding': 'gzip, br;q=0.5'}).headers['Content-Encoding'] == 'gzip'
+    assert serve(store, **{'Accept-Encoding': 'br'}).headers['ETag'].endswith('-br"')
+
+
+def test_etag_depends_on_the_encoding(store):
+    identity = serve(store).headers['ETag']
+    gzipped = serve(store, **{'Accept-Encoding': 'gzip'}).headers['ETag']
+    assert identity != gzipped and gzipped.endswith('-gz"')
+
+    # A validator for one body doesn't revalidate another
+    assert serve(store, **{'Accept-Encoding': 'gzip', 'If-None-Match': gzipped}).status_code == 304
+    assert serve(store, **{'If-None-Match': gzipped}).status_code == 200
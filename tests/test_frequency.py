@@ -0,0 +1,66 @@
+import datetime
+
+import pytest
+
+from app.sigaa_api import course as course_module
+from app.sigaa_api.course import Course
+from app.sigaa_api.page import SigaaPage
+
+URL = 'https://sigaa.ifal.edu.br/sigaa/ava/index.jsf'
+
+
+def frequency_page(rows, total=None, max_faltas=20):
+    cells = ''.join(f'<tr><td>{day}</td><td>{situation}</td></tr>' for day, situation in rows)
+    footer = f'<p><b>Total de Faltas:</b> {total}</p>' if total is not None else ''
+    return SigaaPage(URL, f'''<html><body>
+<h2>Matemática - Mapa de Frequências</h2>
+<table class="listagem">
+  <thead><tr><th>Data</th><th>Situação</th></tr></thead>
+  <tbody>{cells}</tbody>
+</table>
+<div class="botoes">{footer}<p><b>Máximo de Faltas Permitido:</b> {max_faltas}</p></div>
+</body></html>''', {}, 'GET', 200)
+
+
+def parse(page):
+    return Course(None, 'Matemática', {'action': '', 'post_values': {}})._parse_frequency(page)
+
+
+ROWS = [('05/02/2025', 'Presente'), ('12/02/2025', 'Falta'), ('20/05/2025', '2 Faltas'),
+        ('02/10/2025', '1 Falta(s)'), ('09/10/2025', '')]
+
+
+@pytest.fixture
+def calendar(monkeypatch):
+    starts = course_module._bimester_calendar('2025-04-22,2025-07-21,2025-10-06')
+    monkeypatch.setattr(course_module, 'BIMESTER_STARTS', starts)
+
+
+def test_absences_per_date(calendar):
+    frequency = parse(frequency_page(ROWS))
+    # A single absence may come without its number; a lesson without attendance yet is skipped
+    assert frequency.dates == (('2025-02-05', 0), ('2025-02-12', 1), ('2025-05-20', 2), ('2025-10-02', 1))
+    assert frequency.lessons == 4
+    assert frequency.total_faltas == 4
+    assert frequency.bimesters == (1, 2, 1, 0)
+    assert frequency.total_classes == 80
+    assert frequency.percent == 5.0
+
+
+def test_footer_total_wins(calendar):
+    frequency = parse(frequency_page(ROWS, total=6))
+    assert frequency.total_faltas == 6
+    assert frequency.percent == 7.5
+
+
+def test_no_bimesters_without_a_calendar_for_the_year(monkeypatch):
+    monkeypatch.setattr(course_module, 'BIMESTER_STARTS', {})
+    frequency = parse(frequency_page(ROWS))
+    assert frequency.bimesters == ()
+    assert frequency.total_faltas == 4
+
+
+def test_calendar_needs_three_dates_per_year():
+    starts = course_module._bimester_calendar('2025-04-22,2025-07-21,2025-10-06,2026-04-20')
+    assert starts == {2025: (datetime.date(2025, 4, 22), datetime.date(2025, 7, 21), datetime.date(2025, 10, 6))}
+    assert course_module._bimester_calendar('22/04/2025') == {}
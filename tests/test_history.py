@@ -0,0 +1,157 @@
+import asyncio
+import itertools
+import json
+
+from app import history as history_module, pipeline
+from app.history import History
+from app.sigaa_api.models import CourseGrades, CourseResult, Frequency, Grade
+from app.snapshots import SnapshotStore
+
+
+def result(b1=(), faltas=None, name='Matemática'):
+    frequency = Frequency(total_faltas=faltas, max_faltas=20) if faltas is not None else None
+    return CourseResult(None, name, None, CourseGrades(b1), frequency)
+
+
+def test_first_appearance_has_no_previous(tmp_path):
+    history = History(str(tmp_path / 'history.sqlite3'))
+    assert history.record('2024001', [('111', result((7.0,)))], now=100) == ['111']
+
+    changes = history.changes_since('2024001', 50)
+    assert len(changes) == 1
+    assert changes[0]['course'] == '111'
+    assert changes[0]['changed_at'] == 100
+    assert changes[0]['grades']['b1Notes'] == [7.0]
+    assert changes[0]['previous_grades'] is None
+
+
+def test_reports_the_value_at_since(tmp_path):
+    history = History(str(tmp_path / 'history.sqlite3'))
+    history.record('2024001', [('111', result((5.0,)))], now=100)
+    history.record('2024001', [('111', result((6.0,)))], now=200)
+    history.record('2024001', [('111', result((8.0,)))], now=300)
+
+    change, = history.changes_since('2024001', 250)
+    assert change['previous_grades']['b1Notes'] == [6.0]
+    assert change['grades']['b1Notes'] == [8.0]
+    assert change['changed_at'] == 300
+
+    change, = history.changes_since('2024001', 150)
+    assert change['previous_grades']['b1Notes'] == [5.0]
+    assert change['grades']['b1Notes'] == [8.0]
+
+    assert history.changes_since('2024001', 300) == []
+
+
+def test_unchanged_values_are_not_recorded(tmp_path):
+    history = History(str(tmp_path / 'history.sqlite3'))
+    history.record('2024001', [('111', result((5.0,)))], now=100)
+    assert history.record('2024001', [('111', result((5.0,)))], now=200) == []
+    assert history.changes_since('2024001', 150) == []
+
+
+def test_frequency_only_change(tmp_path):
+    history = History(str(tmp_path / 'history.sqlite3'))
+    history.record('2024001', [('111', result((5.0,), faltas=2))], now=100)
+    assert history.record('2024001', [('111', result((5.0,), faltas=4))], now=200) == []
+
+    change, = history.changes_since('2024001', 150)
+    assert change['grades'] is None and change['previous_grades'] is None
+    assert change['previous_frequency']['total_faltas'] == 2
+    assert change['frequency']['total_faltas'] == 4
+
+
+def test_grades_kept_when_only_frequency_comes_later(tmp_path):
+    history = History(str(tmp_path / 'history.sqlite3'))
+    history.record('2024001', [('111', result((5.0,)))], now=100)
+    history.record('2024001', [('111', result((5.0,), faltas=1))], now=200)
+    history.record('2024001', [('111', result((9.0,), faltas=1))], now=300)
+
+    change, = history.changes_since('2024001', 250)
+    assert change['previous_grades']['b1Notes'] == [5.0]
+    assert change['grades']['b1Notes'] == [9.0]
+    assert change['frequency'] is None
+
+
+def test_students_are_kept_apart(tmp_path):
+    history = History(str(tmp_path / 'history.sqlite3'))
+    history.record('2024001', [('111', result((5.0,)))], now=100)
+    history.record('2024002', [('111', result((9.0,)))], now=100)
+
+    change, = history.changes_since('2024001', 0)
+    assert change['grades']['b1Notes'] == [5.0]
+
+
+def test_purge_drops_old_changes_and_absent_students(tmp_path):
+    history = History(str(tmp_path / 'history.sqlite3'), retention_days=1)
+    history.record('2024001', [('111', result((5.0,)))], now=1000)
+    history.record('2024002', [('111', result((5.0,)))], now=1000)
+    # Still around a day later, with the same grades
+    history.record('2024001', [('111', result((5.0,)))], now=1000 + 86400)
+
+    history.purge(now=1000 + 86400 + 10)
+    # The old change is gone, but the last value stays: an unchanged course is still not a change
+    assert history.record('2024001', [('111', result((5.0,)))], now=1000 + 86400 + 20) == []
+    # Everything about the absent student is gone
+    assert history.changes_since('2024002', 0) == []
+    assert history.record('2024002', [('111', result((5.0,)))], now=1000 + 86400 + 20) == ['111']
+
+
+def test_no_database_yet(tmp_path):
+    assert History(str(tmp_path / 'history.sqlite3')).changes_since('2024001', 0) == []
+
+
+def test_latest_grades(tmp_path):
+    history = History(str(tmp_path / 'history.sqlite3'))
+    history.record('2024001', [('111', result((5.0,))), ('222', result(faltas=2))], now=100)
+    history.record('2024001', [('222', result((7.0,), faltas=2))], now=200)
+    latest = history.latest_grades('2024001')
+    assert json.loads(latest['111'])['b1Notes'] == [5.0]
+    assert json.loads(latest['222'])['b1Notes'] == [7.0]
+    assert history.latest_grades('2024002') == {}
+
+
+class FakeCourse:
+    def __init__(self, id, grade):
+        self.id = id
+        self.title = f"Disciplina {id}"
+        self.grade = grade
+
+    async def get_grades(self):
+        return [Grade('1', self.grade)]
+
+
+class FakeBond:
+    registration = '2024001'
+    program = 'Técnico em Informática'
+
+    def __init__(self, courses):
+        self.courses = courses
+
+    async def get_courses(self):
+        return self.courses
+
+
+async def stream(courses, store):
+    lines = [json.loads(line) async for line in pipeline.bond_lines(FakeBond(courses), False, itertools.count(1), store)]
+    # Let the history's thread write before the next stream
+    await asyncio.wrap_future(history_module.on_writer_thread(lambda: None))
+    return {line['id']: line.get('changed') for line in lines if line['type'] == 'course_data'}
+
+
+async def test_stream_tags_changed_grades(tmp_path, monkeypatch):
+    monkeypatch.setattr(history_module, 'HISTORY', History(str(tmp_path / 'history.sqlite3')))
+    store = SnapshotStore()
+    courses = [FakeCourse('111', 5.0), FakeCourse('222', 6.0)]
+    # First stream: nothing to compare with yet
+    assert await stream(courses, store) == {1: False, 2: False}
+
+    courses[1].grade = 8.0
+    courses.append(FakeCourse('333', 9.0))
+    assert await stream(courses, store) == {1: False, 2: True, 3: False}
+
+
+async def test_no_tag_without_history(monkeypatch):
+    monkeypatch.setattr(history_module, 'HISTORY', None)
+    # Left out: the dashboard compares with its own snapshot instead
+    assert await stream([FakeCourse('111', 5.0)], SnapshotStore()) == {1: None}
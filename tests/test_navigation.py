@@ -0,0 +1,115 @@
+import pytest
+
+from app.sigaa_api import course as course_module
+from app.sigaa_api.course import Course
+from app.sigaa_api import navigation
+from app.sigaa_api.navigation import PlanStore
+from app.sigaa_api.page import SigaaPage
+from bench import sigaa_pages as pages
+
+URL = 'https://sigaa.ifal.edu.br/sigaa/ava/index.jsf'
+
+
+class FakeSigaa:
+    """Course menu, grades and frequency pages answered by form key, like the turma virtual."""
+
+    def __init__(self):
+        self.student = pages.make_student('nav', courses=1, groups=1, seed=1)
+        self.course = self.student['bonds'][0]['courses'][0]
+        self.menu_suffix = ''
+        self.graded = True
+        self.frequency_jumps_work = True
+        self.course_view = None
+        self.posts = []
+
+    def _menu(self):
+        # A SIGAA deploy renames the menu's component ids
+        html = pages.course_page(self.course)
+        return html.replace('j_id_jsp_notas', 'j_id_jsp_notas' + self.menu_suffix)
+
+    def _grades(self):
+        html = pages.grades_page(self.student, self.course)
+        # Before the first grade is posted there's no grades table
+        return html if self.graded else html.replace('tabelaRelatorio', 'semNotas')
+
+    def new_session(self):
+        # Next stream: a new login, not on any course yet
+        self.course_view = None
+        self.posts.clear()
+
+    async def post(self, action, data):
+        if 'idTurma' in data:
+            self.posts.append('course')
+            html = self._menu()
+        elif 'formMenu:j_id_jsp_notas' + self.menu_suffix in data:
+            self.posts.append('grades')
+            html = self._grades()
+        elif 'formMenu:j_id_jsp_frequencia' in data and self.frequency_jumps_work:
+            self.posts.append('frequency')
+            html = pages.frequency_page(self.course)
+        elif 'formMenu:j_id_jsp_frequencia' in data:
+            # SIGAA ignores every other frequency request (only the one from its menu goes through)
+            self.frequency_jumps_work = True
+            self.posts.append('ignored')
+            html = self._menu()
+        else:
+            # Unknown ids: SIGAA renders the course page again
+            self.posts.append('ignored')
+            html = self._menu()
+        return SigaaPage(URL, html, {}, 'POST', 200)
+
+
+@pytest.fixture
+def sigaa(monkeypatch):
+    monkeypatch.setattr(course_module, 'PLANS', PlanStore())
+    return FakeSigaa()
+
+
+def course_for(sigaa):
+    form = {'action': URL, 'post_values': {'idTurma': sigaa.course['id_turma']}}
+    return Course(sigaa, sigaa.course['title'], form, registration='2024001')
+
+
+async def test_plan_skips_the_menu(sigaa):
+    assert await course_for(sigaa).get_grades()
+    assert sigaa.posts == ['course', 'grades']
+
+    sigaa.new_session()
+    assert await course_for(sigaa).get_grades()
+    # Only the course's ViewState is needed before the jump
+    assert sigaa.posts == ['course', 'grades']
+
+
+async def test_stale_plan_falls_back_to_the_menu(sigaa):
+    await course_for(sigaa).get_grades()
+
+    sigaa.menu_suffix = '_v2'
+    sigaa.new_session()
+    assert await course_for(sigaa).get_grades()
+    assert sigaa.posts == ['course', 'ignored', 'course', 'grades']
+
+
+async def test_course_without_grades_is_not_jumped_to(sigaa):
+    sigaa.graded = False
+    assert await course_for(sigaa).get_grades() == []
+
+    # A stale plan for an unmarked page would look like a successful jump: the menu is used instead
+    sigaa.menu_suffix = '_v2'
+    sigaa.graded = True
+    sigaa.new_session()
+    assert await course_for(sigaa).get_grades()
+    assert sigaa.posts == ['course', 'grades']
+
+
+async def test_rejected_frequency_jumps_keep_the_grades_plan(sigaa):
+    await course_for(sigaa).get_grades()
+    for _ in range(navigation.MAX_REJECTIONS):
+        sigaa.new_session()
+        sigaa.frequency_jumps_work = False
+        assert (await course_for(sigaa).get_frequency()).max_faltas
+    assert sigaa.posts == ['course', 'ignored', 'course', 'frequency']
+
+    # Frequency is left to the menu from now on, grades still jump
+    plans = course_module.PLANS
+    assert plans.get('2024001', sigaa.course['id_turma'], 'frequency') is None
+    assert plans.get('2024001', sigaa.course['id_turma'], 'grades').marked